@@ -1,140 +1,677 @@
 import os
-from groq import Groq
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
-import random
+import asyncio
+import logging
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
+from completion_cache import CompletionCache, make_key
+from llm_client import AsyncResilientClient, CircuitOpenError, LLMPolicy, ResilientClient, http_client, is_rate_limited
+from prompt_builder import PROMPT_BUDGET, PromptBuilder, count_tokens
+from local_fir import SectionTable, draft_analysis, draft_fir
+from fir_document import CaseAnalysis, Complaint, FIRDocument, load_partial_json
+import metrics
 
-# Load the dataset
-df = pd.read_csv('fir_sections.csv')
+logger = logging.getLogger(__name__)
 
-# Initialize the TF-IDF vectorizer
-vectorizer = TfidfVectorizer(stop_words='english')
-tfidf_matrix = vectorizer.fit_transform(df['Description'])
+# Configure the Groq clients
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "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")
 
-# Configure the Groq client
-client = Groq(api_key="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")
+# The retriever and the Groq clients are created on first use and then shared by
+# every session in the process; assign to these to substitute them (e.g. with stubs)
+retriever = None
+section_table = None
+client = None
+async_client = None
+job_queue = None
+fir_numbers = None
+fir_archive = None
+_resources_lock = threading.Lock()
+
+# Section retrieval: "hybrid" (TF-IDF + BM25 + cited sections), "tfidf" or "embedding"
+RETRIEVAL_BACKEND = os.environ.get("FIR_RETRIEVAL_BACKEND", "hybrid")
+
+# Seconds between checks for added or edited section corpora (see section_shards); 0 turns hot-reload off
+CORPUS_POLL_INTERVAL = float(os.environ.get("FIR_CORPUS_POLL", "30"))
+
+# Completion settings shared by every call site
+MODEL = "llama3-70b-8192"
+SYSTEM_PROMPT = "You are a legal assistant specializing in Indian criminal law."
+TEMPERATURE = 0.5
+MAX_TOKENS = 2000
+API_ERROR_MESSAGE = "API error occurred. Please try again later."
+BUSY_MESSAGE = "The AI service is busy right now. Please try again in a minute."
+
+# Retries, rate limiting, circuit breaking and the fallback model, shared by every call
+llm_policy = LLMPolicy.from_env()
+
+# Seconds to wait for a single async completion before giving up
+DEFAULT_TIMEOUT = float(os.environ.get("FIR_LLM_TIMEOUT", "60"))
+
+# Default for callers that can skip the LLM and use the template drafts (offline or bulk use)
+LOCAL_ONLY = os.environ.get("FIR_LOCAL_ONLY") == "1"
+
+# Seconds a case description must stay unchanged before its analysis is prefetched; 0 turns prefetching off
+PREFETCH_DELAY = float(os.environ.get("FIR_PREFETCH_DELAY", "2"))
+
+# Completions are cached by prompt; set to None to always call the API
+completion_cache = CompletionCache.from_env()
+
+# Seconds between updates of the FIR and analysis shown on the results page while they stream in
+STREAM_UPDATE_INTERVAL = 0.25
+
+def _shard_loader(backend):
+    """Return load(csv_path, index_dir) building one corpus's retriever for the backend"""
+    from section_index import load_index
+    import retrieval
+    # Each shard's index is rebuilt only when its CSV changes
+    if backend == "tfidf":
+        return lambda csv_path, index_dir: retrieval.SectionRetriever(load_index(csv_path, index_dir), k=5, threshold=0.1)
+    if backend == "embedding":
+        from embedding_index import load_embeddings
+        return lambda csv_path, index_dir: retrieval.EmbeddingRetriever(
+            load_index(csv_path, index_dir), load_embeddings(csv_path, index_dir), k=5, threshold=0.3)
+    if backend == "hybrid":
+        return lambda csv_path, index_dir: retrieval.HybridRetriever(load_index(csv_path, index_dir), k=5, threshold=0.1)
+    raise ValueError(f"Unknown FIR_RETRIEVAL_BACKEND {backend!r}; expected tfidf, hybrid or embedding")
+
+def _make_retriever(backend):
+    from section_shards import ShardedRetriever
+    sharded = ShardedRetriever(_shard_loader(backend), k=5)
+    if CORPUS_POLL_INTERVAL > 0:
+        sharded.watch(CORPUS_POLL_INTERVAL)
+    return sharded
+
+def get_retriever():
+    """Return the shared section retriever, loading the prebuilt index shards on first use"""
+    global retriever
+    if retriever is None:
+        with _resources_lock:
+            if retriever is None:
+                with metrics.span("load_index", backend=RETRIEVAL_BACKEND) as span:
+                    retriever = _make_retriever(RETRIEVAL_BACKEND)
+                    span.set(shards=len(retriever.shards))
+    return retriever
+
+def reload_corpora(name=None):
+    """Pick up added, edited or removed section corpora now (or force one shard); return the shards reloaded"""
+    with metrics.span("corpus_reload", shard=name or "all") as span:
+        changed = get_retriever().refresh() if name is None else get_retriever().reload(name)
+        span.set(reloaded=len(changed))
+    return changed
+
+def get_section_table():
+    """Return the shared Offense/Punishment lookup used by the local drafts, rebuilt when a shard reloads"""
+    global section_table
+    index = get_retriever().index
+    table = section_table
+    if table is None or table.index is not index:
+        table = section_table = SectionTable(index)
+    return table
+
+def get_client():
+    """Return the shared Groq client, creating it on first use"""
+    global client
+    if client is None:
+        with _resources_lock:
+            if client is None:
+                from groq import Groq
+                # llm_policy does the retrying; the pooled HTTP client keeps connections alive
+                client = Groq(api_key=GROQ_API_KEY, max_retries=0, http_client=http_client())
+    return client
+
+def get_async_client():
+    """Return the shared AsyncGroq client, creating it on first use"""
+    global async_client
+    if async_client is None:
+        with _resources_lock:
+            if async_client is None:
+                from groq import AsyncGroq
+                async_client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0, http_client=http_client(asynchronous=True))
+    return async_client
+
+def get_job_queue():
+    """Return the shared FIR generation job queue (see jobs.py), starting its workers on first use"""
+    global job_queue
+    if job_queue is None:
+        with _resources_lock:
+            if job_queue is None:
+                from jobs import JobQueue
+                # Every FIR the queue finishes goes into the archive; a failed one gives back its number
+                job_queue = JobQueue.from_env(run_fir_job, on_done=archive_fir, on_failed=release_job_fir_number)
+    return job_queue
+
+def get_archive():
+    """Return the shared FIR archive (see fir_archive.py), opening its database on first use"""
+    global fir_archive
+    if fir_archive is None:
+        with _resources_lock:
+            if fir_archive is None:
+                from fir_archive import FIRArchive
+                fir_archive = FIRArchive()
+    return fir_archive
+
+def archive_fir(key, request, result):
+    """Append a finished FIR to the archive under key (its job id, say); return its archive id"""
+    with metrics.span("archive", source=result.get("source")):
+        return get_archive().add(request, result, key=key)
+
+def warm_up():
+    """Load the retriever and clients in a background thread, ahead of the first request"""
+    def load():
+        get_retriever()
+        get_client()
+        get_async_client()
+    thread = threading.Thread(target=load, name="fir-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 def get_relevant_sections(case_description):
-    """Find relevant IPC sections based on case description using TF-IDF and cosine similarity"""
-    case_vector = vectorizer.transform([case_description])
-    cosine_similarities = cosine_similarity(case_vector, tfidf_matrix).flatten()
-    
-    # Get top 5 most similar sections
-    top_indices = cosine_similarities.argsort()[-5:][::-1]
-    
-    relevant_sections = {}
-    for index in top_indices:
-        if cosine_similarities[index] > 0.1:  # Only include if similarity is above threshold
-            relevant_sections[df.iloc[index]['Section']] = df.iloc[index]['Description']
-    
-    return relevant_sections
+    """Find relevant sections of every act from TF-IDF, BM25 and cited section numbers in the case description"""
+    with metrics.span("retrieval") as span:
+        sections = get_retriever().search(case_description)
+        span.set(sections=len(sections))
+    return sections
+
+def get_relevant_sections_batch(case_descriptions):
+    """Find relevant sections for many case descriptions in one scoring pass per shard"""
+    with metrics.span("retrieval_batch", complaints=len(case_descriptions)):
+        return get_retriever().search_batch(case_descriptions)
+
+def live_query():
+    """Return a LiveQuery for re-retrieving sections while a case description is edited"""
+    return get_retriever().live_query()
+
+def update_live_query(live, case_description):
+    """The relevant sections for the edited description, re-scored from the terms that changed"""
+    with metrics.span("live_retrieval") as span:
+        sections = live.update(case_description)
+        span.set(sections=len(sections), changed_terms=live.changed)
+    return sections
+
+ANALYSIS_TASK = """
+You are a legal expert in Indian criminal law. For the case above, list every possibly relevant section of the IPC and other applicable acts, including any the retrieved sections miss, and analyse the case: primary and related offenses, aggravating factors, procedural considerations and potential defenses.
+
+Reply with only this JSON object:
+{"applicable_sections": [{"section": "IPC 379", "reason": "why it applies"}], "additional_sections": [{"section": "...", "reason": "relevant but not retrieved"}], "analysis": "legal analysis of the case", "recommendations": ["evidence to collect or next step"]}
+"""
+
+# The FIR number, dates and complainant particulars come from the form, so the model
+# writes only the narrative parts and identical complaints share a cache entry
+FIR_TASK = """
+You are a senior police officer who drafts First Information Reports (FIRs) in India. Using the information above, write the narrative parts of the FIR in formal language suitable for official police records.
+
+Reply with only this JSON object, filling the occurrence fields only when USER INPUTS leave them out:
+{"occurrence_date": "", "occurrence_time": "", "occurrence_place": "", "accused": "details of known/unknown accused", "delay_reason": "reasons for delay in reporting, if any", "stolen_property": "particulars of properties stolen, if any", "incident_description": "detailed facts of the incident", "sections_applied": ["IPC 379 - Theft"], "action_taken": "initial steps taken"}
+"""
+
+# Room outside the shared context: the system prompt, the longer task and the form's user inputs
+USER_INPUTS_RESERVE = 300
+prompts = PromptBuilder(
+    PROMPT_BUDGET,
+    reserve=count_tokens(SYSTEM_PROMPT) + max(count_tokens(ANALYSIS_TASK), count_tokens(FIR_TASK)) + USER_INPUTS_RESERVE,
+    # Sections cut down to a line for a long complaint keep their Offense as the title
+    title=lambda section: get_section_table().offenses.get(section, ""),
+)
+
+def build_analysis_prompt(case_description, relevant_sections):
+    """Build the user prompt for the section list and case analysis"""
+    return prompts.build(case_description, relevant_sections, ANALYSIS_TASK)
+
+def build_fir_prompt(case_description, relevant_sections, user_inputs):
+    """Build the user prompt for drafting the FIR; user_inputs is a Complaint or 'Key: value' text"""
+    details = Complaint.coerce(user_inputs, case_description).details_text()
+    return prompts.build(case_description, relevant_sections, FIR_TASK, details=details)
+
+def get_fir_numbers():
+    """Return the shared FIR number allocator (see fir_numbers.py), opening its database on first use"""
+    global fir_numbers
+    if fir_numbers is None:
+        with _resources_lock:
+            if fir_numbers is None:
+                from fir_numbers import FIRNumberAllocator
+                fir_numbers = FIRNumberAllocator()
+                # Numbers reserved but not used are given back, so the register has no gaps
+                atexit.register(fir_numbers.close)
+    return fir_numbers
+
+def new_fir_number(station=None):
+    """Return the station's next FIR number for this year and the registration date"""
+    now = datetime.now()
+    number = get_fir_numbers().allocate(station, now.year)
+    return f"{number}/{now.year}", now.strftime('%d-%m-%Y')
+
+def release_fir_number(fir_number, station=None):
+    """Give back a number from new_fir_number() whose FIR was never produced, so the register has no gap"""
+    number, year = fir_number.split("/")
+    get_fir_numbers().give_back(int(number), station, int(year))
+
+def release_job_fir_number(job_id, request, error):
+    """JobQueue on_failed hook: a failed job's FIR number goes back to the register"""
+    try:
+        release_fir_number(request["fir_number"])
+    except Exception:
+        logger.exception("Could not give back FIR number %s of job %s", request.get("fir_number"), job_id)
+
+def draft_local_fir(case_description, relevant_sections, user_inputs, fir_number=None, registration_date=None):
+    """Draft the FIRDocument from a template, without the LLM"""
+    if fir_number is None:
+        fir_number, registration_date = new_fir_number()
+    with metrics.span("local_draft"):
+        return draft_fir(case_description, relevant_sections, user_inputs, get_section_table(),
+                         fir_number, registration_date)
+
+def draft_local_analysis(relevant_sections):
+    """A CaseAnalysis listing the sections with their offenses and punishments, without the LLM"""
+    return draft_analysis(relevant_sections, get_section_table())
+
+def _completion_kwargs(prompt, json_mode=False):
+    kwargs = dict(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS
+    )
+    if json_mode:
+        # The API then only returns syntactically valid JSON
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+def _sync_client(override):
+    return ResilientClient(override if override is not None else get_client(), llm_policy)
+
+def _async_client(override):
+    return AsyncResilientClient(override if override is not None else get_async_client(), llm_policy)
+
+def error_message(error):
+    """The text shown in place of a completion that failed"""
+    if isinstance(error, CircuitOpenError) or is_rate_limited(error):
+        return BUSY_MESSAGE
+    return API_ERROR_MESSAGE
+
+def _served_by(response):
+    # The model that actually answered, which differs from MODEL after a fallback
+    return getattr(response, "model", None) or MODEL
+
+def _cache_key(kwargs):
+    return make_key(kwargs["model"], kwargs["temperature"], kwargs["messages"])
+
+def _cached(kwargs, call):
+    if completion_cache is None:
+        return None, None
+    with metrics.span("llm_cache", call=call) as span:
+        key = _cache_key(kwargs)
+        content = completion_cache.get(key)
+        span.set(hit=content is not None)
+    metrics.increment("fir_llm_cache_lookups_total", call=call, result="miss" if content is None else "hit")
+    return key, content
+
+def _store(key, content, model=MODEL):
+    # Fallback answers are not cached, so the primary model is asked again next time
+    if completion_cache is not None and content and model == MODEL:
+        completion_cache.set(key, content)
+
+def _llm_span(call):
+    # One stage per call type, so the analysis and FIR completions can be told apart
+    return metrics.span(f"llm_{call}", model=MODEL)
+
+def complete(prompt, client=None, call="completion", json_mode=False):
+    """Return the completion text for prompt, from the cache when possible; API errors propagate"""
+    kwargs = _completion_kwargs(prompt, json_mode)
+    key, content = _cached(kwargs, call)
+    if content is None:
+        with _llm_span(call) as span:
+            completion = _sync_client(client).chat.completions.create(**kwargs)
+            span.set(served_by=_served_by(completion),
+                     **metrics.record_usage(getattr(completion, "usage", None), _served_by(completion), call))
+        content = completion.choices[0].message.content
+        _store(key, content, _served_by(completion))
+    return content
+
+def complete_analysis(case_description, relevant_sections, client=None):
+    """Return the CaseAnalysis from the LLM; API errors propagate"""
+    prompt = build_analysis_prompt(case_description, relevant_sections)
+    return CaseAnalysis.from_completion(complete(prompt, client, "analysis", json_mode=True))
+
+def complete_fir(case_description, relevant_sections, user_inputs, fir_number, registration_date, client=None):
+    """Return the FIRDocument from the LLM; API errors propagate"""
+    complaint = Complaint.coerce(user_inputs, case_description)
+    prompt = build_fir_prompt(case_description, relevant_sections, complaint)
+    content = complete(prompt, client, "fir", json_mode=True)
+    return FIRDocument.from_completion(content, complaint, fir_number, registration_date)
 
 def get_sections_and_analysis(case_description):
-    """Get relevant sections and analysis for the case description"""
+    """Get relevant sections and the CaseAnalysis for the case description"""
     relevant_sections = get_relevant_sections(case_description)
     
-    sections_prompt = f"""
-    You are a legal expert specializing in Indian criminal law. Based on the following case description, provide a comprehensive list of all possible relevant sections from the Indian Penal Code (IPC) and other applicable acts.
-
-    Case Description: {case_description}
-
-    Initial Relevant Sections from Analysis:
-    {relevant_sections}
-
-    Please provide:
-    1. A complete list of applicable sections with brief explanations of why each section applies
-    2. Any additional sections that might be relevant but weren't in the initial analysis
-    3. A detailed legal analysis of the case considering:
-       - Primary offenses
-       - Secondary or related offenses
-       - Aggravating factors
-       - Procedural considerations
-       - Potential defenses
-
-    Format your response as:
-    APPLICABLE SECTIONS:
-    Section [Number] - [Brief explanation of relevance]
-    
-    CASE ANALYSIS:
-    [Detailed analysis of the legal aspects of the case]
-    
-    INVESTIGATION RECOMMENDATIONS:
-    [Suggestions for evidence collection and next steps]
-    """
-    
     try:
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "You are a legal assistant specializing in Indian criminal law."},
-                {"role": "user", "content": sections_prompt}
-            ],
-            temperature=0.5,
-            max_tokens=2000
-        )
-        return relevant_sections, completion.choices[0].message.content
+        return relevant_sections, complete_analysis(case_description, relevant_sections)
     except Exception as e:
         # Fallback in case of API error
-        print(f"Error calling Groq API: {e}")
-        return relevant_sections, "API error occurred. Please try again later."
-
-def generate_fir_structure(case_description, relevant_sections, user_inputs):
-    """Generate a structured FIR based on case description and user inputs"""
-    # Generate a random FIR number
-    current_year = datetime.now().year
-    fir_number = f"{random.randint(1, 999)}/{current_year}"
-    
-    prompt = f"""
-    You are a senior police officer with expertise in drafting First Information Reports (FIRs) in India. 
-    Based on the following information, generate a professionally formatted FIR document.
+        logger.warning("Error calling Groq API: %r", e)
+        return relevant_sections, CaseAnalysis.error(error_message(e))
 
-    CASE DESCRIPTION:
-    {case_description}
+def generate_fir_structure(case_description, relevant_sections, user_inputs, fir_number=None, registration_date=None):
+    """Generate the FIRDocument for the case description and user inputs"""
+    if fir_number is None:
+        fir_number, registration_date = new_fir_number()
+    
+    try:
+        return complete_fir(case_description, relevant_sections, user_inputs, fir_number, registration_date)
+    except Exception as e:
+        # Fall back to the template draft, so the officer still gets a usable FIR
+        logger.warning("Error calling Groq API: %r", e)
+        return draft_local_fir(case_description, relevant_sections, user_inputs, fir_number, registration_date)
 
-    RELEVANT SECTIONS:
-    {relevant_sections}
+def _stream_usage(chunk):
+    # Groq reports usage on the last streamed chunk, under x_groq
+    return getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
 
-    USER INPUTS:
-    {user_inputs}
+async def _stream_async(kwargs, client, call, span, on_text):
+    """Stream a completion, passing the text so far to on_text as it grows; return (text, model that answered)"""
+    parts, served_by = [], MODEL
+    start = time.perf_counter()
+    async for chunk in await client.chat.completions.create(**kwargs, stream=True):
+        served_by = _served_by(chunk)
+        usage = _stream_usage(chunk)
+        if usage is not None:
+            span.set(**metrics.record_usage(usage, served_by, call))
+        if chunk.choices and chunk.choices[0].delta.content:
+            if not parts:
+                span.set(first_token_ms=round((time.perf_counter() - start) * 1000, 3))
+            parts.append(chunk.choices[0].delta.content)
+            on_text("".join(parts))
+    span.set(served_by=served_by)
+    return "".join(parts), served_by
 
-    FIR NUMBER: {fir_number}
-    REGISTRATION DATE: {datetime.now().strftime('%d-%m-%Y')}
+async def _complete_async(prompt, timeout, client, call, on_text=None):
+    # Groq's JSON mode cannot stream, so a streamed completion relies on the prompt asking for JSON
+    kwargs = _completion_kwargs(prompt, json_mode=on_text is None)
+    key, content = _cached(kwargs, call)
+    if content is None:
+        with _llm_span(call) as span:
+            if on_text is not None:
+                content, served_by = await asyncio.wait_for(_stream_async(kwargs, client, call, span, on_text), timeout)
+            else:
+                completion = await asyncio.wait_for(client.chat.completions.create(**kwargs), timeout)
+                served_by = _served_by(completion)
+                span.set(served_by=served_by,
+                         **metrics.record_usage(getattr(completion, "usage", None), served_by, call))
+                content = completion.choices[0].message.content
+        _store(key, content, served_by)
+    elif on_text is not None:
+        on_text(content)
+    return content
 
-    Please format the FIR with the following sections:
+async def get_sections_and_analysis_async(case_description, relevant_sections=None, timeout=DEFAULT_TIMEOUT, client=None,
+                                         on_text=None):
+    """Async get_sections_and_analysis; pass relevant_sections to skip retrieval. With on_text the
+    completion is streamed, and on_text(text) is called with the reply so far as each piece arrives"""
+    if relevant_sections is None:
+        relevant_sections = get_relevant_sections(case_description)
+    sections_prompt = build_analysis_prompt(case_description, relevant_sections)
     
-    FIRST INFORMATION REPORT
-    
-    1. FIR Number and Registration Details
-    2. Date, Time and Place of Occurrence
-    3. Information Received At Police Station (use current date/time)
-    4. Type of Information: Written/Oral
-    5. Complainant Details (name, address, contact)
-    6. Details of Known/Unknown Accused
-    7. Reasons for delay in reporting (if applicable)
-    8. Particulars of properties stolen (if applicable)
-    9. Description of the Incident (detailed facts)
-    10. Sections of Law Applied
-    11. Action Taken (initial steps)
-    12. Signature/Thumb Impression of Complainant
-    13. Officer Details (use "Investigating Officer, [Police Station Name]")
-
-    Format the FIR in a clear, professional manner suitable for official police records. Use formal language appropriate for legal documents.
-    """
+    try:
+        content = await _complete_async(sections_prompt, timeout, _async_client(client), "analysis", on_text)
+        return relevant_sections, CaseAnalysis.from_completion(content)
+    except Exception as e:
+        # Timeouts land here too; cancellation propagates to the caller
+        logger.warning("Error calling Groq API: %r", e)
+        return relevant_sections, CaseAnalysis.error(error_message(e))
+
+async def generate_fir_structure_async(case_description, relevant_sections, user_inputs, timeout=DEFAULT_TIMEOUT, client=None,
+                                       fir_number=None, registration_date=None, on_text=None):
+    """Async generate_fir_structure; with on_text the completion is streamed, and on_text(text) is
+    called with the reply so far as each piece arrives"""
+    if fir_number is None:
+        fir_number, registration_date = new_fir_number()
+    complaint = Complaint.coerce(user_inputs, case_description)
+    prompt = build_fir_prompt(case_description, relevant_sections, complaint)
     
     try:
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "You are a legal assistant specializing in Indian criminal law."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=2000
-        )
-        return completion.choices[0].message.content
+        content = await _complete_async(prompt, timeout, _async_client(client), "fir", on_text)
+        return FIRDocument.from_completion(content, complaint, fir_number, registration_date)
     except Exception as e:
-        # Fallback in case of API error
-        print(f"Error calling Groq API: {e}")
-        return "API error occurred. Please try again later."
\ No newline at end of file
+        logger.warning("Error calling Groq API: %r", e)
+        return draft_local_fir(case_description, relevant_sections, user_inputs, fir_number, registration_date)
+
+class CompletionStream:
+    """A completion's text as it is generated, from iterating over it; then result is the parsed record.
+
+    start(on_text) is the coroutine doing the completion. It runs on the shared
+    event loop, so the stream uses the async client and its connection pool;
+    leaving the iteration early cancels it. A cached reply arrives as one piece.
+    When the API fails, nothing is yielded and result is the fallback record.
+    """
+
+    def __init__(self, start):
+        self._start = start
+        self.result = None
+
+    def __iter__(self):
+        texts = queue.Queue()
+        future = submit_async(self._start(texts.put))
+        future.add_done_callback(lambda _: texts.put(None))
+        shown = ""
+        try:
+            while (text := texts.get()) is not None:
+                if len(text) > len(shown):
+                    yield text[len(shown):]
+                    shown = text
+            self.result = future.result()
+        finally:
+            future.cancel()
+
+def stream_sections_and_analysis(case_description, relevant_sections, client=None, timeout=DEFAULT_TIMEOUT):
+    """Stream the case analysis for already-retrieved sections; the CaseAnalysis is the stream's result"""
+    async def start(on_text):
+        _, analysis = await get_sections_and_analysis_async(case_description, relevant_sections, timeout, client,
+                                                            on_text)
+        return analysis
+    return CompletionStream(start)
+
+def stream_fir_structure(case_description, relevant_sections, user_inputs, client=None, fir_number=None,
+                         registration_date=None, timeout=DEFAULT_TIMEOUT):
+    """Stream the FIR's JSON as it is generated; the FIRDocument (the template draft if the API fails) is the result"""
+    if fir_number is None:
+        fir_number, registration_date = new_fir_number()
+    return CompletionStream(lambda on_text: generate_fir_structure_async(
+        case_description, relevant_sections, user_inputs, timeout, client, fir_number, registration_date, on_text))
+
+async def generate_all(case_description, user_inputs, timeout=DEFAULT_TIMEOUT, client=None):
+    """Retrieve sections once, then run the analysis and FIR completions concurrently"""
+    relevant_sections = get_relevant_sections(case_description)
+    # The FIR prompt only needs the retrieved sections, not the analysis, so both can start together
+    (sections, analysis), fir_structure = await asyncio.gather(
+        get_sections_and_analysis_async(case_description, relevant_sections, timeout, client),
+        generate_fir_structure_async(case_description, relevant_sections, user_inputs, timeout, client),
+    )
+    return {
+        'fir_structure': fir_structure,
+        'sections': sections,
+        'analysis': analysis
+    }
+
+# One event loop per process runs every async call, so async_client keeps its connection pool
+_loop = None
+_loop_lock = threading.Lock()
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="groq-async", daemon=True).start()
+    return _loop
+
+def submit_async(coro):
+    """Start a coroutine on the shared background loop and return its concurrent.futures.Future"""
+    trace = metrics.current_trace()
+    if trace is not None:
+        # The loop runs in another thread, so hand the caller's request trace over explicitly
+        coro = metrics.carry_trace(coro, trace)
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop())
+
+def run_async(coro, timeout=None):
+    """Run a coroutine on the shared background loop and block until it finishes"""
+    future = submit_async(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        # Timed out, or the calling script was stopped: cancel the in-flight completions
+        future.cancel()
+        raise
+
+def fir_job_request(complaint, relevant_sections, fir_number, registration_date):
+    """The JSON-serialisable inputs of a FIR generation job"""
+    return {
+        "complaint": complaint.to_dict(),
+        "sections": relevant_sections,
+        "fir_number": fir_number,
+        "registration_date": registration_date,
+    }
+
+def run_fir_job(request, analysis_future=None, report=None):
+    """Generate the FIR and case analysis for a job request and return the job result.
+
+    analysis_future is a (sections, analysis) completion already in flight for
+    the same inputs, such as the AnalysisPrefetcher's.
+    """
+    report = report or (lambda stage, progress, partial=None: None)
+    complaint = Complaint.from_dict(request["complaint"])
+    case_description, sections = complaint.case_description, request["sections"]
+    fir_number, registration_date = request["fir_number"], request["registration_date"]
+    # Both completions stream, unless the analysis was already started elsewhere
+    streamed = {}
+    if analysis_future is None:
+        analysis_future = submit_async(get_sections_and_analysis_async(
+            case_description, sections, on_text=lambda text: streamed.update(analysis=text)
+        ))
+    fir_future = submit_async(generate_fir_structure_async(
+        case_description, sections, complaint, fir_number=fir_number, registration_date=registration_date,
+        on_text=lambda text: streamed.update(fir=text)
+    ))
+    draft = draft_local_fir(case_description, sections, complaint, fir_number, registration_date).to_dict()
+    analysis_draft = draft_local_analysis(sections).to_dict()
+    shown_stage = shown_partial = None
+    try:
+        pending = {fir_future, analysis_future}
+        while pending:
+            if fir_future.done():
+                stage = "FIR drafted; finishing the case analysis"
+            elif analysis_future.done():
+                stage = "Case analysis ready; drafting the FIR"
+            else:
+                stage = "Drafting the FIR and case analysis"
+            progress = 0.1 if len(pending) == 2 else 0.5
+            # The template drafts, with the fields the model has written so far (or its finished
+            # record). Reported from this thread, so the event loop never waits on the job store
+            texts, partial = dict(streamed), {}
+            if fir_future.done():
+                partial["fir_structure"] = fir_future.result().to_dict()
+            elif "fir" in texts:
+                partial["fir_structure"] = FIRDocument.from_dict(draft).fill(load_partial_json(texts["fir"])).to_dict()
+            if analysis_future.done():
+                partial["analysis"] = analysis_future.result()[1].to_dict()
+            elif "analysis" in texts:
+                partial["analysis"] = CaseAnalysis.from_dict(analysis_draft).fill(
+                    load_partial_json(texts["analysis"])).to_dict()
+            changed = partial != shown_partial
+            if (stage, progress) != shown_stage or changed:
+                shown_stage, shown_partial = (stage, progress), partial
+                report(stage, progress, partial if changed and partial else None)
+            _, pending = wait(pending, STREAM_UPDATE_INTERVAL, FIRST_COMPLETED)
+        fir_structure = fir_future.result()
+        sections, analysis = analysis_future.result()
+    except BaseException:
+        analysis_future.cancel()
+        fir_future.cancel()
+        raise
+    return {
+        "fir_structure": fir_structure.to_dict(),
+        "sections": sections,
+        "analysis": analysis.to_dict(),
+        # The template draft is returned instead when the API is unavailable
+        "source": fir_structure.source,
+    }
+
+class AnalysisPrefetcher:
+    """Starts the analysis completion in the background once a case description stops changing.
+
+    schedule() is called on every edit and restarts the delay; take() hands
+    the in-flight completion to the caller when the description and sections
+    are still the ones it was started for.
+    """
+
+    def __init__(self, delay=PREFETCH_DELAY):
+        self.delay = delay
+        self._key = None
+        self._timer = None
+        self._future = None
+        self._lock = threading.Lock()
+
+    def schedule(self, case_description, relevant_sections):
+        key = (case_description, tuple(relevant_sections))
+        with self._lock:
+            if self.delay <= 0 or key == self._key or not case_description.strip():
+                return
+            self._cancel()
+            self._key = key
+            self._timer = threading.Timer(self.delay, self._start, (key, case_description, relevant_sections))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _start(self, key, case_description, relevant_sections):
+        with self._lock:
+            if key != self._key:
+                return
+            self._timer = None
+            self._future = submit_async(get_sections_and_analysis_async(case_description, relevant_sections))
+        metrics.increment("fir_prefetch_total", result="started")
+
+    def take(self, case_description, relevant_sections):
+        """Return the prefetched (sections, analysis) future for exactly these inputs, or None"""
+        with self._lock:
+            future = self._future if self._key == (case_description, tuple(relevant_sections)) else None
+            if future is not None and future.done() and not future.cancelled() \
+                    and future.result()[1].source == "error":
+                # A failed prefetch is retried by the caller rather than shown
+                future = None
+            if future is None:
+                self._cancel()
+            self._key = self._future = None
+        metrics.increment("fir_prefetch_total", result="hit" if future is not None else "miss")
+        return future
+
+    def cancel(self):
+        with self._lock:
+            self._cancel()
+            self._key = None
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._future is not None and not self._future.done():
+            self._future.cancel()
+        self._timer = self._future = None
+
+def _cache_stats():
+    if completion_cache is None:
+        return {}
+    stats = completion_cache.stats()
+    values = {(("stat", "hits"), ("tier", tier)): hits for tier, hits in stats["hits"].items()}
+    values[(("stat", "misses"),)] = stats["misses"]
+    values[(("stat", "hit_rate"),)] = stats["hit_rate"]
+    return values
+
+metrics.register_gauge("fir_llm_cache", "Completion cache hits per tier, misses and hit rate", _cache_stats)
+metrics.register_gauge("fir_jobs", "FIR generation jobs per status",
+                       lambda: {(("status", status),): count for status, count in job_queue.counts().items()}
+                       if job_queue is not None else {})
+metrics.register_gauge("fir_llm_circuit_state", "Circuit breaker state per model: 0 closed, 1 half-open, 2 open",
+                       lambda: llm_policy.breaker_states())
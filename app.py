@@ -1,103 +1,189 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import base64
-from fpdf import FPDF
-import tempfile
 import os
-from ai_model import get_sections_and_analysis, generate_fir_structure
+import io
+import gzip
+import json
+from html import escape
+import metrics
+from fir_document import CaseAnalysis, Complaint, FIRDocument
+from pdf_report import create_pdf, pdf_to_bytes
+from ai_model import (
+    LOCAL_ONLY, AnalysisPrefetcher, draft_local_analysis, draft_local_fir, fir_job_request, get_archive,
+    get_job_queue, get_relevant_sections, get_section_table, live_query, new_fir_number, release_fir_number,
+    update_live_query, warm_up
+)
+from jobs import FAILED
 
-# Load the dataset
-df = pd.read_csv('fir_sections.csv')
+# Optional Prometheus scrape endpoint and textfile export for the pipeline metrics
+if os.environ.get("FIR_METRICS_PORT"):
+    metrics.start_http_server(int(os.environ["FIR_METRICS_PORT"]))
+METRICS_FILE = os.environ.get("FIR_METRICS_FILE")
 
-def create_pdf(fir_content, sections, analysis):
-    """Create a PDF document with FIR content, relevant sections, and analysis"""
-    pdf = FPDF()
-    
-    # Configure PDF
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "FIRST INFORMATION REPORT (FIR)", ln=True, align="C")
-    pdf.line(10, 22, 200, 22)
-    pdf.ln(5)
-    
-    # FIR Content - process text to handle special characters
-    pdf.set_font("Arial", "", 12)
-    
-    # Process and clean the text to avoid encoding issues
-    clean_content = fir_content.replace('"', '"').replace('"', '"').replace("'", "'").replace("'", "'")
-    
-    # Split the content by lines and add to PDF
-    lines = clean_content.split('\n')
-    for line in lines:
-        if line.strip():
-            if ":" in line:
-                parts = line.split(":", 1)
-                if len(parts) == 2:
-                    pdf.set_font("Arial", "B", 12)
-                    pdf.cell(60, 10, parts[0].strip() + ":", 0, 0)
-                    pdf.set_font("Arial", "", 12)
-                    pdf.multi_cell(0, 10, parts[1].strip())
-                else:
-                    pdf.multi_cell(0, 10, line)
-            else:
-                if line.strip().isupper():
-                    pdf.set_font("Arial", "B", 14)
-                    pdf.ln(5)
-                    pdf.cell(0, 10, line.strip(), ln=True)
-                    pdf.ln(2)
-                else:
-                    pdf.set_font("Arial", "", 12)
-                    pdf.multi_cell(0, 10, line)
-    
-    # Relevant Sections - with sanitized text
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "RELEVANT SECTIONS", ln=True)
-    pdf.line(10, 22, 200, 22)
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", "", 12)
-    for section, description in sections.items():
-        # Clean text to avoid encoding issues
-        clean_section = str(section).encode('latin-1', 'replace').decode('latin-1')
-        clean_desc = str(description).encode('latin-1', 'replace').decode('latin-1')
-        
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, f"Section: {clean_section}", ln=True)
-        pdf.set_font("Arial", "", 12)
-        pdf.multi_cell(0, 10, clean_desc)
-        pdf.ln(5)
-    
-    # Case Analysis - with sanitized text
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "CASE ANALYSIS", ln=True)
-    pdf.line(10, 22, 200, 22)
-    pdf.ln(5)
-    
-    # Clean analysis text to avoid encoding issues
-    clean_analysis = str(analysis).encode('latin-1', 'replace').decode('latin-1')
-    
-    pdf.set_font("Arial", "", 12)
-    pdf.multi_cell(0, 10, clean_analysis)
-    
-    return pdf
+# Seconds between checks on a FIR that is still being generated, and updates of it as it streams in
+JOB_POLL_INTERVAL = 0.5
+
+# FIRs per page of archive search results
+ARCHIVE_PAGE_SIZE = 20
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Start loading the section index and API clients once per process, while the first page renders"""
+    return warm_up()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_pdf(fir_json, sections, analysis_json):
+    """Build the PDF bytes for a FIR from its JSON; memoised so reruns and repeat downloads reuse them"""
+    fir = FIRDocument.from_dict(json.loads(fir_json))
+    analysis = CaseAnalysis.from_dict(json.loads(analysis_json))
+    return pdf_to_bytes(create_pdf(fir, sections, analysis))
+
+def get_download_button(fir_data, filename="FIR_Report.pdf"):
+    """Show a download button for the FIR PDF; the PDF is only built when it is clicked"""
+    with metrics.span("download_button"):
+        return st.download_button(
+            "Download FIR as PDF",
+            data=lambda: render_pdf(fir_data['fir_structure'].to_json(), fir_data['sections'],
+                                    fir_data['analysis'].to_json()),
+            file_name=filename,
+            mime="application/pdf",
+            on_click="ignore"
+        )
+
+def blocks_html(document):
+    """Render a FIRDocument or CaseAnalysis as HTML, one element per block"""
+    parts = []
+    for kind, *values in document.blocks():
+        values = [escape(value).replace("\n", "<br>") for value in values]
+        if kind == 'heading':
+            parts.append(f'<h4 style="color: #000000; margin: 1rem 0 0.3rem;">{values[0]}</h4>')
+        elif kind == 'field':
+            parts.append(f'<b>{values[0]}:</b> {values[1]}<br>')
+        else:
+            parts.append(f'<p style="margin: 0.2rem 0;">{values[0]}</p>')
+    return f'<div style="line-height: 1.6; font-size: 1.05rem; color: #000000;">{"".join(parts)}</div>'
+
+def open_job(job_id):
+    """Show a job on the results page; its id goes in the URL so a refresh or bookmark reopens it"""
+    st.session_state.job_id = job_id
+    st.query_params["job"] = job_id
+    st.session_state.page = 'result'
 
-def get_download_link(pdf, filename="FIR_Report.pdf"):
-    """Generate a download link for the PDF file"""
+def close_job():
+    st.session_state.job_id = None
+    st.query_params.pop("job", None)
+
+def job_draft(job):
+    """The FIR streamed so far for a running job, or until it starts the template draft for its request"""
+    if job.partial and 'fir_structure' in job.partial:
+        return FIRDocument.from_dict(job.partial['fir_structure'])
+    request = job.request
+    complaint = Complaint.from_dict(request['complaint'])
+    return draft_local_fir(complaint.case_description, request['sections'], complaint,
+                           request['fir_number'], request['registration_date'])
+
+def fir_data(result):
+    """A finished job's (or archived FIR's) result, in the shape the results page and PDF export expect"""
+    return {
+        'fir_structure': FIRDocument.from_dict(result['fir_structure']),
+        'sections': result['sections'],
+        'analysis': CaseAnalysis.from_dict(result['analysis']),
+        'source': result['source']
+    }
+
+def open_archived(fir_id):
+    """Show an archived FIR; its id goes in the URL like a job's"""
+    st.session_state.archive_id = fir_id
+    st.query_params["fir"] = str(fir_id)
+    st.session_state.page = 'archived'
+
+def export_archive(filters):
+    """Every archived FIR matching filters as gzipped JSON lines, streamed from the archive page by page"""
+    buffer = io.BytesIO()
+    with gzip.open(buffer, "wt", encoding="utf-8") as out:
+        get_archive().export(out, **filters)
+    return buffer.getvalue()
+
+def show_fir(data, caption):
+    """The FIR, its PDF download, sections and analysis"""
+    st.markdown('<div class="section-card">', unsafe_allow_html=True)
+    st.header("📄 Generated FIR")
+    if data.get('source') == 'local':
+        st.info("This FIR was filled in from a template without the AI assistant. Please review it before registering.")
+    st.markdown(blocks_html(data['fir_structure']), unsafe_allow_html=True)
+    st.caption(caption)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # PDF download button
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            pdf.output(tmp.name)
-            with open(tmp.name, "rb") as f:
-                pdf_data = f.read()
-        
-        b64_pdf = base64.b64encode(pdf_data).decode('utf-8')
-        href = f'<a href="data:application/pdf;base64,{b64_pdf}" download="{filename}" class="download-button">Download FIR as PDF</a>'
-        return href
+        st.markdown('<div style="text-align: center;">', unsafe_allow_html=True)
+        with metrics.trace(st.session_state.trace):
+            get_download_button(data)
+        st.markdown('</div>', unsafe_allow_html=True)
     except Exception as e:
-        st.error(f"Error generating PDF: {str(e)}")
-        return ""
+        st.error(f"Unable to generate PDF: {str(e)}")
+
+    with st.expander("📚 Relevant Sections", expanded=False):
+        for section, description in data['sections'].items():
+            st.markdown(f'<div class="section-card"><h3 style="color: #000000;">Section: {section}</h3><p style="font-size: 1.05rem; line-height: 1.5; color: #000000;">{description}</p></div>', unsafe_allow_html=True)
+
+    with st.expander("🔎 Case Analysis", expanded=False):
+        st.markdown(f'<div class="analysis-card">{blocks_html(data["analysis"])}</div>', unsafe_allow_html=True)
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def job_progress(job_id):
+    """Poll a job that is still running, showing the FIR and analysis as they stream in, and rerun the page once it has finished"""
+    job = get_job_queue().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(min(max(job.progress, 0.0), 1.0), text=job.stage)
+    st.markdown(blocks_html(job_draft(job)), unsafe_allow_html=True)
+    if job.partial and 'analysis' in job.partial:
+        with st.expander("🔎 Case Analysis", expanded=True):
+            analysis = CaseAnalysis.from_dict(job.partial['analysis'])
+            st.markdown(f'<div class="analysis-card">{blocks_html(analysis)}</div>', unsafe_allow_html=True)
+
+@st.fragment
+def case_description_panel():
+    """The case description box with live suggested sections; editing it reruns only this fragment"""
+    case_description = st.text_area(
+        "Enter the detailed facts of the case:",
+        placeholder="Provide detailed facts of the incident",
+        height=200,
+        key="case_description"
+    )
+    if 'live_query' not in st.session_state:
+        st.session_state.live_query = live_query()
+    sections = update_live_query(st.session_state.live_query, case_description)
+    # Reused by Generate FIR when the description hasn't changed since
+    st.session_state.live_sections = (case_description, sections)
+
+    st.markdown("**💡 Suggested sections**")
+    if sections:
+        table = get_section_table()
+        st.markdown("\n".join(f"- {table.describe(section)}" for section in sections))
+    elif case_description.strip():
+        st.caption("No sections match yet; add more detail about what happened.")
+    else:
+        st.caption("Relevant sections are suggested here as you describe the case.")
+
+    if not st.session_state.get('local_only'):
+        # Once the description settles, the analysis starts in the background
+        st.session_state.prefetcher.schedule(case_description, sections)
+
+def dev_panel_enabled():
+    """The developer panel is shown with FIR_DEV_PANEL=1 or ?dev=1 in the URL"""
+    return os.environ.get("FIR_DEV_PANEL") == "1" or st.query_params.get("dev") == "1"
+
+def show_dev_panel(trace):
+    """Show the per-stage timings of the current request and the aggregate metrics"""
+    with st.expander("🛠️ Pipeline Timings", expanded=False):
+        if trace:
+            columns = list(dict.fromkeys(key for span in trace for key in span))
+            st.dataframe([{key: str(span.get(key, "")) for key in columns} for span in trace], hide_index=True)
+        else:
+            st.info("No timings recorded for this request.")
+        st.code(metrics.prometheus_text(), language="text")
 
 def get_css():
     """Return the CSS for styling the app"""
@@ -204,7 +290,7 @@ def get_css():
         border-left: 5px solid #000000;
     }
     
-    .download-button {
+    .stDownloadButton>button {
         display: inline-block;
         background-color: #1e3a8a;
         color: white !important;
@@ -265,6 +351,8 @@ def main():
         initial_sidebar_state="collapsed"
     )
 
+    start_warm_up()
+
     # Apply CSS styling
     st.markdown(get_css(), unsafe_allow_html=True)
     
@@ -278,8 +366,24 @@ def main():
     if 'page' not in st.session_state:
         st.session_state.page = 'home'
     
-    if 'fir_data' not in st.session_state:
-        st.session_state.fir_data = None
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = None
+        # A refreshed or bookmarked results page reopens its job
+        if st.query_params.get("job"):
+            st.session_state.job_id = st.query_params["job"]
+            st.session_state.page = 'result'
+
+    if 'archive_id' not in st.session_state:
+        st.session_state.archive_id = None
+        if st.query_params.get("fir", "").isdigit():
+            st.session_state.archive_id = int(st.query_params["fir"])
+            st.session_state.page = 'archived'
+
+    if 'trace' not in st.session_state:
+        st.session_state.trace = []
+
+    if 'prefetcher' not in st.session_state:
+        st.session_state.prefetcher = AnalysisPrefetcher()
 
     # Home Page
     if st.session_state.page == 'home':
@@ -295,6 +399,13 @@ def main():
             if st.button("📝 Start New FIR"):
                 st.session_state.page = 'query'
                 st.rerun()
+            job_id = st.text_input("Reopen an earlier FIR", placeholder="Job id shown under the FIR")
+            if job_id.strip() and st.button("📂 Reopen FIR"):
+                open_job(job_id.strip())
+                st.rerun()
+            if st.button("🗂️ Search FIR Archive"):
+                st.session_state.page = 'archive'
+                st.rerun()
 
     # Query Form Page
     elif st.session_state.page == 'query':
@@ -333,44 +444,62 @@ def main():
         
         st.markdown('<div class="form-section">', unsafe_allow_html=True)
         st.markdown('<div class="form-section-title">📝 Case Description</div>', unsafe_allow_html=True)
-        case_description = st.text_area(
-            "Enter the detailed facts of the case:",
-            placeholder="Provide detailed facts of the incident",
-            height=200
-        )
+        case_description_panel()
+        case_description = st.session_state.case_description
+        local_only = st.checkbox("Offline draft only (fill the FIR from a template, without the AI assistant)",
+                                 value=LOCAL_ONLY, key="local_only")
         st.markdown('</div>', unsafe_allow_html=True)
         
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🔍 Generate FIR"):
                 if case_description:
-                    with st.spinner("Generating FIR... This may take a moment."):
-                        user_inputs = f"""
-                        Date of Incident: {date_of_incident}
-                        Time of Incident: {time_of_incident}
-                        Place of Occurrence: {place_of_occurrence}
-                        Nature of Offense: {nature_of_offense}
-                        Complainant Name: {complainant_name}
-                        Complainant Contact: {complainant_contact}
-                        Complainant Address: {complainant_address}
-                        Complainant ID: {complainant_id}
-                        Accused Name: {accused_name}
-                        Accused Address: {accused_address}
-                        Accused Description: {accused_description}
-                        """
-
-                        sections, analysis = get_sections_and_analysis(case_description)
-                        fir_structure = generate_fir_structure(case_description, sections, user_inputs)
-                        
-                        # Store the generated data
-                        st.session_state.fir_data = {
-                            'fir_structure': fir_structure,
-                            'sections': sections,
-                            'analysis': analysis
-                        }
-                        
-                        st.session_state.page = 'result'
-                        st.rerun()
+                    complaint = Complaint(
+                        case_description,
+                        date_of_incident=str(date_of_incident),
+                        time_of_incident=str(time_of_incident),
+                        place_of_occurrence=place_of_occurrence,
+                        nature_of_offense=nature_of_offense,
+                        complainant_name=complainant_name,
+                        complainant_contact=complainant_contact,
+                        complainant_address=complainant_address,
+                        complainant_id=complainant_id,
+                        accused_name=accused_name,
+                        accused_address=accused_address,
+                        accused_description=accused_description
+                    )
+
+                    # Retrieval is quick; the completions run as a background job
+                    st.session_state.trace = []
+                    fir_number, registration_date = new_fir_number()
+                    live_description, live_sections = st.session_state.get('live_sections', (None, None))
+                    try:
+                        with metrics.trace(st.session_state.trace):
+                            if live_description == case_description:
+                                sections = live_sections
+                            else:
+                                sections = get_relevant_sections(case_description)
+                            request = fir_job_request(complaint, sections, fir_number, registration_date)
+                            if local_only:
+                                st.session_state.prefetcher.cancel()
+                                draft = draft_local_fir(case_description, sections, complaint, fir_number,
+                                                        registration_date)
+                                job_id = get_job_queue().record(request, {
+                                    'fir_structure': draft.to_dict(),
+                                    'sections': sections,
+                                    'analysis': draft_local_analysis(sections).to_dict(),
+                                    'source': 'local'
+                                })
+                            else:
+                                # The analysis usually started already, while the officer was filling in the form
+                                analysis_future = st.session_state.prefetcher.take(case_description, sections)
+                                job_id = get_job_queue().submit(request, analysis_future)
+                    except Exception:
+                        # No FIR was registered under the number; a failed job gives its number back itself
+                        release_fir_number(fir_number)
+                        raise
+                    open_job(job_id)
+                    st.rerun()
                 else:
                     st.warning("Please enter a case description.")
         with col2:
@@ -379,42 +508,134 @@ def main():
                 st.rerun()
     
     # Results Page
-    elif st.session_state.page == 'result' and st.session_state.fir_data:
-        data = st.session_state.fir_data
-        
-        st.markdown('<div class="section-card">', unsafe_allow_html=True)
-        st.header("📄 Generated FIR")
-        st.markdown(f'<div style="line-height: 1.6; font-size: 1.05rem; color: #000000;">{data["fir_structure"].replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Create PDF and download button
-        try:
-            pdf = create_pdf(data['fir_structure'], data['sections'], data['analysis'])
-            st.markdown('<div style="text-align: center;">', unsafe_allow_html=True)
-            st.markdown(get_download_link(pdf), unsafe_allow_html=True)
+    elif st.session_state.page == 'result':
+        job = get_job_queue().get(st.session_state.job_id) if st.session_state.job_id else None
+
+        if job is None:
+            st.error("This FIR could not be found. Jobs are kept only while the server runs, "
+                     "unless FIR_JOBS_DB is set; finished FIRs can be found in the FIR archive.")
+        elif not job.finished:
+            # The completions run in a worker; this page only polls, so a refresh loses nothing
+            st.markdown('<div class="section-card">', unsafe_allow_html=True)
+            st.header("📄 Generated FIR")
+            st.caption("Template draft shown; the AI assistant's version fills it in as it is written.")
+            job_progress(job.id)
             st.markdown('</div>', unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"Unable to generate PDF: {str(e)}")
-        
-        with st.expander("📚 Relevant Sections", expanded=False):
-            for section, description in data['sections'].items():
-                st.markdown(f'<div class="section-card"><h3 style="color: #000000;">Section: {section}</h3><p style="font-size: 1.05rem; line-height: 1.5; color: #000000;">{description}</p></div>', unsafe_allow_html=True)
-        
-        with st.expander("🔎 Case Analysis", expanded=False):
-            st.markdown(f'<div class="analysis-card"><div style="font-size: 1.05rem; line-height: 1.6; color: #000000;">{data["analysis"]}</div></div>', unsafe_allow_html=True)
-        
+        elif job.status == FAILED:
+            st.error(f"The FIR could not be generated: {job.error}")
+            if st.button("🔁 Try Again"):
+                # The failed job gave back its FIR number, so the retry takes a new one
+                fir_number, registration_date = new_fir_number()
+                try:
+                    job_id = get_job_queue().submit(dict(job.request, fir_number=fir_number,
+                                                         registration_date=registration_date))
+                except Exception:
+                    # The retry was never queued, so nothing else will give its number back
+                    release_fir_number(fir_number)
+                    raise
+                open_job(job_id)
+                st.rerun()
+        else:
+            data = fir_data(job.result)
+            if METRICS_FILE:
+                metrics.export(METRICS_FILE)
+            show_fir(data, f"Job {job.id}: bookmark this page to reopen the FIR later. "
+                           "It is also kept in the FIR archive.")
+
+            if dev_panel_enabled():
+                show_dev_panel(st.session_state.trace + job.result.get('trace', []))
+
         st.markdown('<div style="margin-top: 30px;">', unsafe_allow_html=True)
         col1, col2 = st.columns(2)
         with col1:
             if st.button("📝 Create New FIR"):
+                close_job()
                 st.session_state.page = 'query'
                 st.rerun()
         with col2:
             if st.button("🏠 Return to Home"):
+                close_job()
                 st.session_state.page = 'home'
                 st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
     
+    # Archive search page
+    elif st.session_state.page == 'archive':
+        st.markdown('<div class="form-section">', unsafe_allow_html=True)
+        st.markdown('<div class="form-section-title">🗂️ FIR Archive</div>', unsafe_allow_html=True)
+        text = st.text_input("Search", placeholder="Words from the complaint or FIR, e.g. mobile snatched")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            accused = st.text_input("Accused", placeholder="Name or part of it")
+        with col2:
+            place = st.text_input("Place", placeholder="Place of occurrence")
+        with col3:
+            section = st.text_input("Section", placeholder="e.g. IPC 379")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        filters = {"text": text, "accused": accused, "place": place, "section": section}
+        if st.session_state.get('archive_filters') != filters:
+            # Cursors of the pages seen so far, for Previous; a new search starts again at the newest FIR
+            st.session_state.archive_filters = filters
+            st.session_state.archive_cursors = [None]
+        cursors = st.session_state.archive_cursors
+        with metrics.span("archive_search", page=len(cursors)) as span:
+            results = get_archive().search(before=cursors[-1], limit=ARCHIVE_PAGE_SIZE, **filters)
+            span.set(rows=len(results.rows))
+
+        if not results.rows:
+            st.info("No archived FIRs match." if any(filters.values()) else "No FIRs have been archived yet.")
+        for row in results.rows:
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.markdown(f"**FIR {escape(row['fir_number'])}** · {escape(row['registration_date'])} · "
+                            f"{escape(row['place'] or 'place not given')}  \n"
+                            f"Accused: {escape(row['accused'] or 'unknown')} · "
+                            f"Sections: {escape(', '.join(row['sections']) or 'none')}", unsafe_allow_html=True)
+            with col2:
+                if st.button("Open", key=f"open_{row['id']}"):
+                    open_archived(row['id'])
+                    st.rerun()
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if len(cursors) > 1 and st.button("⬅️ Newer"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            if results.cursor is not None and st.button("Older ➡️"):
+                cursors.append(results.cursor)
+                st.rerun()
+        with col3:
+            if results.rows:
+                st.download_button("⬇️ Export matches", data=lambda: export_archive(filters),
+                                   file_name="fir_archive.jsonl.gz", mime="application/gzip", on_click="ignore")
+        if st.button("🏠 Return to Home"):
+            st.session_state.page = 'home'
+            st.rerun()
+
+    # Archived FIR page
+    elif st.session_state.page == 'archived':
+        record = get_archive().get(st.session_state.archive_id) if st.session_state.archive_id else None
+        if record is None:
+            st.error("This FIR is not in the archive.")
+        else:
+            show_fir(fir_data(record['result']),
+                     f"Archived FIR {record['fir_number']} ({record['station']}), registered "
+                     f"{record['registration_date']}. The PDF is generated again from the archived record.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("⬅️ Back to Search"):
+                st.query_params.pop("fir", None)
+                st.session_state.page = 'archive'
+                st.rerun()
+        with col2:
+            if st.button("🏠 Return to Home"):
+                st.query_params.pop("fir", None)
+                st.session_state.page = 'home'
+                st.rerun()
+
     # Close main container
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,228 @@
+"""Generate FIRs in bulk from a CSV or JSONL file of complaints.
+
+Each input row needs a ``case_description`` column (rows without one are
+reported and counted as failed, and the run goes on); an ``id`` column is
+used to identify rows (the row number otherwise) and every other column is
+read into the Complaint (columns the form does not have are passed to the
+model as they are). Results are appended to ``results.jsonl`` in the output
+directory as they complete, with the complaint, FIR and analysis as
+structured objects, and a rerun
+skips every id already written there, so an interrupted run resumes where
+it stopped. Each FIR is also added to the FIR archive (see fir_archive.py)
+unless --no-archive is given.
+
+    python batch_fir.py complaints.csv --output-dir out/ [--pdf] [--workers 4] [--stub | --local-only]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ai_model
+from fir_document import Complaint
+from pdf_report import create_pdf, pdf_to_bytes
+
+RESULTS_FILE = "results.jsonl"
+
+
+def _json_rows(f):
+    for line in f:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Reported as a failed row by run(), which carries on with the rest
+                yield None
+
+
+def read_complaints(path):
+    """Yield (id, row) pairs from a CSV or JSONL file without loading it whole"""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = _json_rows(f) if path.endswith((".jsonl", ".ndjson")) else csv.DictReader(f)
+        for number, row in enumerate(rows, 1):
+            # Only a missing or blank id falls back to the row number; 0 is an id like any other
+            row_id = row.get("id") if isinstance(row, dict) else None
+            yield str(number if row_id in (None, "") else row_id), row
+
+
+def row_problem(row):
+    """Why a row cannot be made into a FIR, or None if it can"""
+    if not isinstance(row, dict):
+        return "not a JSON object"
+    if not str(row.get("case_description") or "").strip():
+        return "no case_description"
+    return None
+
+
+def completed_ids(results_path):
+    """Return the ids already written to results_path (the resume checkpoint)"""
+    done = set()
+    if os.path.exists(results_path):
+        with open(results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    # A line cut short by a crash; that row is redone
+                    continue
+    return done
+
+
+def process_complaint(complaint_id, row, sections, pdf_dir=None, local_only=False):
+    """Run both completions for one complaint (or fill the templates) and return its result record.
+
+    Retries, 429 pauses shared by all workers and the fallback model are
+    handled by ai_model.llm_policy; an error here means they were exhausted.
+    """
+    start = time.perf_counter()
+    complaint = Complaint.from_mapping(row)
+    case_description = complaint.case_description
+    fir_number, registration_date = ai_model.new_fir_number()
+    try:
+        if local_only:
+            analysis = ai_model.draft_local_analysis(sections)
+            fir_structure = ai_model.draft_local_fir(case_description, sections, complaint, fir_number,
+                                                     registration_date)
+        else:
+            analysis = ai_model.complete_analysis(case_description, sections)
+            fir_structure = ai_model.complete_fir(case_description, sections, complaint, fir_number, registration_date)
+
+        record = {
+            "id": complaint_id,
+            "complaint": complaint.to_dict(),
+            "sections": sections,
+            "analysis": analysis.to_dict(),
+            "fir_structure": fir_structure.to_dict(),
+            "source": fir_structure.source,
+        }
+        if pdf_dir:
+            pdf_path = os.path.join(pdf_dir, f"FIR_{complaint_id}.pdf")
+            with open(pdf_path, "wb") as f:
+                f.write(pdf_to_bytes(create_pdf(fir_structure, sections, analysis)))
+            record["pdf"] = pdf_path
+    except BaseException:
+        # The complaint is counted as failed; its number goes back to the register
+        ai_model.release_fir_number(fir_number)
+        raise
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def archive_record(input_path, record):
+    """Add one result record to the FIR archive, keyed by input file and id so a rerun never adds it twice"""
+    fir = record["fir_structure"]
+    request = {"complaint": record["complaint"], "sections": record["sections"],
+               "fir_number": fir["fir_number"], "registration_date": fir["registration_date"]}
+    result = {name: record[name] for name in ("fir_structure", "sections", "analysis", "source")}
+    ai_model.archive_fir(f"batch:{os.path.abspath(input_path)}:{record['id']}", request, result)
+
+
+def run(input_path, output_dir, workers=4, batch_size=64, pdf=False, max_retries=5, rpm=None, local_only=False,
+        progress_every=25, archive=True):
+    """Process every pending complaint in input_path and return (processed, failed, seconds)"""
+    os.makedirs(output_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    pdf_dir = os.path.join(output_dir, "pdf") if pdf else None
+    if pdf_dir:
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    done = completed_ids(results_path)
+    pending = ((cid, row) for cid, row in read_complaints(input_path) if cid not in done)
+    ai_model.llm_policy.max_retries = max_retries
+    if rpm:
+        ai_model.llm_policy.requests_per_minute = rpm
+    processed = failed = 0
+    start = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed * 60 if elapsed else 0.0
+        label = "done" if final else "progress"
+        print(f"[{label}] {processed} processed, {failed} failed, {len(done)} skipped, "
+              f"{elapsed:.1f}s, {rate:.1f} complaints/minute", file=sys.stderr)
+
+    with open(results_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+
+        def drain(limit):
+            nonlocal processed, failed
+            while len(in_flight) > limit:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    in_flight.discard(future)
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"Complaint failed: {e}", file=sys.stderr)
+                        continue
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    if archive:
+                        try:
+                            archive_record(input_path, record)
+                        except Exception as e:
+                            # results.jsonl already has it
+                            print(f"Could not archive complaint {record['id']}: {e}", file=sys.stderr)
+                    processed += 1
+                    if processed % progress_every == 0:
+                        report()
+
+        while True:
+            batch = list(itertools.islice(pending, batch_size))
+            if not batch:
+                break
+            usable = []
+            for complaint_id, row in batch:
+                problem = row_problem(row)
+                if problem:
+                    # One bad row must not stop the batch; a rerun tries it again
+                    failed += 1
+                    print(f"Complaint {complaint_id} failed: {problem}", file=sys.stderr)
+                else:
+                    usable.append((complaint_id, row))
+            batch = usable
+            # Retrieval for the whole batch is one matrix multiply
+            all_sections = ai_model.get_relevant_sections_batch([row["case_description"] for _, row in batch])
+            for (complaint_id, row), sections in zip(batch, all_sections):
+                # Cap the queued work at twice the pool size, so memory stays flat on big inputs
+                drain(workers * 2)
+                in_flight.add(pool.submit(process_complaint, complaint_id, row, sections, pdf_dir, local_only))
+        drain(0)
+
+    report(final=True)
+    return processed, failed, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or JSONL file of complaints")
+    parser.add_argument("--output-dir", required=True, help="directory for results.jsonl and PDFs")
+    parser.add_argument("--pdf", action="store_true", help="also write one PDF per FIR")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM workers")
+    parser.add_argument("--batch-size", type=int, default=64, help="complaints per retrieval batch")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--rpm", type=float, help="cap on completions per minute (the account's rate limit)")
+    parser.add_argument("--local-only", action="store_true", default=ai_model.LOCAL_ONLY,
+                        help="fill the FIR templates without calling the LLM (default from FIR_LOCAL_ONLY)")
+    parser.add_argument("--no-archive", action="store_true", help="do not add the FIRs to the FIR archive")
+    parser.add_argument("--stub", action="store_true", help="use an offline stub instead of the Groq API")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds per stubbed completion")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from stub_llm import StubGroq
+        ai_model.client = StubGroq(latency=args.stub_latency)
+
+    _, failed, _ = run(args.input, args.output_dir, workers=args.workers, batch_size=args.batch_size,
+                       pdf=args.pdf, max_retries=args.max_retries, rpm=args.rpm, local_only=args.local_only,
+                       archive=not args.no_archive)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Time-to-first-render and process RSS of the Streamlit app, before and after a change.
+
+Each sample runs the app headless through streamlit.testing in a fresh
+interpreter: the home page is rendered (time-to-first-render), then one FIR
+is generated against stub clients. Resident memory is read after each step.
+The "before" tree is exported from a git revision, so any two versions of
+the app can be compared.
+
+    python benchmarks/bench_app_startup.py [--before HEAD~1] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = """
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('app.py', default_timeout=120).run()
+first_render = time.perf_counter() - start
+rss_home = rss_mb()
+heavy = sorted(name for name in ('groq', 'pandas', 'scipy', 'sklearn') if name in sys.modules)
+
+import ai_model
+from stub_llm import StubGroq, StubAsyncGroq
+ai_model.client = StubGroq()
+ai_model.async_client = StubAsyncGroq()
+ai_model.completion_cache = None
+at.button[0].click().run()
+at.text_area[-1].input('A man snatched my phone near the bus stand and threatened me with a knife').run()
+[b for b in at.button if 'Generate' in b.label][0].click().run()
+if 'job_id' in at.session_state:
+    # Generation runs as a background job that the results page polls
+    while not ai_model.get_job_queue().get(at.session_state.job_id).finished:
+        time.sleep(0.01)
+    at.run()
+    assert ai_model.get_job_queue().get(at.session_state.job_id).status == 'done', 'FIR was not generated'
+else:
+    assert at.session_state.fir_data, 'FIR was not generated'
+print(json.dumps({
+    'first_render': first_render,
+    'first_fir': time.perf_counter() - start,
+    'rss_home': rss_home,
+    'rss_fir': rss_mb(),
+    'heavy_at_home': heavy,
+}))
+"""
+
+
+def export_revision(revision, target):
+    """Write the tree at revision into target"""
+    archive = subprocess.run(['git', 'archive', revision], cwd=ROOT, check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', target], input=archive, check=True)
+
+
+def sample(tree, runs):
+    # A separate index directory per tree, built by an untimed first run
+    env = dict(os.environ, FIR_INDEX_DIR=os.path.join(tree, '.fir_index'))
+    env.pop('FIR_CACHE_DB', None)
+    env.pop('FIR_JOBS_DB', None)
+    results = []
+    # The FIRs it generates take numbers from, and are archived in, throwaway files
+    with tempfile.TemporaryDirectory(prefix='fir-bench-') as state:
+        env.update(FIR_NUMBERS_DB=os.path.join(state, 'numbers.db'), FIR_ARCHIVE_DB=os.path.join(state, 'archive.db'))
+        for run in range(runs + 1):
+            output = subprocess.run([sys.executable, '-c', SAMPLE], cwd=tree, env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            if run:
+                results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--before', default='HEAD~1', help='git revision to compare against')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as before_tree:
+        export_revision(args.before, before_tree)
+        trees = ((f'before ({args.before})', before_tree), ('after (working tree)', ROOT))
+        print(f"{'':<22} {'first render':>14} {'first FIR':>12} {'RSS home':>11} {'RSS after FIR':>14}  "
+              f"imported by first render")
+        for label, tree in trees:
+            results = sample(tree, args.runs)
+
+            def median(key):
+                return statistics.median(result[key] for result in results)
+
+            print(f"{label:<22} {median('first_render') * 1000:11.0f} ms {median('first_fir') * 1000:9.0f} ms "
+                  f"{median('rss_home'):8.1f} MB {median('rss_fir'):11.1f} MB  "
+                  f"{', '.join(results[-1]['heavy_at_home']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
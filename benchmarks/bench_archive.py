@@ -0,0 +1,174 @@
+"""FIR archive at scale: insert rate, size on disk and query latency at --rows FIRs.
+
+Records are template drafts (draft_local_fir / draft_local_analysis) of
+synthetic complaints, with accused, complainant, place and description
+varied per row, so each row is the size of a real one. Then each query a
+supervisor runs is timed over --queries samples: the latest page, a deep
+page reached by keyset cursor, searches by accused, place, section and
+free text (alone and combined), opening one FIR, rendering its PDF again,
+and streaming an export.
+
+    python benchmarks/bench_archive.py [--rows 200000] [--queries 200] [--db /tmp/archive.db]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_results import summarise
+
+FIRST = ["Ramesh", "Suresh", "Anita", "Farhan", "Priya", "Gurpreet", "Lakshmi", "Arjun", "Meena", "Vikram",
+         "Sanjay", "Kavita", "Imran", "Deepa", "Rohit", "Sunita", "Abdul", "Neha", "Manoj", "Pooja"]
+LAST = ["Kumar", "Sharma", "Singh", "Khan", "Patel", "Reddy", "Das", "Iyer", "Verma", "Gupta", "Yadav", "Nair",
+        "Joshi", "Chauhan", "Mehta", "Ali", "Bose", "Rao", "Mishra", "Pillai"]
+PLACES = ["Bus stand", "Railway station", "Main market", "Gandhi Nagar", "Civil Lines", "Old city", "Sector 14",
+          "Nehru Park", "Ring road", "MG Road", "College gate", "Sabzi mandi", "Lake view colony", "Industrial area"]
+
+
+def templates(count):
+    """(request, result) pairs from template drafts of the benchmark complaints"""
+    import ai_model
+    from bench_retrieval import make_queries
+    from fir_document import Complaint
+
+    pairs = []
+    for number, query in enumerate(make_queries(count, seed=3)):
+        sections = ai_model.get_relevant_sections(query)
+        complaint = Complaint(query, place_of_occurrence=PLACES[number % len(PLACES)],
+                              complainant_name="Complainant", accused_name="Accused")
+        fir_number, registration_date = f"{number + 1}/2026", "01-01-2026"
+        fir = ai_model.draft_local_fir(query, sections, complaint, fir_number, registration_date)
+        analysis = ai_model.draft_local_analysis(sections)
+        pairs.append((ai_model.fir_job_request(complaint, sections, fir_number, registration_date),
+                      {"fir_structure": fir.to_dict(), "sections": sections, "analysis": analysis.to_dict(),
+                       "source": "local"}))
+    return pairs
+
+
+def synthetic(pairs, number, rng):
+    """A copy of a template with this row's people, place and FIR number"""
+    request, result = pairs[number % len(pairs)]
+    accused = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    complainant = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    place = rng.choice(PLACES)
+    fir_number = f"{number + 1}/2026"
+    complaint = dict(request["complaint"], accused_name=accused, complainant_name=complainant,
+                     place_of_occurrence=place,
+                     case_description=f"{request['complaint']['case_description']} near {place}, reported by "
+                                      f"{complainant} against {accused}.")
+    fir = dict(result["fir_structure"], fir_number=fir_number, accused=accused, complainant_name=complainant,
+               occurrence_place=place)
+    return (dict(request, complaint=complaint, fir_number=fir_number), dict(result, fir_structure=fir))
+
+
+def time_queries(queries, run):
+    """Time run(query) for each query; return the latency summary and the mean rows returned"""
+    samples, returned = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        returned += len(run(query))
+        samples.append((time.perf_counter() - start) * 1000)
+    summary = summarise(samples)
+    summary["rows"] = round(returned / len(queries), 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1000, help="FIRs per insert transaction")
+    parser.add_argument("--db", help="archive file to build (a temporary one by default); reused if it exists")
+    args = parser.parse_args()
+    os.environ.setdefault("FIR_CORPUS_POLL", "0")
+
+    from fir_archive import FIRArchive
+    from fir_document import CaseAnalysis, FIRDocument
+    from pdf_report import create_pdf, pdf_to_bytes
+
+    tmp = tempfile.TemporaryDirectory()
+    path = args.db or os.path.join(tmp.name, "archive.db")
+    archive = FIRArchive(path)
+    rng = random.Random(5)
+    pairs = templates(50)
+
+    existing = archive.count()
+    if existing < args.rows:
+        raw_bytes, start = 0, time.perf_counter()
+        for first in range(existing, args.rows, args.batch):
+            entries = []
+            for number in range(first, min(first + args.batch, args.rows)):
+                request, result = synthetic(pairs, number, rng)
+                raw_bytes += len(json.dumps({"request": request, "result": result}, ensure_ascii=False))
+                entries.append((None, request, result, None, None))
+            archive.add_many(entries)
+        seconds = time.perf_counter() - start
+        size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+        added = args.rows - existing
+        print(f"inserted {added} FIRs in {seconds:.1f} s ({added / seconds:.0f}/s); "
+              f"{raw_bytes / added:.0f} bytes of JSON per FIR, {size / args.rows:.0f} bytes per FIR on disk "
+              f"with indexes ({size / 1e6:.0f} MB)")
+        single = []
+        for number in range(args.rows, args.rows + 200):
+            request, result = synthetic(pairs, number, rng)
+            begin = time.perf_counter()
+            archive.add(request, result)
+            single.append((time.perf_counter() - begin) * 1000)
+        print(f"one FIR at a time (as jobs finish): p50 {summarise(single)['p50_ms']:.2f} ms")
+
+    rows = archive.count()
+    names = [f"{rng.choice(FIRST)} {rng.choice(LAST)}" for _ in range(args.queries)]
+    deep = archive.search(limit=1).rows[0]["id"] // 2
+    words = ["phone", "jewellery", "dowry", "bribe", "forged signature", "iron rod", "pedestrian", "obscene"]
+    sections = [section for _, result in pairs for section in result["sections"]]
+    queries = [
+        ("latest page", lambda _: archive.search().rows),
+        ("page at row n/2 (keyset)", lambda _: archive.search(before=deep).rows),
+        ("accused name", lambda q: archive.search(accused=names[q]).rows),
+        ("accused surname prefix", lambda q: archive.search(accused=names[q].split()[1][:3]).rows),
+        ("place", lambda q: archive.search(place=PLACES[q % len(PLACES)]).rows),
+        ("section", lambda q: archive.search(section=sections[q % len(sections)]).rows),
+        ("free text", lambda q: archive.search(words[q % len(words)]).rows),
+        ("text + section", lambda q: archive.search(words[q % len(words)], section=sections[q % len(sections)]).rows),
+        ("accused + place", lambda q: archive.search(accused=names[q].split()[0],
+                                                     place=PLACES[q % len(PLACES)]).rows),
+        ("rare: no match", lambda q: archive.search(accused="Zzyzx").rows),
+        ("open one FIR", lambda q: [archive.get(rng.randrange(1, rows + 1))]),
+    ]
+    print(f"\n{rows} FIRs; {args.queries} queries each")
+    print(f"{'query':<26} {'p50':>9} {'p95':>9} {'p99':>9} {'rows':>6}")
+    for label, run in queries:
+        result = time_queries(range(args.queries), run)
+        print(f"{label:<26} {result['p50_ms']:6.2f} ms {result['p95_ms']:6.2f} ms {result['p99_ms']:6.2f} ms "
+              f"{result['rows']:6.1f}")
+
+    def regenerate(_):
+        record = archive.get(rng.randrange(1, rows + 1))
+        result = record["result"]
+        pdf = create_pdf(FIRDocument.from_dict(result["fir_structure"]), result["sections"],
+                         CaseAnalysis.from_dict(result["analysis"]))
+        return [pdf_to_bytes(pdf)]
+
+    result = time_queries(range(20), regenerate)
+    print(f"{'open + render PDF':<26} {result['p50_ms']:6.2f} ms {result['p95_ms']:6.2f} ms {result['p99_ms']:6.2f} ms")
+
+    start = time.perf_counter()
+    out = io.StringIO()
+    exported = archive.export(out, section=sections[0])
+    seconds = time.perf_counter() - start
+    print(f"\nexport of one section: {exported} FIRs in {seconds:.2f} s ({exported / seconds:.0f}/s, "
+          f"{len(out.getvalue()) / 1e6:.0f} MB of JSON lines)")
+    archive.close()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Completion latency against a fake Groq client.
+
+Each fake completion waits --latency seconds before its first token and
+--token-delay seconds between tokens. Reports sequential vs concurrent
+wall-clock time, time-to-first-token for blocking vs streamed FIRs, and that
+a timeout falls back to the template draft.
+
+    python benchmarks/bench_async.py [--latency 0.5] [--token-delay 0.002]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ai_model
+from stub_llm import StubAsyncGroq, StubGroq
+
+CASE = "Someone snatched my mobile phone and purse near the bus stand and ran away"
+USER_INPUTS = "Place of Occurrence: Bus stand\nComplainant Name: Test"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--token-delay', type=float, default=0.002)
+    args = parser.parse_args()
+
+    # Measure the API path, not cache hits
+    ai_model.completion_cache = None
+    ai_model.client = StubGroq(latency=args.latency, token_delay=args.token_delay)
+    start = time.perf_counter()
+    sections, analysis = ai_model.get_sections_and_analysis(CASE)
+    ai_model.generate_fir_structure(CASE, sections, USER_INPUTS)
+    sequential = time.perf_counter() - start
+
+    fake = StubAsyncGroq(latency=args.latency, token_delay=args.token_delay)
+    start = time.perf_counter()
+    ai_model.run_async(ai_model.generate_all(CASE, USER_INPUTS, client=fake))
+    concurrent = time.perf_counter() - start
+
+    # Without streaming the first token is seen only when the whole FIR is back
+    ai_model.async_client = StubAsyncGroq(latency=args.latency, token_delay=args.token_delay)
+    sections = ai_model.get_relevant_sections(CASE)
+    start = time.perf_counter()
+    stream = iter(ai_model.stream_fir_structure(CASE, sections, USER_INPUTS))
+    next(stream)
+    streaming_ttft = time.perf_counter() - start
+    "".join(stream)
+    streaming_total = time.perf_counter() - start
+
+    # A timeout shorter than the latency falls back to the error message instead of hanging
+    slow = StubAsyncGroq(latency=args.latency * 4)
+    start = time.perf_counter()
+    result = asyncio.run(ai_model.generate_all(CASE, USER_INPUTS, timeout=args.latency, client=slow))
+    timed_out = time.perf_counter() - start
+
+    print(f"sequential sync calls   {sequential * 1000:8.1f} ms")
+    print(f"generate_all concurrent {concurrent * 1000:8.1f} ms")
+    print(f"TTFT streaming          {streaming_ttft * 1000:8.1f} ms  (total {streaming_total * 1000:.1f} ms)")
+    print(f"timeout at {args.latency}s        {timed_out * 1000:8.1f} ms  "
+          f"(template draft used: {result['fir_structure'].source == 'local'})")
+
+
+if __name__ == '__main__':
+    main()
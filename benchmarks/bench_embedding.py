@@ -0,0 +1,115 @@
+"""Embedding retrieval vs the TF-IDF and hybrid paths: recall, latency and memory.
+
+Each backend is loaded in a fresh interpreter, so its resident memory and
+load time are measured on their own, and then scored on labelled complaints
+(recall@5, MRR@5, and how often the configured threshold returns no
+sections at all) and on --queries synthetic complaints for latency. The
+embedding lexicon was written with retrieval_eval.jsonl in view, so the
+headline numbers are from retrieval_heldout.jsonl, written afterwards;
+recall on the tuning set is shown next to them, and the embedding backend
+is also scored with the lexicon turned off.
+
+    python benchmarks/bench_embedding.py [--queries 500] [--rebuild]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = """
+import json, os, statistics, sys, time
+sys.path.insert(0, {root!r})
+sys.path.insert(0, os.path.join({root!r}, 'benchmarks'))
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+from bench_retrieval import EVAL_PATH, evaluate, make_queries
+import numpy, scipy.sparse
+baseline = rss_mb()
+start = time.perf_counter()
+os.environ['FIR_RETRIEVAL_BACKEND'] = {backend!r}
+os.environ['FIR_EMBEDDING_LEXICON'] = {lexicon!r}
+import ai_model
+retriever = ai_model.get_retriever()
+load = time.perf_counter() - start
+
+with open(os.path.join(os.path.dirname(EVAL_PATH), 'retrieval_heldout.jsonl'), encoding='utf-8') as f:
+    examples = [json.loads(line) for line in f if line.strip()]
+recall, mrr, _, _ = evaluate(retriever, examples)
+empty = sum(not retriever.search(example['query']) for example in examples) / len(examples)
+with open(EVAL_PATH, encoding='utf-8') as f:
+    tuned, _, _, _ = evaluate(retriever, [json.loads(line) for line in f if line.strip()])
+
+queries = make_queries({queries})
+latencies = []
+for query in queries:
+    begin = time.perf_counter()
+    retriever.search(query)
+    latencies.append((time.perf_counter() - begin) * 1e6)
+latencies.sort()
+begin = time.perf_counter()
+retriever.search_batch(queries)
+batch = (time.perf_counter() - begin) / len(queries) * 1e6
+print(json.dumps({{
+    'load_ms': load * 1000, 'recall': recall, 'mrr': mrr, 'empty': empty, 'tuned': tuned,
+    'p50_us': statistics.median(latencies), 'p99_us': latencies[int(len(latencies) * 0.99) - 1],
+    'batch_us': batch, 'rss_mb': rss_mb() - baseline,
+}}))
+"""
+
+
+def directory_mb(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+    return total / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--rebuild', action='store_true', help='time a from-scratch build of both indexes first')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from embedding_index import build_embeddings
+    from section_index import CSV_PATH, build_index
+    from section_shards import DEFAULT_SHARD, SHARD_DIR
+    import time
+
+    # The backends load fir_sections.csv as the IPC shard
+    index_dir = os.path.join(SHARD_DIR, DEFAULT_SHARD)
+    if args.rebuild or not os.path.isdir(os.path.join(index_dir, 'embedding')):
+        start = time.perf_counter()
+        build_index(CSV_PATH, index_dir)
+        lexical = time.perf_counter() - start
+        start = time.perf_counter()
+        build_embeddings(CSV_PATH, index_dir)
+        print(f"build: TF-IDF/BM25 {lexical:.1f} s, embeddings {time.perf_counter() - start:.1f} s")
+    embedding_mb = directory_mb(os.path.join(index_dir, 'embedding'))
+    print(f"on disk: TF-IDF/BM25 {directory_mb(index_dir) - embedding_mb:.1f} MB, embeddings {embedding_mb:.1f} MB")
+    print()
+
+    print("held-out set (retrieval_heldout.jsonl); 'tuning set' is recall@5 on retrieval_eval.jsonl")
+    print(f"{'backend':<14} {'recall@5':>9} {'MRR@5':>7} {'no result':>10} {'tuning set':>11} {'p50':>9} {'p99':>9} "
+          f"{'batch':>9} {'load':>8} {'RSS':>8}")
+    for label, backend, lexicon in (('tfidf', 'tfidf', '1'), ('hybrid', 'hybrid', '1'),
+                                    ('embedding', 'embedding', '1'), ('  no lexicon', 'embedding', '0')):
+        output = subprocess.run([sys.executable, '-c', SAMPLE.format(root=ROOT, backend=backend, lexicon=lexicon,
+                                                                      queries=args.queries)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:<14} {result['recall']:9.3f} {result['mrr']:7.3f} {result['empty']:10.0%} {result['tuned']:11.3f} "
+              f"{result['p50_us']:6.0f} us {result['p99_us']:6.0f} us {result['batch_us']:6.0f} us "
+              f"{result['load_ms']:5.0f} ms {result['rss_mb']:5.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
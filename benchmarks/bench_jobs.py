@@ -0,0 +1,93 @@
+"""FIR generation in the script run vs as a background job, for many officers at once.
+
+--officers concurrent sessions each generate one FIR against a stub client
+with --latency seconds per completion. "blocking" runs both completions in
+the session's own thread, as the Generate handler used to; "jobs" only
+submits to the JobQueue and then polls, as the results page does. Reported:
+how long each session's script thread is held (for jobs, the submit),
+the time until every FIR is done, and what a poll costs, for the
+in-memory and the SQLite store.
+
+    python benchmarks/bench_jobs.py [--officers 50] [--latency 1.0] [--workers 32]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run_sessions(officers, session):
+    """Run session(number) in one thread per officer; return (per-session held seconds, wall seconds)"""
+    held = [0.0] * officers
+
+    def run(number):
+        start = time.perf_counter()
+        session(number)
+        held[number] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(officers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return held, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--officers', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds per stubbed completion')
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    import ai_model
+    from fir_document import Complaint
+    from jobs import JobQueue, SQLiteJobStore
+    from stub_llm import StubAsyncGroq, StubGroq
+
+    ai_model.client = StubGroq(latency=args.latency)
+    ai_model.async_client = StubAsyncGroq(latency=args.latency)
+    ai_model.completion_cache = None
+
+    def request(number):
+        complaint = Complaint(f"My mobile phone was stolen from my bag at the market, complaint {number}")
+        sections = ai_model.get_relevant_sections(complaint.case_description)
+        return ai_model.fir_job_request(complaint, sections, f"FIR/{number}", "2026-01-01")
+
+    requests = [request(number) for number in range(args.officers)]
+
+    held, wall = run_sessions(args.officers, lambda number: ai_model.run_fir_job(requests[number]))
+    print(f"{'mode':<16} {'thread held p50':>16} {'all done':>9} {'poll p50':>9}")
+    print(f"{'blocking':<16} {statistics.median(held) * 1000:13.1f} ms {wall:7.2f} s {'-':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, store in (('jobs (memory)', None), ('jobs (sqlite)', SQLiteJobStore(os.path.join(tmp, 'jobs.db')))):
+            queue = JobQueue(ai_model.run_fir_job, store, workers=args.workers)
+            ids = [None] * args.officers
+            start = time.perf_counter()
+            held, _ = run_sessions(args.officers,
+                                   lambda number: ids.__setitem__(number, queue.submit(requests[number])))
+            polls = []
+            while True:
+                begin = time.perf_counter()
+                jobs = [queue.get(job_id) for job_id in ids]
+                polls.append((time.perf_counter() - begin) / len(ids))
+                if all(job.finished for job in jobs):
+                    break
+                time.sleep(0.05)
+            wall = time.perf_counter() - start
+            failed = sum(job.status != 'done' for job in jobs)
+            print(f"{label:<16} {statistics.median(held) * 1000:13.1f} ms {wall:7.2f} s "
+                  f"{statistics.median(polls) * 1e6:6.0f} us"
+                  + (f"  ({failed} failed)" if failed else ""))
+
+
+if __name__ == '__main__':
+    main()
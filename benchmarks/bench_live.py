@@ -0,0 +1,87 @@
+"""Live section suggestions: incremental vs full re-retrieval, and the analysis prefetch.
+
+Replays every labelled complaint in retrieval_eval.jsonl word by word, as an
+officer typing it, and times LiveQuery.update against a full search at each
+step (checking both return the same sections). Then times Generate's wait
+for the analysis with and without the prefetch, against a stub client.
+
+    python benchmarks/bench_live.py [--latency 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'retrieval_eval.jsonl')
+sys.path.insert(0, ROOT)
+
+
+def typing_steps(query):
+    """The description after each word typed, then cut back to half and cleared"""
+    words = query.split()
+    steps = [' '.join(words[:end]) for end in range(1, len(words) + 1)]
+    return steps + [query[:len(query) // 2], '']
+
+
+def replay(retriever, queries):
+    live_us, full_us, mismatches = [], [], 0
+    for query in queries:
+        live = retriever.live_query()
+        for text in typing_steps(query):
+            start = time.perf_counter()
+            incremental = live.update(text)
+            live_us.append((time.perf_counter() - start) * 1e6)
+            start = time.perf_counter()
+            full = retriever.search(text)
+            full_us.append((time.perf_counter() - start) * 1e6)
+            mismatches += list(incremental) != list(full)
+    return live_us, full_us, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=1.0, help='seconds per stubbed completion')
+    args = parser.parse_args()
+
+    import ai_model
+    from embedding_index import load_embeddings
+    from retrieval import EmbeddingRetriever, HybridRetriever, SectionRetriever
+    from section_index import load_index
+    from stub_llm import StubAsyncGroq
+
+    with open(EVAL_PATH, encoding='utf-8') as f:
+        queries = [json.loads(line)['query'] for line in f if line.strip()]
+    index = load_index()
+    print(f"{'backend':<10} {'steps':>6} {'live p50':>10} {'full p50':>10} {'live p99':>10} {'mismatches':>11}")
+    for label, retriever in (('tfidf', SectionRetriever(index)), ('hybrid', HybridRetriever(index)),
+                             ('embedding', EmbeddingRetriever(index, load_embeddings()))):
+        live_us, full_us, mismatches = replay(retriever, queries)
+        print(f"{label:<10} {len(live_us):6d} {statistics.median(live_us):7.0f} us {statistics.median(full_us):7.0f} us "
+              f"{sorted(live_us)[int(len(live_us) * 0.99) - 1]:7.0f} us {mismatches:11d}")
+
+    # Generate's wait for the analysis, when the description settled a while before the click
+    ai_model.completion_cache = None
+    ai_model.async_client = StubAsyncGroq(latency=args.latency)
+    case = queries[0]
+    sections = ai_model.get_relevant_sections(case)
+
+    start = time.perf_counter()
+    ai_model.submit_async(ai_model.get_sections_and_analysis_async(case, sections)).result()
+    cold = time.perf_counter() - start
+
+    prefetcher = ai_model.AnalysisPrefetcher(delay=0.1)
+    prefetcher.schedule(case, sections)
+    # The officer fills in the rest of the form
+    time.sleep(0.1 + args.latency + 0.2)
+    start = time.perf_counter()
+    prefetcher.take(case, sections).result()
+    warm = time.perf_counter() - start
+    print()
+    print(f"analysis wait after Generate: {cold * 1000:.0f} ms without prefetch, {warm * 1000:.1f} ms prefetched")
+
+
+if __name__ == '__main__':
+    main()
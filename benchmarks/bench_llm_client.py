@@ -0,0 +1,194 @@
+"""Fault-injection harness for the LLM client layer.
+
+Runs concurrent completions through ai_model.complete against a FaultyGroq
+client in several scenarios. Each one compares a single-attempt baseline
+(the old behaviour) with the default resilient policy, and checks the
+behaviour the policy promises. Then a half-open breaker's trial call is
+ended with a 429, a bad request and a cancellation, none of which may leave
+the breaker stuck open. Exits non-zero if a check fails.
+
+    python benchmarks/bench_llm_client.py [--requests 60] [--workers 8]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ai_model
+from llm_client import CircuitOpenError, LLMPolicy
+from stub_llm import FaultyGroq, StubAPIError, make_completion
+
+FALLBACK_MODEL = "llama3-8b-8192"
+
+
+def baseline_policy():
+    """One attempt, no breaker, no fallback: what ai_model did before the policy existed"""
+    return LLMPolicy(max_retries=0, failure_threshold=10 ** 9)
+
+
+def resilient_policy(**overrides):
+    # Delays scaled down so the harness runs in seconds
+    settings = dict(fallback_model=FALLBACK_MODEL, max_retries=4, base_delay=0.05, max_delay=1.0,
+                    failure_threshold=5, reset_timeout=2.0, fallback_after=0.5)
+    settings.update(overrides)
+    return LLMPolicy(**settings)
+
+
+SCENARIOS = [
+    # name, FaultyGroq settings, resilient policy overrides
+    ("flaky", dict(rate_limit=0.2, server_error=0.05, timeout=0.05, retry_after=0.2, slow_latency=0.3), {}),
+    ("saturated primary", dict(rate_limit=1.0, retry_after=10.0, faulty_models={ai_model.MODEL}), {}),
+    ("slow responses", dict(slow=0.3, slow_latency=2.0), dict(attempt_timeout=0.25)),
+    ("outage", dict(server_error=1.0), dict(fallback_model=None)),
+    ("burst over quota", dict(), dict(requests_per_minute=600, burst=5)),
+]
+
+
+def run(policy, fake, requests, workers):
+    ai_model.llm_policy = policy
+    latencies, failures = [], 0
+
+    def one(number):
+        start = time.perf_counter()
+        try:
+            ai_model.complete(f"complaint {number}", client=fake)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for seconds, error in pool.map(one, range(requests)):
+            latencies.append(seconds)
+            failures += error is not None
+    served = {}
+    for call in fake.calls:
+        served[call["model"]] = served.get(call["model"], 0) + 1
+    return {
+        "ok": (requests - failures) / requests,
+        "p50": statistics.median(latencies),
+        "p95": statistics.quantiles(latencies, n=20)[-1],
+        "wall": time.perf_counter() - start,
+        "attempts": len(fake.calls),
+        "fallback": served.get(FALLBACK_MODEL, 0),
+        "faults": sum(fake.faults.values()),
+    }
+
+
+def half_open_policy():
+    """A policy whose breaker has tripped and is ready for a trial call"""
+    policy = LLMPolicy(max_retries=1, base_delay=0.0, failure_threshold=1, reset_timeout=0.05)
+
+    def down(**kwargs):
+        raise StubAPIError(500, "Internal server error")
+
+    try:
+        policy.call(down, {"model": ai_model.MODEL})
+    except (StubAPIError, CircuitOpenError):
+        pass
+    time.sleep(0.06)
+    return policy
+
+
+def recovers(policy):
+    """Whether a healthy call gets through after the trial ended without an outcome"""
+    try:
+        policy.call(lambda **kwargs: make_completion("ok"), {"model": ai_model.MODEL})
+    except CircuitOpenError:
+        return False
+    return policy.model_state(ai_model.MODEL).breaker.state == "closed"
+
+
+def half_open_checks():
+    """(description, passed) for trial calls that end without a success or failure being recorded"""
+    policy = half_open_policy()
+    replies = [StubAPIError(429, "Rate limit reached", {"retry-after": "0"})]
+
+    def rate_limited_once(**kwargs):
+        if replies:
+            raise replies.pop()
+        return make_completion("ok")
+
+    try:
+        policy.call(rate_limited_once, {"model": ai_model.MODEL})
+        retried = True
+    except CircuitOpenError:
+        retried = False
+    checks = [("half-open: a 429 on the trial call is retried, not stuck", retried and recovers(policy))]
+
+    policy = half_open_policy()
+
+    def bad_request(**kwargs):
+        raise StubAPIError(400, "Bad request")
+
+    try:
+        policy.call(bad_request, {"model": ai_model.MODEL})
+    except StubAPIError:
+        pass
+    checks.append(("half-open: a bad request on the trial call releases it", recovers(policy)))
+
+    policy = half_open_policy()
+
+    async def hangs(**kwargs):
+        await asyncio.sleep(10)
+
+    async def cancelled():
+        try:
+            await asyncio.wait_for(policy.call_async(hangs, {"model": ai_model.MODEL}), 0.01)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(cancelled())
+    checks.append(("half-open: a cancelled trial call releases it", recovers(policy)))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Every request must reach the client
+    ai_model.completion_cache = None
+
+    print(f"{'scenario':<18} {'policy':<10} {'success':>8} {'p50':>8} {'p95':>8} {'wall':>7} "
+          f"{'attempts':>9} {'fallback':>9} {'faults':>7}")
+    results = {}
+    for name, faults, overrides in SCENARIOS:
+        for label, policy in (("baseline", baseline_policy()), ("resilient", resilient_policy(**overrides))):
+            fake = FaultyGroq(latency=0.02, seed=args.seed, **faults)
+            result = results[name, label] = run(policy, fake, args.requests, args.workers)
+            print(f"{name:<18} {label:<10} {result['ok']:8.0%} {result['p50'] * 1000:6.0f}ms "
+                  f"{result['p95'] * 1000:6.0f}ms {result['wall']:6.2f}s {result['attempts']:9d} "
+                  f"{result['fallback']:9d} {result['faults']:7d}")
+
+    checks = [
+        ("flaky: retries recover almost every request",
+         results["flaky", "resilient"]["ok"] >= 0.95 > results["flaky", "baseline"]["ok"]),
+        ("saturated primary: served by the fallback model",
+         results["saturated primary", "resilient"]["ok"] == 1.0
+         and results["saturated primary", "resilient"]["fallback"] > 0),
+        ("slow responses: attempt timeout keeps p95 under the slow latency",
+         results["slow responses", "resilient"]["p95"] < 2.0 <= results["slow responses", "baseline"]["p95"]),
+        ("outage: breaker stops calling the API",
+         results["outage", "resilient"]["attempts"] < args.requests),
+        ("burst over quota: rate limiter spreads requests out",
+         results["burst over quota", "resilient"]["wall"] >= (args.requests - 5) / 10 * 0.9),
+    ] + half_open_checks()
+    failed = 0
+    for description, passed in checks:
+        failed += not passed
+        print(f"{'PASS' if passed else 'FAIL'}  {description}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
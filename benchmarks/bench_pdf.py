@@ -0,0 +1,187 @@
+"""PDF rendering microbenchmark.
+
+Times create_pdf on synthetic FIRs and analyses of increasing size against
+the original line-by-line renderer, and compares the old delivery path
+(temp file + base64 data: link) with in-memory bytes for st.download_button.
+Pass --font to also time the Unicode TrueType path.
+
+    python benchmarks/bench_pdf.py [--repeat 5] [--font /path/to/Font.ttf]
+"""
+import argparse
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fpdf import FPDF
+
+from pdf_report import create_pdf, pdf_to_bytes
+
+FIR_HEADINGS = [
+    "FIR Number and Registration Details", "Date, Time and Place of Occurrence",
+    "Information Received At Police Station", "Type of Information", "Complainant Details",
+    "Details of Known/Unknown Accused", "Reasons for delay in reporting",
+    "Particulars of properties stolen", "Description of the Incident", "Sections of Law Applied",
+    "Action Taken", "Signature/Thumb Impression of Complainant", "Officer Details",
+]
+PARAGRAPH = ("The complainant stated that on the said date the accused persons, acting in furtherance of "
+             "their common intention, entered the premises and took away the property described below "
+             "without consent. ")
+
+
+def make_report(scale):
+    """Return (fir_content, sections, analysis) roughly proportional in size to scale"""
+    lines = ["FIRST INFORMATION REPORT", ""]
+    for number, heading in enumerate(FIR_HEADINGS, 1):
+        lines.append(f"{number}. {heading}:")
+        lines.append(f"Field {number}: value for {heading.lower()}")
+        lines.extend([PARAGRAPH * 3] * scale)
+        lines.append("")
+    sections = {f"IPC_{300 + i}": PARAGRAPH * (4 * scale) for i in range(5)}
+    analysis = "\n".join(["APPLICABLE SECTIONS:"] + [PARAGRAPH * 4] * (6 * scale)
+                         + ["CASE ANALYSIS:"] + [PARAGRAPH * 4] * (6 * scale))
+    return "\n".join(lines), sections, analysis
+
+
+def legacy_create_pdf(fir_content, sections, analysis):
+    """create_pdf as it was before the document-model renderer"""
+    pdf = FPDF()
+    
+    # Configure PDF
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "FIRST INFORMATION REPORT (FIR)", ln=True, align="C")
+    pdf.line(10, 22, 200, 22)
+    pdf.ln(5)
+    
+    # FIR Content - process text to handle special characters
+    pdf.set_font("Arial", "", 12)
+    
+    # Process and clean the text to avoid encoding issues
+    clean_content = fir_content.replace('"', '"').replace('"', '"').replace("'", "'").replace("'", "'")
+    
+    # Split the content by lines and add to PDF
+    lines = clean_content.split('\n')
+    for line in lines:
+        if line.strip():
+            if ":" in line:
+                parts = line.split(":", 1)
+                if len(parts) == 2:
+                    pdf.set_font("Arial", "B", 12)
+                    pdf.cell(60, 10, parts[0].strip() + ":", 0, 0)
+                    pdf.set_font("Arial", "", 12)
+                    pdf.multi_cell(0, 10, parts[1].strip())
+                else:
+                    pdf.multi_cell(0, 10, line)
+            else:
+                if line.strip().isupper():
+                    pdf.set_font("Arial", "B", 14)
+                    pdf.ln(5)
+                    pdf.cell(0, 10, line.strip(), ln=True)
+                    pdf.ln(2)
+                else:
+                    pdf.set_font("Arial", "", 12)
+                    pdf.multi_cell(0, 10, line)
+    
+    # Relevant Sections - with sanitized text
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "RELEVANT SECTIONS", ln=True)
+    pdf.line(10, 22, 200, 22)
+    pdf.ln(5)
+    
+    pdf.set_font("Arial", "", 12)
+    for section, description in sections.items():
+        # Clean text to avoid encoding issues
+        clean_section = str(section).encode('latin-1', 'replace').decode('latin-1')
+        clean_desc = str(description).encode('latin-1', 'replace').decode('latin-1')
+        
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 10, f"Section: {clean_section}", ln=True)
+        pdf.set_font("Arial", "", 12)
+        pdf.multi_cell(0, 10, clean_desc)
+        pdf.ln(5)
+    
+    # Case Analysis - with sanitized text
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "CASE ANALYSIS", ln=True)
+    pdf.line(10, 22, 200, 22)
+    pdf.ln(5)
+    
+    # Clean analysis text to avoid encoding issues
+    clean_analysis = str(analysis).encode('latin-1', 'replace').decode('latin-1')
+    
+    pdf.set_font("Arial", "", 12)
+    pdf.multi_cell(0, 10, clean_analysis)
+    
+    return pdf
+
+
+def legacy_link(pdf):
+    """The original get_download_link body: temp file, read back, base64 data: URL"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+        pdf.output(tmp.name)
+        with open(tmp.name, "rb") as f:
+            pdf_data = f.read()
+    os.unlink(tmp.name)
+    b64_pdf = base64.b64encode(pdf_data).decode('utf-8')
+    return f'<a href="data:application/pdf;base64,{b64_pdf}" download="FIR_Report.pdf">Download FIR as PDF</a>'
+
+
+def rendered(build):
+    """Return a callable that builds a PDF and serialises it, so timings include output()"""
+    def run():
+        pdf = build()
+        pdf_to_bytes(pdf)
+        return pdf
+    return run
+
+
+def median_ms(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--font', help='TTF file for the Unicode path')
+    args = parser.parse_args()
+
+    print("create_pdf: original renderer vs document-model renderer (core font)")
+    print(f"{'scale':>5} {'old pages':>9} {'old ms':>8} {'new pages':>9} {'new ms':>8}"
+          + (f" {'ttf pages':>9} {'ttf ms':>8}" if args.font else ""))
+    for scale in (1, 4, 8, 16):
+        report = make_report(scale)
+        old_ms, old_pdf = median_ms(rendered(lambda: legacy_create_pdf(*report)), args.repeat)
+        new_ms, new_pdf = median_ms(rendered(lambda: create_pdf(*report, font_paths=())), args.repeat)
+        line = f"{scale:>5} {old_pdf.page_no():>9} {old_ms:>8.1f} {new_pdf.page_no():>9} {new_ms:>8.1f}"
+        if args.font:
+            fonts = (args.font, args.font)
+            ttf_ms, ttf_pdf = median_ms(rendered(lambda: create_pdf(*report, font_paths=fonts)), args.repeat)
+            line += f" {ttf_pdf.page_no():>9} {ttf_ms:>8.1f}"
+        print(line)
+
+    print()
+    print("delivery: temp file + base64 link vs in-memory bytes")
+    print(f"{'scale':>5} {'tmp+base64':>11} {'in-memory':>10} {'html KB':>8} {'pdf KB':>7}")
+    for scale in (1, 4, 16):
+        report = make_report(scale)
+        legacy_ms, link = median_ms(lambda: legacy_link(create_pdf(*report)), args.repeat)
+        memory_ms, data = median_ms(lambda: pdf_to_bytes(create_pdf(*report)), args.repeat)
+        print(f"{scale:>5} {legacy_ms:>9.1f}ms {memory_ms:>8.1f}ms {len(link) / 1024:>8.0f} {len(data) / 1024:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
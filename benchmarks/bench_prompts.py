@@ -0,0 +1,170 @@
+"""Prompt size and end-to-end latency before and after token-budgeted prompts.
+
+The "before" builders are copies of the original prompts, which pasted the
+retrieved sections as a dict repr. Every query in retrieval_eval.jsonl runs
+through retrieval and both completions against a stub client whose latency
+grows with the prompt (--prompt-delay seconds per token, on top of a fixed
+--latency), since prefill time is what a smaller prompt saves. Prompt tokens
+are the same estimate the builder budgets with.
+
+    python benchmarks/bench_prompts.py [--latency 0.05] [--prompt-delay 0.0002] [--budget 1200]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ai_model
+from prompt_builder import PromptBuilder, count_tokens
+from stub_llm import StubGroq
+
+USER_INPUTS = """
+                    Date of Incident: 2024-03-12
+                    Time of Incident: 21:30:00
+                    Place of Occurrence: Near the bus stand, Sector 14
+                    Nature of Offense: Theft
+                    Complainant Name: Test Complainant
+                    Complainant Contact: 9999999999
+                    Complainant Address: 12 Example Road
+                    Complainant ID: 
+                    Accused Name: 
+                    Accused Address: 
+                    Accused Description: Two men, one wearing a red helmet
+                    """
+
+
+def legacy_analysis_prompt(case_description, relevant_sections):
+    """The original analysis prompt"""
+    return f"""
+    You are a legal expert specializing in Indian criminal law. Based on the following case description, provide a comprehensive list of all possible relevant sections from the Indian Penal Code (IPC) and other applicable acts.
+
+    Case Description: {case_description}
+
+    Initial Relevant Sections from Analysis:
+    {relevant_sections}
+
+    Please provide:
+    1. A complete list of applicable sections with brief explanations of why each section applies
+    2. Any additional sections that might be relevant but weren't in the initial analysis
+    3. A detailed legal analysis of the case considering:
+       - Primary offenses
+       - Secondary or related offenses
+       - Aggravating factors
+       - Procedural considerations
+       - Potential defenses
+
+    Format your response as:
+    APPLICABLE SECTIONS:
+    Section [Number] - [Brief explanation of relevance]
+    
+    CASE ANALYSIS:
+    [Detailed analysis of the legal aspects of the case]
+    
+    INVESTIGATION RECOMMENDATIONS:
+    [Suggestions for evidence collection and next steps]
+    """
+
+def legacy_fir_prompt(case_description, relevant_sections, user_inputs):
+    """The original FIR prompt (with the number and date placeholders)"""
+    return f"""
+    You are a senior police officer with expertise in drafting First Information Reports (FIRs) in India. 
+    Based on the following information, generate a professionally formatted FIR document.
+
+    CASE DESCRIPTION:
+    {case_description}
+
+    RELEVANT SECTIONS:
+    {relevant_sections}
+
+    USER INPUTS:
+    {user_inputs}
+
+    FIR NUMBER: [FIR-NUMBER]
+    REGISTRATION DATE: [REGISTRATION-DATE]
+
+    Please format the FIR with the following sections:
+    
+    FIRST INFORMATION REPORT
+    
+    1. FIR Number and Registration Details
+    2. Date, Time and Place of Occurrence
+    3. Information Received At Police Station (use current date/time)
+    4. Type of Information: Written/Oral
+    5. Complainant Details (name, address, contact)
+    6. Details of Known/Unknown Accused
+    7. Reasons for delay in reporting (if applicable)
+    8. Particulars of properties stolen (if applicable)
+    9. Description of the Incident (detailed facts)
+    10. Sections of Law Applied
+    11. Action Taken (initial steps)
+    12. Signature/Thumb Impression of Complainant
+    13. Officer Details (use "Investigating Officer, [Police Station Name]")
+
+    Format the FIR in a clear, professional manner suitable for official police records. Use formal language appropriate for legal documents.
+    Write the FIR number and registration date exactly as the placeholders [FIR-NUMBER] and [REGISTRATION-DATE]; they are filled in on registration.
+    """
+
+
+def shared_prefix_tokens(first, second):
+    """Tokens in the longest common prefix of two prompts (what a prefix cache could reuse)"""
+    length = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        length += 1
+    return count_tokens(first[:length])
+
+
+def run(cases, build_analysis, build_fir, client):
+    tokens = {'analysis': [], 'fir': [], 'shared': []}
+    seconds = []
+    for case in cases:
+        start = time.perf_counter()
+        sections = ai_model.get_relevant_sections(case)
+        analysis_prompt = build_analysis(case, sections)
+        fir_prompt = build_fir(case, sections, USER_INPUTS)
+        ai_model.complete(analysis_prompt, client=client, call='analysis')
+        ai_model.complete(fir_prompt, client=client, call='fir')
+        seconds.append(time.perf_counter() - start)
+        tokens['analysis'].append(count_tokens(ai_model.SYSTEM_PROMPT) + count_tokens(analysis_prompt))
+        tokens['fir'].append(count_tokens(ai_model.SYSTEM_PROMPT) + count_tokens(fir_prompt))
+        tokens['shared'].append(shared_prefix_tokens(analysis_prompt, fir_prompt))
+    return tokens, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--prompt-delay', type=float, default=0.0002)
+    parser.add_argument('--budget', type=int, default=ai_model.prompts.budget)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'benchmarks', 'retrieval_eval.jsonl'), encoding='utf-8') as f:
+        cases = [json.loads(line)['query'] for line in f if line.strip()]
+
+    # Measure the API path, not cache hits
+    ai_model.completion_cache = None
+    client = StubGroq(latency=args.latency, prompt_delay=args.prompt_delay)
+    ai_model.get_retriever()
+    ai_model.prompts = PromptBuilder(args.budget, reserve=ai_model.prompts.reserve)
+
+    print(f"{len(cases)} complaints, stub latency {args.latency * 1000:.0f} ms + "
+          f"{args.prompt_delay * 1e6:.0f} us/prompt token, budget {args.budget} tokens")
+    print(f"{'':<10} {'analysis tok':>13} {'FIR tok':>9} {'max tok':>8} {'shared prefix':>14} {'end-to-end':>12}")
+    for label, build_analysis, build_fir in (
+        ('before', legacy_analysis_prompt, legacy_fir_prompt),
+        ('after', ai_model.build_analysis_prompt, ai_model.build_fir_prompt),
+    ):
+        tokens, seconds = run(cases, build_analysis, build_fir, client)
+        print(f"{label:<10} {statistics.mean(tokens['analysis']):13.0f} {statistics.mean(tokens['fir']):9.0f} "
+              f"{max(tokens['analysis'] + tokens['fir']):8d} {statistics.mean(tokens['shared']):14.0f} "
+              f"{statistics.mean(seconds) * 1000:9.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
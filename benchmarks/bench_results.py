@@ -0,0 +1,153 @@
+"""Shared helpers for benchmarks that save their results as JSON for comparing runs.
+
+Every result is a summary of latency samples (milliseconds) or a plain
+number; save() adds where and when the run happened, and compare() prints
+each result's p50 (or value) against a baseline file from an earlier run.
+"""
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values (fraction in 0..1)"""
+    values = sorted(values)
+    return values[max(int(len(values) * fraction + 0.999999) - 1, 0)]
+
+
+def summarise(samples_ms, seconds=None):
+    """Latency summary of samples in milliseconds; with the wall seconds they took, also the throughput"""
+    summary = {
+        'n': len(samples_ms),
+        'mean_ms': round(statistics.fmean(samples_ms), 3),
+        'p50_ms': round(percentile(samples_ms, 0.50), 3),
+        'p95_ms': round(percentile(samples_ms, 0.95), 3),
+        'p99_ms': round(percentile(samples_ms, 0.99), 3),
+        'max_ms': round(max(samples_ms), 3),
+    }
+    if seconds:
+        summary['per_second'] = round(len(samples_ms) / seconds, 3)
+    return summary
+
+
+def timed(call, runs):
+    """Call call() runs times; return its summary, throughput included"""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(runs):
+        begin = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - begin) * 1000)
+    return summarise(samples, time.perf_counter() - start)
+
+
+def environment():
+    """Where the run happened, so results from different machines or commits are not mistaken for each other"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def save(path, benchmark, settings, results):
+    """Write the results with the settings and environment they were measured in"""
+    document = {'benchmark': benchmark, 'environment': environment(), 'settings': settings, 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+    return document
+
+
+def _headline(result):
+    if isinstance(result, dict):
+        return result.get('p50_ms', result.get('per_second'))
+    return result if isinstance(result, (int, float)) else None
+
+
+def compare(results, baseline_path):
+    """Print each result's p50 (or value) next to the baseline's"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nagainst {baseline_path} ({baseline['environment'].get('commit')}, {baseline['environment'].get('time')})")
+    print(f"{'result':<32} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, result in results.items():
+        now, before = _headline(result), _headline(baseline['results'].get(name))
+        if now is None or before is None:
+            continue
+        change = f"{(now - before) / before * 100:+7.1f}%" if before else '-'
+        print(f"{name:<32} {before:12.3f} {now:12.3f} {change:>8}")
+
+
+@contextlib.contextmanager
+def stub_server(latency, tokens_per_second=0.0, prompt_delay=0.0):
+    """Run stub_server.py in its own process, so it does not share the GIL with the app; yields its URL"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'stub_server.py'), '--port', '0', '--latency', str(latency),
+         '--tokens-per-second', str(tokens_per_second), '--prompt-delay', str(prompt_delay)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        line = process.stdout.readline()
+        if ' on ' not in line:
+            raise RuntimeError(f"stub_server.py did not start: {line!r}")
+        yield line.rsplit(' on ', 1)[1].strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextlib.contextmanager
+def temp_state():
+    """Point the FIR number register, FIR archive and job queue files at a temporary directory.
+
+    Enter it before ai_model is imported: those modules read their paths on
+    import, and a benchmark must not use up numbers in the station's register
+    or fill its archive. FIR_JOBS_DB is moved only when it is set, so the kind
+    of job store under test stays the same. Yields the directory.
+    """
+    names = ['FIR_NUMBERS_DB', 'FIR_ARCHIVE_DB'] + (['FIR_JOBS_DB'] if os.environ.get('FIR_JOBS_DB') else [])
+    saved = {name: os.environ.get(name) for name in names}
+    with tempfile.TemporaryDirectory(prefix='fir-bench-') as directory:
+        for name in names:
+            os.environ[name] = os.path.join(directory, name.lower().replace('fir_', '', 1).replace('_db', '.db'))
+        try:
+            yield directory
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def server_stats(url):
+    """The stub server's request count and peak concurrency"""
+    with urllib.request.urlopen(f"{url}/stats", timeout=5) as response:
+        return json.load(response)
+
+
+def use_stub_server(ai_model, url):
+    """Point ai_model's (real) Groq clients at the stub server and turn the completion cache off"""
+    os.environ['GROQ_BASE_URL'] = url
+    ai_model.client = ai_model.async_client = None
+    ai_model.completion_cache = None
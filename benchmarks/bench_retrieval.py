@@ -0,0 +1,133 @@
+"""Retrieval latency and quality benchmark for get_relevant_sections.
+
+Compares the original per-query path (dense cosine_similarity, full argsort,
+df.iloc lookups) against SectionRetriever and HybridRetriever for single
+queries and batches, then reports recall@5 and per-query latency on the
+labelled set in retrieval_eval.jsonl.
+
+    python benchmarks/bench_retrieval.py [--queries 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'retrieval_eval.jsonl')
+sys.path.insert(0, ROOT)
+
+SAMPLE_COMPLAINTS = [
+    "Someone snatched my mobile phone and purse near the bus stand and ran away",
+    "My neighbour attacked me with an iron rod and threatened to kill my family",
+    "An online seller took advance payment and never delivered, cheating me of money",
+    "My husband and in-laws harassed me for dowry and beat me",
+    "The accused forged my signature on the sale deed of my land",
+    "A group of men broke into the house at night and stole gold jewellery",
+    "The shopkeeper sold adulterated food that made my children ill",
+    "A public servant demanded a bribe to issue the certificate",
+    "He stalked my daughter and sent obscene messages",
+    "The driver drove rashly and caused the death of a pedestrian",
+]
+
+
+def make_queries(n, seed=7):
+    """Build n complaints by shuffling words of the sample set"""
+    rng = random.Random(seed)
+    words = " ".join(SAMPLE_COMPLAINTS).split()
+    queries = list(SAMPLE_COMPLAINTS)
+    while len(queries) < n:
+        queries.append(" ".join(rng.sample(words, 15)))
+    return queries[:n]
+
+
+def legacy_retriever():
+    """Rebuild the pre-index retrieval function for comparison"""
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    df = pd.read_csv(os.path.join(ROOT, 'fir_sections.csv'))
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf_matrix = vectorizer.fit_transform(df['Description'])
+
+    def get_relevant_sections(case_description):
+        case_vector = vectorizer.transform([case_description])
+        cosine_similarities = cosine_similarity(case_vector, tfidf_matrix).flatten()
+        top_indices = cosine_similarities.argsort()[-5:][::-1]
+        relevant_sections = {}
+        for index in top_indices:
+            if cosine_similarities[index] > 0.1:
+                relevant_sections[df.iloc[index]['Section']] = df.iloc[index]['Description']
+        return relevant_sections
+
+    return get_relevant_sections
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def evaluate(retriever, examples, k=5):
+    """Return (mean recall@k, MRR@k, median us, p99 us) over labelled examples"""
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for example in examples:
+        start = time.perf_counter()
+        found = list(retriever.search(example['query'], k=k))
+        latencies.append((time.perf_counter() - start) * 1e6)
+        relevant = set(example['relevant'])
+        recalls.append(len(relevant & set(found)) / len(relevant))
+        ranks = [rank for rank, section in enumerate(found, 1) if section in relevant]
+        reciprocal_ranks.append(1 / ranks[0] if ranks else 0.0)
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    return statistics.mean(recalls), statistics.mean(reciprocal_ranks), statistics.median(latencies), p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    from retrieval import HybridRetriever, SectionRetriever
+    from section_index import load_index
+
+    queries = make_queries(args.queries)
+    legacy = legacy_retriever()
+    index = load_index()
+    retriever = SectionRetriever(index)
+    hybrid = HybridRetriever(index)
+
+    legacy_results, legacy_time = timed(lambda: [legacy(q) for q in queries])
+    single_results, single_time = timed(lambda: [retriever.search(q) for q in queries])
+    batch_results, batch_time = timed(retriever.search_batch, queries)
+    _, hybrid_single_time = timed(lambda: [hybrid.search(q) for q in queries])
+    _, hybrid_batch_time = timed(hybrid.search_batch, queries)
+
+    mismatches = sum(set(a) != set(b) for a, b in zip(legacy_results, batch_results))
+    mismatches += sum(set(a) != set(b) for a, b in zip(legacy_results, single_results))
+
+    n = len(queries)
+    print(f"queries: {n}   result mismatches vs legacy: {mismatches}")
+    for label, seconds in (('legacy one-by-one', legacy_time),
+                           ('SectionRetriever.search', single_time),
+                           ('SectionRetriever.search_batch', batch_time),
+                           ('HybridRetriever.search', hybrid_single_time),
+                           ('HybridRetriever.search_batch', hybrid_batch_time)):
+        print(f"{label:<30} {seconds * 1000:9.1f} ms total   {seconds / n * 1e6:8.1f} us/query")
+
+    with open(EVAL_PATH, encoding='utf-8') as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    print()
+    print(f"labelled set: {len(examples)} queries ({os.path.basename(EVAL_PATH)})")
+    for label, candidate in (('tfidf', retriever), ('hybrid', hybrid)):
+        recall, mrr, p50, p99 = evaluate(candidate, examples)
+        print(f"{label:<8} recall@5 {recall:.3f}   MRR@5 {mrr:.3f}   p50 {p50:7.1f} us   p99 {p99:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
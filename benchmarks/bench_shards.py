@@ -0,0 +1,159 @@
+"""Sharded section retrieval at --scale times the corpus: latency, recall and hot-reload.
+
+fir_sections.csv is the IPC shard; the other scale - 1 shards are synthetic
+acts made from it by remapping half of its vocabulary (a different seed per
+act), so they are the same size and shape as a real act without matching
+the same complaints. Each backend is timed over 1x (IPC only), the 10x
+shards, and the same 10x sections as a single monolithic index; recall@5
+is on the labelled IPC set in retrieval_eval.jsonl, so it shows whether the
+distractor acts push the right sections out. Finally one act's CSV is
+edited and refresh() is timed against rebuilding the monolithic index.
+
+    python benchmarks/bench_shards.py [--scale 10] [--queries 300] [--backends hybrid,embedding]
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+WORD = re.compile(r"[A-Za-z]{4,}")
+
+
+def synthetic_act(df, act, seed):
+    """A copy of the IPC table keyed act_<number>, with half its vocabulary remapped"""
+    rng = np.random.default_rng(seed)
+    vocabulary = sorted({word.lower() for text in df['Description'] for word in WORD.findall(text)})
+    targets = rng.permutation(vocabulary)
+    mapping = {word: target for word, target, keep in zip(vocabulary, targets, rng.random(len(vocabulary)) < 0.5)
+               if not keep}
+
+    def remap(text):
+        text = text.replace('IPC', act).replace('Indian penal code', f'{act} Act')
+        return WORD.sub(lambda match: mapping.get(match.group().lower(), match.group()), text)
+
+    out = df.copy()
+    out['Section'] = [f"{act}_{section.rpartition('_')[2]}" for section in df['Section']]
+    for column in ('Description', 'Offense'):
+        out[column] = df[column].map(remap)
+    return out
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+def measure(retriever, examples, queries):
+    from bench_retrieval import evaluate
+    recall, mrr, _, _ = evaluate(retriever, examples)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.search(query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    start = time.perf_counter()
+    retriever.search_batch(queries)
+    batch = (time.perf_counter() - start) / len(queries) * 1e6
+
+    # Live suggestions, typed word by word, must match a full search
+    live_us, mismatches = [], 0
+    for example in examples[:20]:
+        live = retriever.live_query()
+        words = example['query'].split()
+        for end in range(1, len(words) + 1):
+            text = ' '.join(words[:end])
+            start = time.perf_counter()
+            sections = live.update(text)
+            live_us.append((time.perf_counter() - start) * 1e6)
+            mismatches += list(sections) != list(retriever.search(text))
+    return {'recall': recall, 'mrr': mrr, 'p50': statistics.median(latencies), 'p99': percentile(latencies, 0.99),
+            'batch': batch, 'live': statistics.median(live_us), 'mismatches': mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=10, help='corpus size as a multiple of fir_sections.csv')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--backends', default='hybrid,embedding')
+    args = parser.parse_args()
+
+    import pandas as pd
+    import json
+    import ai_model
+    from bench_retrieval import EVAL_PATH, make_queries
+    from section_index import CSV_PATH
+    from section_shards import ShardedRetriever, discover_corpora
+
+    with open(EVAL_PATH, encoding='utf-8') as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    queries = make_queries(args.queries)
+
+    tree = tempfile.mkdtemp(prefix='fir-shards-')
+    try:
+        corpus_dir = os.path.join(tree, 'corpora')
+        os.makedirs(corpus_dir)
+        ipc = pd.read_csv(CSV_PATH).fillna('')
+        acts = [synthetic_act(ipc, f'ACT{number}', seed=number) for number in range(1, args.scale)]
+        for number, act in enumerate(acts, 1):
+            act.to_csv(os.path.join(corpus_dir, f'act{number}.csv'), index=False)
+        monolithic_csv = os.path.join(tree, 'all_sections.csv')
+        pd.concat([ipc] + acts).to_csv(monolithic_csv, index=False)
+        all_corpora = discover_corpora([CSV_PATH, corpus_dir])
+        print(f"{len(all_corpora)} shards, {len(ipc) * args.scale} sections "
+              f"({len(ipc)} IPC + {len(ipc) * (args.scale - 1)} synthetic)\n")
+
+        print(f"{'backend':<10} {'corpus':<14} {'build':>8} {'load':>8} {'recall@5':>9} {'MRR@5':>7} "
+              f"{'p50':>9} {'p99':>9} {'batch':>9} {'live p50':>9} {'mismatch':>9}")
+        for backend in args.backends.split(','):
+            load = ai_model._shard_loader(backend)
+            shard_dir = os.path.join(tree, f'index-{backend}')
+            setups = [
+                ('1x IPC', lambda: ShardedRetriever(load, lambda: {'ipc': CSV_PATH}, shard_dir)),
+                (f'{args.scale}x sharded', lambda: ShardedRetriever(load, lambda: all_corpora, shard_dir)),
+                (f'{args.scale}x single', lambda: ShardedRetriever(load, lambda: {'all': monolithic_csv}, shard_dir)),
+            ]
+            for label, make in setups:
+                start = time.perf_counter()
+                make()
+                build = time.perf_counter() - start
+                start = time.perf_counter()
+                retriever = make()
+                loaded = time.perf_counter() - start
+                result = measure(retriever, examples, queries)
+                print(f"{backend:<10} {label:<14} {build:6.2f} s {loaded * 1000:5.0f} ms {result['recall']:9.3f} "
+                      f"{result['mrr']:7.3f} {result['p50']:6.0f} us {result['p99']:6.0f} us "
+                      f"{result['batch']:6.0f} us {result['live']:6.0f} us {result['mismatches']:9d}")
+
+            # Hot-reload: edit one act and refresh, against rebuilding the single index
+            sharded = ShardedRetriever(load, lambda: all_corpora, shard_dir)
+            before = dict(sharded.shards)
+            edited = os.path.join(corpus_dir, 'act1.csv')
+            acts[0].iloc[:-1].to_csv(edited, index=False)
+            start = time.perf_counter()
+            changed = sharded.refresh()
+            reload_time = time.perf_counter() - start
+            untouched = sum(sharded.shards[name] is shard for name, shard in before.items())
+            pd.concat([ipc, acts[0].iloc[:-1]] + acts[1:]).to_csv(monolithic_csv, index=False)
+            start = time.perf_counter()
+            ShardedRetriever(load, lambda: {'all': monolithic_csv}, shard_dir)
+            rebuild_time = time.perf_counter() - start
+            acts[0].to_csv(edited, index=False)
+            pd.concat([ipc] + acts).to_csv(monolithic_csv, index=False)
+            print(f"{backend:<10} edit act1: refresh reloaded {changed} in {reload_time * 1000:.0f} ms "
+                  f"({untouched}/{len(before)} shards kept); single index rebuild {rebuild_time * 1000:.0f} ms\n")
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
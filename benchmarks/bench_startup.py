@@ -0,0 +1,68 @@
+"""Time to the first section search in a fresh process, with and without a prebuilt index.
+
+Each sample is a fresh interpreter that imports ai_model and runs one
+get_retriever().search(). "cold" points FIR_INDEX_DIR at an empty
+directory, so the search includes building every shard's index from its
+CSV, as the first start after a corpus edit does; "prebuilt" reuses the
+index built once beforehand.
+
+    python benchmarks/bench_startup.py [--runs 5] [--backend hybrid]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_results import temp_state
+
+# Printed by the fresh interpreter: seconds to import ai_model, then to the end of the first search
+FIRST_SEARCH = """
+import time
+start = time.perf_counter()
+import ai_model
+imported = time.perf_counter() - start
+ai_model.get_retriever().search('Someone snatched my mobile phone near the bus stand')
+print(imported, time.perf_counter() - start)
+"""
+
+
+def time_first_search(index_dir, backend):
+    """Run FIRST_SEARCH in a fresh interpreter; return (import seconds, seconds to the first result)"""
+    env = dict(os.environ, FIR_INDEX_DIR=index_dir, FIR_RETRIEVAL_BACKEND=backend, FIR_CORPUS_POLL='0')
+    output = subprocess.run([sys.executable, '-c', FIRST_SEARCH], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    imported, searched = map(float, output.split()[-2:])
+    return imported, searched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backend', default='hybrid', choices=('tfidf', 'hybrid', 'embedding'))
+    args = parser.parse_args()
+
+    with temp_state() as state:
+        prebuilt = os.path.join(state, 'index')
+        # The first run builds the index the prebuilt samples then load
+        time_first_search(prebuilt, args.backend)
+        samples = {'cold (build index)': [], 'prebuilt index': []}
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory(prefix='fir-index-', dir=state) as empty:
+                samples['cold (build index)'].append(time_first_search(empty, args.backend))
+            samples['prebuilt index'].append(time_first_search(prebuilt, args.backend))
+
+    print(f"backend {args.backend}, {args.runs} fresh interpreters each")
+    for label, runs in samples.items():
+        imports = [imported * 1000 for imported, _ in runs]
+        searches = [searched * 1000 for _, searched in runs]
+        print(f"{label:<20} import median {statistics.median(imports):8.1f} ms   "
+              f"first search median {statistics.median(searches):8.1f} ms   min {min(searches):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""End-to-end benchmark suite: startup, retrieval, PDF and the full pipeline, saved as JSON.
+
+Measures, each as p50/p95/p99 and throughput:
+
+* cold_import / cold_first_search: importing ai_model, and importing it and
+  answering the first get_relevant_sections, in fresh interpreters;
+* retrieval_single / retrieval_batch: get_relevant_sections per query and
+  get_relevant_sections_batch per --batch-size complaints;
+* pdf: create_pdf plus the bytes st.download_button serves (pdf_to_bytes,
+  which replaced the base64 get_download_link) for template-drafted FIRs;
+* pipeline: retrieval plus both completions, as a results page job runs
+  them, through the real groq clients against stub_server.py in its own
+  process with --latency and --tokens-per-second.
+
+Save a run with --output and compare a later one against it with --compare:
+
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --compare before.json [--only retrieval,pdf]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_results import compare, save, server_stats, stub_server, summarise, temp_state, timed, use_stub_server
+
+GROUPS = ('startup', 'retrieval', 'pdf', 'pipeline')
+
+# Printed by the fresh interpreter: seconds to import ai_model, then to the first search
+COLD_SAMPLE = """
+import time
+start = time.perf_counter()
+import ai_model
+imported = time.perf_counter() - start
+ai_model.get_relevant_sections('Someone snatched my mobile phone near the bus stand')
+print(imported, time.perf_counter() - start)
+"""
+
+
+def bench_startup(args):
+    # Build the index first, so no sample includes it
+    subprocess.run([sys.executable, os.path.join(ROOT, 'section_shards.py')], cwd=ROOT, check=True,
+                   capture_output=True)
+    imports, searches = [], []
+    for _ in range(args.cold_runs):
+        output = subprocess.run([sys.executable, '-c', COLD_SAMPLE], cwd=ROOT, check=True, capture_output=True,
+                                text=True, env=dict(os.environ, FIR_CORPUS_POLL='0')).stdout
+        imported, searched = map(float, output.split()[-2:])
+        imports.append(imported * 1000)
+        searches.append(searched * 1000)
+    return {'cold_import': summarise(imports), 'cold_first_search': summarise(searches)}
+
+
+def bench_retrieval(args, ai_model, queries):
+    ai_model.get_relevant_sections(queries[0])
+    rotation = iter(queries * (args.queries // len(queries) + 1))
+    batches = [queries[i:i + args.batch_size] for i in range(0, len(queries), args.batch_size)]
+    single = timed(lambda: ai_model.get_relevant_sections(next(rotation)), args.queries)
+    samples, start = [], time.perf_counter()
+    for batch in batches:
+        begin = time.perf_counter()
+        ai_model.get_relevant_sections_batch(batch)
+        samples.append((time.perf_counter() - begin) * 1000)
+    batch = summarise(samples, time.perf_counter() - start)
+    batch['per_query_ms'] = round(sum(samples) / len(queries), 3)
+    return {'retrieval_single': single, 'retrieval_batch': batch}
+
+
+def bench_pdf(args, ai_model, queries):
+    from fir_document import Complaint
+    from pdf_report import create_pdf, pdf_to_bytes
+
+    reports = []
+    for query in queries[:10]:
+        sections = ai_model.get_relevant_sections(query)
+        complaint = Complaint(query, complainant_name='Test Complainant', place_of_occurrence='Bus stand')
+        reports.append((ai_model.draft_local_fir(query, sections, complaint), sections,
+                        ai_model.draft_local_analysis(sections)))
+    rotation = iter(reports * (args.pdfs // len(reports) + 1))
+
+    def render():
+        fir, sections, analysis = next(rotation)
+        return pdf_to_bytes(create_pdf(fir, sections, analysis))
+
+    size = len(render())
+    result = timed(render, args.pdfs)
+    result['bytes'] = size
+    return {'pdf': result}
+
+
+def bench_pipeline(args, ai_model, queries):
+    from fir_document import Complaint
+
+    def generate(query):
+        sections = ai_model.get_relevant_sections(query)
+        request = ai_model.fir_job_request(Complaint(query), sections, *ai_model.new_fir_number())
+        result = ai_model.run_fir_job(request)
+        if result['source'] != 'llm':
+            raise RuntimeError(f"The pipeline fell back to the {result['source']} draft; is the stub server up?")
+
+    with stub_server(args.latency, args.tokens_per_second) as url:
+        use_stub_server(ai_model, url)
+        # Opens the clients' connections, as the warm-up does in the app
+        generate(queries[0])
+        rotation = iter(queries * (args.pipeline_runs // len(queries) + 1))
+        result = timed(lambda: generate(next(rotation)), args.pipeline_runs)
+        result['server_requests'] = server_stats(url)['requests']
+    # The part of the latency that is the app's own, not the (stubbed) model's
+    result['overhead_p50_ms'] = round(result['p50_ms'] - args.latency * 1000, 3)
+    return {'pipeline': result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', default=','.join(GROUPS), help=f"comma-separated subset of {', '.join(GROUPS)}")
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--pdfs', type=int, default=50)
+    parser.add_argument('--pipeline-runs', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.2, help='stub seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='stub output rate; 0 for no delay')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON file saved by an earlier run')
+    args = parser.parse_args()
+    groups = [group.strip() for group in args.only.split(',') if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups {sorted(unknown)}; expected {', '.join(GROUPS)}")
+
+    results = {}
+    if 'startup' in groups:
+        results.update(bench_startup(args))
+    if set(groups) - {'startup'}:
+        os.environ.setdefault('FIR_CORPUS_POLL', '0')
+        with temp_state():
+            import ai_model
+            from bench_retrieval import make_queries
+            queries = make_queries(args.queries)
+            for group, bench in (('retrieval', bench_retrieval), ('pdf', bench_pdf), ('pipeline', bench_pipeline)):
+                if group in groups:
+                    results.update(bench(args, ai_model, queries))
+
+    print(f"{'result':<20} {'n':>5} {'p50':>10} {'p95':>10} {'p99':>10} {'per second':>11}")
+    for name, result in results.items():
+        print(f"{name:<20} {result['n']:5d} {result['p50_ms']:7.2f} ms {result['p95_ms']:7.2f} ms "
+              f"{result['p99_ms']:7.2f} ms {result.get('per_second', float('nan')):11.1f}")
+    if args.output:
+        save(args.output, 'bench_suite', vars(args), results)
+        print(f"\nsaved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
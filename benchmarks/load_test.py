@@ -0,0 +1,124 @@
+"""Load generator: N officers submitting complaints at once, against a stub Groq server.
+
+Each of --officers threads files --complaints complaints one after another
+(with --think seconds between them) the way the app does: retrieve the
+sections, submit the FIR job to the shared JobQueue, then poll the job every
+--poll seconds until it is done. Completions go through the real groq
+clients to stub_server.py, started in its own process with --latency and
+--tokens-per-second, or to an already running server at --base-url.
+
+Reports p50/p95/p99 of the end-to-end latency (Generate to a finished FIR),
+of the submit (how long the officer's script run is held), throughput, and
+how many FIRs failed or fell back to the template draft. Save with --output
+and compare against an earlier run with --compare.
+
+    python benchmarks/load_test.py [--officers 50] [--complaints 4] [--latency 0.5] [--output load.json]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_results import compare, save, server_stats, stub_server, summarise, temp_state, use_stub_server
+
+
+def officer(number, complaints, args, ai_model, queue, outcomes):
+    from fir_document import Complaint
+    for complaint_number, text in enumerate(complaints):
+        if complaint_number and args.think:
+            time.sleep(args.think)
+        start = time.perf_counter()
+        sections = ai_model.get_relevant_sections(text)
+        request = ai_model.fir_job_request(Complaint(text, complainant_name=f"Officer {number}"), sections,
+                                           *ai_model.new_fir_number())
+        job_id = queue.submit(request)
+        submitted = time.perf_counter()
+        job = queue.get(job_id)
+        while not job.finished:
+            time.sleep(args.poll)
+            job = queue.get(job_id)
+        outcome = 'failed' if job.status == 'failed' else job.result['source']
+        outcomes.append(((time.perf_counter() - start) * 1000, (submitted - start) * 1000, outcome))
+
+
+def run(args, url):
+    import ai_model
+    from bench_retrieval import make_queries
+    from jobs import JobQueue
+
+    use_stub_server(ai_model, url)
+    ai_model.get_relevant_sections('warm up')
+    queue = JobQueue(ai_model.run_fir_job, workers=args.workers)
+    texts = make_queries(args.officers * args.complaints, seed=11)
+    outcomes = []
+    threads = [threading.Thread(target=officer, args=(number, texts[number::args.officers], args, ai_model, queue,
+                                                      outcomes))
+               for number in range(args.officers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = [latency for latency, _, _ in outcomes]
+    counts = {}
+    for _, _, outcome in outcomes:
+        counts[outcome] = counts.get(outcome, 0) + 1
+    results = {
+        'end_to_end': summarise(latencies, wall),
+        'submit': summarise([held for _, held, _ in outcomes]),
+        'throughput_per_second': round(len(outcomes) / wall, 3),
+        'wall_seconds': round(wall, 3),
+        'outcomes': counts,
+        'server': server_stats(url),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--officers', type=int, default=50)
+    parser.add_argument('--complaints', type=int, default=4, help='complaints filed by each officer')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds an officer waits between complaints')
+    parser.add_argument('--poll', type=float, default=0.1, help='seconds between polls of a job')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('FIR_JOB_WORKERS', 32)) or 32)
+    parser.add_argument('--latency', type=float, default=0.5, help='stub seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='stub output rate; 0 for no delay')
+    parser.add_argument('--base-url', help='use a stub_server.py already running here instead of starting one')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON file saved by an earlier run')
+    args = parser.parse_args()
+    os.environ.setdefault('FIR_CORPUS_POLL', '0')
+
+    with temp_state():
+        if args.base_url:
+            results = run(args, args.base_url.rstrip('/'))
+        else:
+            with stub_server(args.latency, args.tokens_per_second) as url:
+                results = run(args, url)
+
+    total = sum(results['outcomes'].values())
+    print(f"{args.officers} officers x {args.complaints} complaints, {args.workers} workers, "
+          f"stub latency {args.latency}s: {total} FIRs in {results['wall_seconds']:.2f} s "
+          f"({results['throughput_per_second']:.1f}/s), outcomes {results['outcomes']}, "
+          f"server peak concurrency {results['server']['peak_concurrency']}")
+    print(f"{'':<12} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for name in ('end_to_end', 'submit'):
+        result = results[name]
+        print(f"{name:<12} {result['p50_ms']:7.1f} ms {result['p95_ms']:7.1f} ms {result['p99_ms']:7.1f} ms "
+              f"{result['max_ms']:7.1f} ms")
+    if args.output:
+        save(args.output, 'load_test', vars(args), results)
+        print(f"\nsaved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Concurrency stress test for the FIR number allocator.
+
+--processes processes of --threads threads each allocate --count numbers,
+spread over --stations stations and two years, against one shared SQLite
+file, all starting together. Each process allocates a different number of
+FIRs and closes at a different time, so both ways of giving back unused
+numbers (rewinding the sequence, and keeping them to reissue) are
+exercised; a second round then allocates again and must reissue them.
+Checked after every round, per station and year: no number is issued
+twice, every number below the highest issued was issued or is waiting to
+be reissued (nothing lost), issued() agrees, and the numbers waiting after
+round 1 were reissued first in round 2.
+Timed for each --block-sizes, to show what the blocks save in lock traffic.
+Exits non-zero if a check fails.
+
+Finally one process is killed mid-block, to show the gap that leaves.
+
+    python benchmarks/stress_fir_numbers.py [--processes 8] [--threads 4] [--count 500] [--block-sizes 1,16,64]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+YEARS = (2025, 2026)
+
+
+def allocate_in_process(path, block_size, threads, count, stations, seed, start, results, stop_after=None):
+    """One process's share: threads x count allocations, put on results as (station, year, number) lists"""
+    import threading
+    from fir_numbers import FIRNumberAllocator
+
+    allocator = FIRNumberAllocator(path, block_size)
+    issued = []
+
+    def work(thread_seed):
+        rng = random.Random(thread_seed)
+        mine = []
+        for _ in range(count):
+            station, year = f"PS{rng.randrange(stations)}", rng.choice(YEARS)
+            mine.append((station, year, allocator.allocate(station, year)))
+        issued.extend(mine)
+
+    start.wait()
+    if stop_after is not None:
+        # Killed mid-block: never closes, so its unused numbers are not given back
+        for _ in range(stop_after):
+            issued.append(("PS0", YEARS[0], allocator.allocate("PS0", YEARS[0])))
+        results.put(issued)
+        time.sleep(3600)
+    workers = [threading.Thread(target=work, args=(seed * 1000 + number,)) for number in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    allocator.close()
+    results.put(issued)
+
+
+def run_round(path, block_size, args, round_number):
+    """Run every process once; return (allocations, seconds)"""
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(args.processes + 1)
+    results = context.Queue()
+    processes = []
+    for number in range(args.processes):
+        # Uneven counts, so processes close while others still hold blocks
+        count = args.count + number * args.count // args.processes
+        process = context.Process(target=allocate_in_process, args=(
+            path, block_size, args.threads, count, args.stations, round_number * 100 + number, start, results))
+        process.start()
+        processes.append(process)
+    start.wait()
+    begin = time.perf_counter()
+    issued = [number for _ in processes for number in results.get()]
+    seconds = time.perf_counter() - begin
+    for process in processes:
+        process.join()
+    return issued, seconds
+
+
+def check(path, block_size, issued, waiting_before=None):
+    """Return (problems found in everything issued so far, {key: numbers waiting to be reissued}, holes)"""
+    from fir_numbers import FIRNumberAllocator
+
+    problems, waiting, holes = [], {}, 0
+    by_key = {}
+    for station, year, number in issued:
+        by_key.setdefault((station, year), []).append(number)
+    allocator = FIRNumberAllocator(path, block_size)
+    for (station, year), numbers in sorted(by_key.items()):
+        label = f"{station}/{year}"
+        waiting[station, year] = returned = allocator.returned(station, year)
+        duplicates = len(numbers) - len(set(numbers))
+        missing = set(range(1, max(numbers) + 1)) - set(numbers)
+        holes += len(missing)
+        if duplicates:
+            problems.append(f"{label}: {duplicates} duplicate numbers")
+        if missing != set(returned):
+            problems.append(f"{label}: lost numbers {sorted(missing - set(returned))[:10]}, "
+                            f"reissuable but issued {sorted(set(returned) - missing)[:10]}")
+        if allocator.issued(station, year) != len(numbers):
+            problems.append(f"{label}: issued() says {allocator.issued(station, year)}, "
+                            f"{len(numbers)} were handed out")
+        if waiting_before and set(waiting_before.get((station, year), ())) & set(returned):
+            problems.append(f"{label}: numbers given back in the last round were not reissued first")
+    allocator.close()
+    return problems, waiting, holes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--count", type=int, default=500, help="allocations per thread (more in later processes)")
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--block-sizes", default="1,16,64")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'block':>5} {'round':>5} {'numbers':>8} {'seconds':>8} {'per second':>11}  check")
+    with tempfile.TemporaryDirectory() as tmp:
+        for block_size in map(int, args.block_sizes.split(",")):
+            path = os.path.join(tmp, f"numbers-{block_size}.db")
+            issued, waiting = [], None
+            for round_number in (1, 2):
+                allocations, seconds = run_round(path, block_size, args, round_number)
+                issued += allocations
+                problems, waiting, holes = check(path, block_size, issued, waiting)
+                failed = failed or bool(problems)
+                verdict = '; '.join(problems) or f"ok: no duplicates or lost numbers, {holes} waiting to be reissued"
+                print(f"{block_size:5d} {round_number:5d} {len(allocations):8d} {seconds:8.2f} "
+                      f"{len(allocations) / seconds:11.0f}  {verdict}")
+
+        # A process killed before close() leaves the rest of its block unused
+        block_size, used = 16, 5
+        path = os.path.join(tmp, "killed.db")
+        context = multiprocessing.get_context("spawn")
+        start, results = context.Barrier(2), context.Queue()
+        process = context.Process(target=allocate_in_process, args=(
+            path, block_size, 1, 0, 1, 0, start, results, used))
+        process.start()
+        start.wait()
+        results.get()
+        process.kill()
+        process.join()
+        from fir_numbers import FIRNumberAllocator
+        allocator = FIRNumberAllocator(path, block_size)
+        after = allocator.allocate("PS0", YEARS[0])
+        allocator.close()
+        print(f"\nkilled after {used} of a {block_size}-number block: the next FIR is {after}, "
+              f"a gap of {after - used - 1} (FIR_NUMBER_BLOCK=1 leaves none)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
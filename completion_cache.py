@@ -0,0 +1,188 @@
+"""Cache for LLM completions.
+
+Keys are built from the model, temperature and messages with whitespace
+normalised, so re-submitting the same complaint after cosmetic edits is a
+hit. Lookups go through an in-process LRU tier first and then an optional
+SQLite tier that survives worker restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalise_text(text):
+    """Collapse runs of whitespace so formatting-only edits share a key"""
+    return " ".join(str(text).split())
+
+
+def make_key(model, temperature, messages):
+    """Return the cache key for a chat completion request"""
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [[m["role"], normalise_text(m["content"])] for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    """Thread-safe LRU with a TTL and entry-count and byte-size limits"""
+
+    name = "memory"
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=6 * 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value.encode("utf-8"))
+
+
+class SQLiteTier:
+    """On-disk tier; expired rows are skipped on read and pruned on write"""
+
+    name = "sqlite"
+
+    def __init__(self, path, max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM completions WHERE key = ? AND expires >= ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM completions WHERE expires < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+
+
+class CompletionCache:
+    """Tiered completion cache with hit/miss counters; earlier tiers are checked first"""
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+        self._lock = threading.Lock()
+        self.hits = {tier.name: 0 for tier in self.tiers}
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from FIR_CACHE_* environment variables"""
+        ttl = float(os.environ.get("FIR_CACHE_TTL", 6 * 3600))
+        tiers = [MemoryTier(
+            max_entries=int(os.environ.get("FIR_CACHE_SIZE", 256)),
+            max_bytes=int(os.environ.get("FIR_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+            ttl=ttl,
+        )]
+        db_path = os.environ.get("FIR_CACHE_DB")
+        if db_path:
+            tiers.append(SQLiteTier(db_path, ttl=float(os.environ.get("FIR_CACHE_DB_TTL", 7 * 24 * 3600))))
+        return cls(tiers)
+
+    def get(self, key):
+        """Return the cached completion text or None, promoting disk hits to memory"""
+        for position, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:position]:
+                    faster.set(key, value)
+                with self._lock:
+                    self.hits[tier.name] += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate"""
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,314 @@
+"""Dense section embeddings for semantic retrieval, built and searched on the CPU.
+
+HashingEmbedder maps text to a sparse vector of hashed word and character
+n-gram features, so "snatched" and "snatching" share most of theirs, and a
+small bundled lexicon adds the legal terms for common lay words to queries
+("slapped" also counts as "hurt"). When the index is built, the section matrix is
+factorised with a truncated SVD (latent semantic analysis), which places
+terms that occur in the same sections close together. A section's
+embedding is its projection onto the top components, L2-normalised and
+stored as float16.
+
+The index is written under INDEX_DIR/embedding and memory-mapped on load.
+Search is an exact matrix-vector product over every section; with a few
+thousand sections that is well under a millisecond, so an approximate
+index would only add error.
+
+    python embedding_index.py [fir_sections.csv] [index_dir]
+"""
+import json
+import os
+import sys
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+
+from section_index import (CSV_PATH, INDEX_DIR, TOKEN_PATTERN, build_lock, csv_checksum, current_version, load_current,
+                           new_version, publish, read_meta)
+
+# Bump when the features or the on-disk layout change so stale indexes are rebuilt
+EMBEDDING_VERSION = 1
+
+DIMENSIONS = 256
+HASH_BUCKETS = 1 << 18
+NGRAM_SIZES = (3, 4, 5)
+
+# Sections scored per float32 block during search, bounding the scratch memory
+SEARCH_BLOCK = 4096
+
+# Weight of lexicon terms relative to the words actually written; FIR_EMBEDDING_LEXICON=0 turns the lexicon off
+LEXICON_WEIGHT = 0.5 if os.environ.get("FIR_EMBEDDING_LEXICON", "1") != "0" else 0.0
+
+# Stems of everyday complaint language and the legal terms the section texts use for them. A stem
+# matches a whole word, or the word with one of STEM_ENDINGS (the consonant doubled before a vowel
+# ending, as in "stabbed"); phrases match whole words in a row
+LEXICON = {
+    "snatch": "robbery theft", "stole": "theft", "steal": "theft", "pickpocket": "theft",
+    "loot": "dacoity robbery", "gang": "dacoity unlawful assembly", "burgl": "house-breaking theft",
+    "broke into": "house-breaking", "break into": "house-breaking", "trespass": "house trespass",
+    "entered my": "house trespass", "slap": "voluntarily causing hurt", "punch": "voluntarily causing hurt",
+    "beat": "voluntarily causing hurt", "kick": "voluntarily causing hurt", "hit": "voluntarily causing hurt",
+    "fractur": "grievous hurt", "stab": "murder dangerous weapon", "knife": "dangerous weapon",
+    "pistol": "firearm attempt to murder", "gun": "firearm attempt to murder", "fired at": "attempt to murder",
+    "opened fire": "attempt to murder", "shot": "attempt to murder", "killed": "murder death",
+    "died": "death murder", "dead": "death",
+    "threat": "criminal intimidation", "kill my": "criminal intimidation",
+    "cheat": "cheating dishonestly inducing delivery", "fraud": "cheating", "duped": "cheating",
+    "entrust": "criminal breach of trust", "misappropriat": "criminal breach of trust",
+    "forg": "forgery", "fake": "forgery counterfeit", "brib": "gratification public servant",
+    "dowry": "dowry death cruelty", "harass": "cruelty", "stalk": "stalking",
+    "obscene": "obscene acts insult modesty woman", "molest": "outraging modesty woman",
+    "rape": "rape", "kidnap": "kidnapping", "abduct": "abduction", "taken away": "kidnapping lawful guardianship",
+    # "minor" alone also means slight ("minor injuries"), so only a child or an age counts
+    "minor son": "minor lawful guardianship", "minor daughter": "minor lawful guardianship",
+    "minor girl": "minor lawful guardianship", "minor boy": "minor lawful guardianship",
+    "minor child": "minor lawful guardianship", "minor sister": "minor lawful guardianship",
+    "minor brother": "minor lawful guardianship", "underage": "minor lawful guardianship", "rash": "rash negligent", "negligen": "negligent",
+    "accident": "rash negligent death", "poison": "poison", "fire to": "mischief by fire",
+    "set fire": "mischief by fire", "damage": "mischief", "defam": "defamation", "extort": "extortion",
+    "ransom": "kidnapping for ransom", "counterfeit": "counterfeit",
+}
+
+STEM_ENDINGS = ("s", "es", "e", "ed", "d", "en", "n", "ing", "er", "ers", "ly", "y", "ies", "ery", "ary", "ar",
+                "ars", "ion", "ions", "ation", "atory", "ment", "ce", "t", "tly", "ent", "ently", "al", "ous", "ened",
+                "ening")
+
+_PHRASES = [key for key in LEXICON if " " in key]
+
+
+def _lexicon_words():
+    """{word: lexicon key} for every word a single-word key matches"""
+    words = {}
+    for key in LEXICON:
+        if " " in key:
+            continue
+        for ending in ("",) + STEM_ENDINGS:
+            words.setdefault(key + ending, key)
+            if ending[:1] in ("e", "i") and key[-1] not in "aeiouwy":
+                words.setdefault(key + key[-1] + ending, key)
+    return words
+
+
+_LEXICON_WORDS = _lexicon_words()
+
+
+@lru_cache(maxsize=65536)
+def _buckets(token):
+    """Hash buckets of a token's word feature and character n-grams; tokens repeat, so this is memoised"""
+    padded = f"<{token}>"
+    keys = [f"w:{token}"] + [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    return tuple(zlib.crc32(key.encode("utf-8")) % HASH_BUCKETS for key in keys)
+
+
+def _expand(text):
+    words = TOKEN_PATTERN.findall(text.lower())
+    joined = f" {' '.join(words)} "
+    found = {key for key in _PHRASES if f" {key} " in joined}
+    found.update(_LEXICON_WORDS[word] for word in set(words) if word in _LEXICON_WORDS)
+    return " ".join(LEXICON[key] for key in sorted(found))
+
+
+@lru_cache(maxsize=32)
+def _counts(text, stop_words, expand):
+    # Memoised so every shard embedding the same query hashes it once
+    counts = {}
+    passes = [(text, 1.0)]
+    if expand and LEXICON_WEIGHT:
+        passes.append((_expand(text), LEXICON_WEIGHT))
+    for words, weight in passes:
+        for token in TOKEN_PATTERN.findall(words.lower()):
+            if token not in stop_words:
+                for bucket in _buckets(token):
+                    counts[bucket] = counts.get(bucket, 0.0) + weight
+    return counts
+
+
+class HashingEmbedder:
+    """Turns texts into sparse, L2-normalised hashed-feature rows; the SVD projection is applied on top"""
+
+    def __init__(self, stop_words=frozenset(), idf=None, features=None):
+        self.stop_words = stop_words
+        # idf per feature row and the sorted hash buckets those rows stand for, once built
+        self.idf = idf
+        self.features = features
+
+    def tokenize(self, text):
+        return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in self.stop_words]
+
+    def expand(self, text):
+        """Legal terms the lexicon adds for text"""
+        return _expand(text)
+
+    def counts(self, text, expand=True):
+        """{hash bucket: weighted count} over the words, their character n-grams and the lexicon terms.
+
+        The result is shared between calls and must not be modified.
+        """
+        return _counts(text, self.stop_words, expand)
+
+    def features_of(self, text, expand=True):
+        """(feature positions, weights) of text's L2-normalised row, as transform would give it"""
+        counts = self.counts(text, expand)
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        positions = np.searchsorted(self.features, buckets)
+        known = positions < len(self.features)
+        known[known] = self.features[positions[known]] == buckets[known]
+        positions, weights = positions[known], np.log1p(weights[known]) * self.idf[positions[known]]
+        if len(positions):
+            weights /= np.linalg.norm(weights)
+        return positions, weights
+
+    def transform(self, texts, expand=True):
+        """A (len(texts), n_features) CSR matrix of log-scaled, idf-weighted, L2-normalised rows"""
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            positions, weights = self.features_of(text, expand)
+            if len(positions):
+                rows.append(np.full(len(positions), row, dtype=np.int32))
+                columns.append(positions)
+                values.append(weights)
+        shape = (len(texts), len(self.features))
+        if not rows:
+            return sparse.csr_matrix(shape, dtype=np.float32)
+        return sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                                 shape=shape)
+
+
+def _normalise_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def build_embeddings(csv_path=CSV_PATH, index_dir=INDEX_DIR, dimensions=DIMENSIONS):
+    """Embed every section of the CSV and write the embedding index under index_dir/embedding"""
+    with build_lock(index_dir):
+        return _build_embeddings(csv_path, index_dir, dimensions)
+
+
+def _build_embeddings(csv_path, index_dir, dimensions=DIMENSIONS):
+    import pandas as pd
+    from scipy.sparse.linalg import svds
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    df = pd.read_csv(csv_path).fillna('')
+    texts = (df['Offense'] + '\n' + df['Description']).tolist()
+    embedder = HashingEmbedder(frozenset(ENGLISH_STOP_WORDS))
+
+    # The section texts already use the legal terms, so only queries are expanded.
+    # Keep only the buckets the corpus uses; a query feature outside them projects to zero anyway.
+    # (Counted past the memo, which is meant for queries.)
+    all_counts = [_counts.__wrapped__(text, embedder.stop_words, False) for text in texts]
+    features = np.array(sorted({bucket for counts in all_counts for bucket in counts}), dtype=np.int64)
+    doc_freq = np.zeros(len(features), dtype=np.float32)
+    for counts in all_counts:
+        doc_freq[np.searchsorted(features, list(counts))] += 1
+    embedder.features = features
+    embedder.idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+    matrix = embedder.transform(texts, expand=False)
+
+    dimensions = min(dimensions, min(matrix.shape) - 1)
+    # A fixed start vector keeps rebuilds of the same CSV identical
+    start = np.full(min(matrix.shape), 1 / np.sqrt(min(matrix.shape)))
+    _, _, components = svds(matrix.astype(np.float64), k=dimensions, v0=start)
+    projection = components.T.astype(np.float32)
+    embeddings = _normalise_rows(matrix @ projection)
+
+    target = os.path.join(index_dir, 'embedding')
+    tmp_dir = new_version(target)
+    np.save(os.path.join(tmp_dir, 'embeddings.npy'), embeddings.astype(np.float16))
+    np.save(os.path.join(tmp_dir, 'projection.npy'), projection.astype(np.float16))
+    np.save(os.path.join(tmp_dir, 'features.npy'), features)
+    np.save(os.path.join(tmp_dir, 'idf.npy'), embedder.idf)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': EMBEDDING_VERSION,
+            'checksum': csv_checksum(csv_path),
+            'dimensions': dimensions,
+            'stop_words': sorted(ENGLISH_STOP_WORDS),
+        }, f)
+
+    return publish(target, tmp_dir)
+
+
+def embeddings_are_current(csv_path=CSV_PATH, index_dir=INDEX_DIR):
+    """Check whether the embedding index on disk was built from the current CSV"""
+    meta = read_meta(current_version(os.path.join(index_dir, 'embedding')))
+    return (
+        meta is not None
+        and meta.get('version') == EMBEDDING_VERSION
+        and meta.get('checksum') == csv_checksum(csv_path)
+    )
+
+
+class EmbeddingIndex:
+    """Memory-mapped float16 section embeddings and the projection that embeds queries"""
+
+    def __init__(self, embedding_dir):
+        # Read from the version current now, like SectionIndex
+        version_dir = current_version(embedding_dir)
+        meta = read_meta(version_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No embedding index in {embedding_dir}")
+        embedding_dir = version_dir
+        self.checksum = meta['checksum']
+        self.dimensions = meta['dimensions']
+        # Plain ndarray views of the memory maps; indexing a np.memmap is several times slower
+        self.embeddings = np.asarray(np.load(os.path.join(embedding_dir, 'embeddings.npy'), mmap_mode='r'))
+        self.projection = np.asarray(np.load(os.path.join(embedding_dir, 'projection.npy'), mmap_mode='r'))
+        # An index that fits in one search block is widened once rather than on every search
+        self._widened = self.embeddings.astype(np.float32) if len(self.embeddings) <= SEARCH_BLOCK else None
+        self.embedder = HashingEmbedder(
+            frozenset(meta['stop_words']),
+            idf=np.asarray(np.load(os.path.join(embedding_dir, 'idf.npy'), mmap_mode='r')),
+            features=np.asarray(np.load(os.path.join(embedding_dir, 'features.npy'), mmap_mode='r')),
+        )
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    def embed(self, texts):
+        """A (len(texts), dimensions) float32 array of L2-normalised query embeddings"""
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            positions, weights = self.embedder.features_of(text)
+            if len(positions):
+                # Only the projection rows of the query's features are read from disk
+                vectors[row] = weights @ self.projection[positions].astype(np.float32)
+        return _normalise_rows(vectors)
+
+    def feature_position(self, bucket):
+        """The projection row of a hash bucket, or None when no section uses it"""
+        position = int(np.searchsorted(self.embedder.features, bucket))
+        if position < len(self.embedder.features) and self.embedder.features[position] == bucket:
+            return position
+        return None
+
+    def similarity(self, texts):
+        """A (len(texts), n_sections) array of cosine similarities"""
+        return self.search(self.embed(texts))
+
+    def search(self, queries):
+        """Cosine similarities of L2-normalised query embeddings with every section"""
+        if self._widened is not None:
+            return queries @ self._widened.T
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        # float16 products don't go through BLAS, so widen the matrix a block at a time
+        for start in range(0, len(self), SEARCH_BLOCK):
+            block = np.asarray(self.embeddings[start:start + SEARCH_BLOCK], dtype=np.float32)
+            scores[:, start:start + SEARCH_BLOCK] = queries @ block.T
+        return scores
+
+
+def load_embeddings(csv_path=CSV_PATH, index_dir=INDEX_DIR):
+    """Load the embedding index, rebuilding it first if the CSV has changed"""
+    return load_current(lambda directory: EmbeddingIndex(os.path.join(directory, 'embedding')),
+                        embeddings_are_current, _build_embeddings, csv_path, index_dir)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    index_dir = sys.argv[2] if len(sys.argv) > 2 else INDEX_DIR
+    print(f"Embedding index written to {build_embeddings(csv_path, index_dir)}")
@@ -0,0 +1,319 @@
+"""Append-only archive of generated FIRs, searchable by accused, place, section and text.
+
+Every finished FIR (the complaint, retrieved sections, FIR and analysis) is
+appended to a SQLite file, FIR_ARCHIVE_DB (default fir_archive.db next to
+this file), shared by every process. Each row keeps the few columns a
+listing shows, the full record as zlib-compressed JSON, and entries in two
+indexes: a contentless FTS5 index over the accused, place, complainant,
+sections and narrative, and an exact (section, row) index. PDFs are not
+stored; they are rendered again from the record when asked for.
+
+Listings and searches are newest first and paginated by keyset (the last
+row id seen), so page 1000 costs what page 1 does, and export streams the
+matching records page by page instead of loading them.
+
+    python fir_archive.py search "phone snatched" [--accused NAME] [--place PLACE] [--section IPC_379]
+    python fir_archive.py export firs.jsonl.gz [same filters]
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+
+from fir_numbers import DEFAULT_STATION
+from section_index import BASE_DIR
+
+DB_PATH = os.environ.get("FIR_ARCHIVE_DB", os.path.join(BASE_DIR, "fir_archive.db"))
+
+# Rows per page when exporting
+EXPORT_PAGE = 500
+
+SUMMARY_COLUMNS = ("id", "key", "fir_number", "station", "registration_date", "created", "source", "accused",
+                   "place", "complainant", "sections")
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+SECTION_KEY = re.compile(r"^([A-Za-z]+)[\s_\-]*(\d+[A-Za-z]*)$")
+
+
+@dataclass(slots=True)
+class Page:
+    """One page of summaries, newest first; pass cursor as before= for the next page (None on the last)"""
+
+    rows: list
+    cursor: int = None
+
+
+def section_key(text):
+    """'ipc 379', 'IPC-379' or 'IPC_379' -> 'IPC_379'; anything else is returned stripped"""
+    match = SECTION_KEY.match(text.strip())
+    return f"{match.group(1).upper()}_{match.group(2).upper()}" if match else text.strip()
+
+
+def _match_expression(text=None, **columns):
+    """An FTS5 query: every word of text in any column, and of each column filter in that column.
+
+    Words are quoted, so user input can never be read as FTS5 syntax, and
+    matched as prefixes, so 'ram' finds 'Ramesh'.
+    """
+    terms = []
+    for column, value in (("", text), *columns.items()):
+        words = TOKEN.findall(value or "")
+        if words:
+            expression = " AND ".join(f'"{word}"*' for word in words)
+            terms.append(f"{column} : ({expression})" if column else f"({expression})")
+    return " AND ".join(terms)
+
+
+def _summary(request, result):
+    """The indexed columns and search text of one FIR"""
+    complaint, fir, analysis = request["complaint"], result["fir_structure"], result["analysis"]
+    sections = list(result["sections"])
+    registration_date = request.get("registration_date") or ""
+    # The name the officer entered, else the model's; both are searchable
+    names = [name for name in (complaint.get("accused_name"), fir.get("accused")) if name]
+    place = complaint.get("place_of_occurrence") or fir.get("occurrence_place") or ""
+    text = " ".join(filter(None, (
+        complaint.get("case_description"), complaint.get("nature_of_offense"), complaint.get("accused_description"),
+        fir.get("incident_description"), fir.get("stolen_property"), analysis.get("analysis"),
+    )))
+    return {
+        "fir_number": request.get("fir_number") or fir.get("fir_number") or "",
+        "registration_date": registration_date,
+        "year": int(registration_date[-4:]) if registration_date[-4:].isdigit() else time.localtime().tm_year,
+        "source": result.get("source", ""),
+        "accused": names[0] if names else "",
+        "accused_text": " ".join(dict.fromkeys(names)),
+        "place": place,
+        "complainant": complaint.get("complainant_name") or fir.get("complainant_name") or "",
+        "sections": sections,
+        # Section keys and their labels as applied in the FIR ('IPC 379 - Theft')
+        "section_text": " ".join(sections + [str(label) for label in fir.get("sections_applied") or []]),
+        "text": text,
+    }
+
+
+class FIRArchive:
+    """The archive in one SQLite file; safe to share between threads and processes"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        # Rows are ~2.5 KB compressed; with the default 4 KB pages each one spills onto a mostly empty
+        # overflow page. Only takes effect when the file is created.
+        self._conn.execute("PRAGMA page_size = 16384")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS firs (
+                id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, fir_number TEXT NOT NULL,
+                station TEXT NOT NULL, year INTEGER NOT NULL, registration_date TEXT NOT NULL,
+                created REAL NOT NULL, source TEXT NOT NULL, accused TEXT NOT NULL, place TEXT NOT NULL,
+                complainant TEXT NOT NULL, sections TEXT NOT NULL, payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS firs_station ON firs (station, id);
+            CREATE INDEX IF NOT EXISTS firs_number ON firs (station, year, fir_number);
+            CREATE TABLE IF NOT EXISTS fir_sections (
+                section TEXT NOT NULL, fir INTEGER NOT NULL, PRIMARY KEY (section, fir)
+            ) WITHOUT ROWID;
+            CREATE VIRTUAL TABLE IF NOT EXISTS fir_search USING fts5(
+                accused, place, complainant, sections, text,
+                content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            );
+        """)
+
+    def add(self, request, result, key=None, station=None, created=None):
+        """Archive one finished FIR (a job's request and result); return its row id.
+
+        key identifies the FIR (such as its job id), so archiving the same one
+        twice keeps the first copy.
+        """
+        return self.add_many([(key, request, result, station, created)])[0]
+
+    def add_many(self, entries):
+        """Archive (key, request, result, station, created) entries in one transaction; return their row ids"""
+        rows = []
+        for key, request, result, station, created in entries:
+            # The trace is for the developer panel only
+            result = {name: value for name, value in result.items() if name != "trace"}
+            payload = json.dumps({"request": request, "result": result}, ensure_ascii=False, separators=(",", ":"))
+            rows.append((key or uuid.uuid4().hex, station or DEFAULT_STATION, created or time.time(),
+                         _summary(request, result), zlib.compress(payload.encode("utf-8"), 6)))
+        ids = []
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, station, created, summary, payload in rows:
+                    row = conn.execute(
+                        "INSERT INTO firs (key, fir_number, station, year, registration_date, created, source, "
+                        "accused, place, complainant, sections, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (key) DO NOTHING RETURNING id",
+                        (key, summary["fir_number"], station, summary["year"], summary["registration_date"],
+                         created, summary["source"], summary["accused"], summary["place"], summary["complainant"],
+                         ",".join(summary["sections"]), payload),
+                    ).fetchone()
+                    if row is None:
+                        ids.append(conn.execute("SELECT id FROM firs WHERE key = ?", (key,)).fetchone()[0])
+                        continue
+                    fir_id = row[0]
+                    conn.executemany("INSERT OR IGNORE INTO fir_sections (section, fir) VALUES (?, ?)",
+                                     [(section, fir_id) for section in summary["sections"]])
+                    conn.execute(
+                        "INSERT INTO fir_search (rowid, accused, place, complainant, sections, text) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (fir_id, summary["accused_text"], summary["place"], summary["complainant"],
+                         summary["section_text"], summary["text"]),
+                    )
+                    ids.append(fir_id)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def search(self, text=None, accused=None, place=None, complainant=None, section=None, station=None,
+               before=None, limit=20):
+        """Return a Page of FIR summaries matching every filter given, newest first.
+
+        text matches any column and the narrative; accused, place and
+        complainant match their own column (as word prefixes); section is an
+        exact section key ('IPC_379', or 'ipc 379'). before is the previous
+        page's cursor.
+        """
+        columns = ", ".join(f"f.{column}" for column in SUMMARY_COLUMNS)
+        match = _match_expression(text, accused=accused, place=place, complainant=complainant)
+        where, params = [], []
+        # Drive the query from the most selective index: the text index, else the section index, else the rows
+        if match:
+            source, order = "fir_search s JOIN firs f ON f.id = s.rowid", "s.rowid"
+            if section:
+                if SECTION_KEY.match(section.strip()):
+                    # Also as a phrase in the sections column, so FTS5 intersects the two instead of
+                    # this query checking every text match against the section index
+                    match += f' AND sections : "{section_key(section)}"'
+                where.append("EXISTS (SELECT 1 FROM fir_sections x WHERE x.section = ? AND x.fir = f.id)")
+                params.append(section_key(section))
+            where.insert(0, "fir_search MATCH ?")
+            params.insert(0, match)
+        elif section:
+            source, order = "fir_sections x JOIN firs f ON f.id = x.fir", "x.fir"
+            where.append("x.section = ?")
+            params.append(section_key(section))
+        else:
+            source, order = "firs f", "f.id"
+        if station:
+            where.append("f.station = ?")
+            params.append(station)
+        if before is not None:
+            where.append(f"{order} < ?")
+            params.append(before)
+        sql = (f"SELECT {columns} FROM {source}" + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY {order} DESC LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit + 1)).fetchall()
+        page = [dict(zip(SUMMARY_COLUMNS, row)) for row in rows[:limit]]
+        for row in page:
+            row["sections"] = row["sections"].split(",") if row["sections"] else []
+        return Page(page, page[-1]["id"] if len(rows) > limit else None)
+
+    def get(self, fir_id):
+        """The full archived record {'request', 'result', ...summary}, or None"""
+        records = self._records([fir_id])
+        return records[0] if records else None
+
+    def find(self, fir_number, station=None, year=None):
+        """The archived records with this FIR number at the station (newest first)"""
+        params = [station or DEFAULT_STATION, fir_number]
+        sql = "SELECT id FROM firs WHERE station = ? AND fir_number = ?"
+        if year:
+            sql = "SELECT id FROM firs WHERE station = ? AND fir_number = ? AND year = ?"
+            params.append(year)
+        with self._lock:
+            ids = [fir_id for fir_id, in self._conn.execute(sql + " ORDER BY id DESC", params)]
+        return self._records(ids)
+
+    def _records(self, ids):
+        if not ids:
+            return []
+        columns = ", ".join(SUMMARY_COLUMNS)
+        placeholders = ", ".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns}, payload FROM firs WHERE id IN ({placeholders}) ORDER BY id DESC", ids
+            ).fetchall()
+        records = []
+        for row in rows:
+            record = dict(zip(SUMMARY_COLUMNS, row[:-1]))
+            record["sections"] = record["sections"].split(",") if record["sections"] else []
+            record.update(json.loads(zlib.decompress(row[-1])))
+            records.append(record)
+        return records
+
+    def iter_records(self, page_size=EXPORT_PAGE, **filters):
+        """Yield every full record matching the search() filters, newest first, one page in memory at a time"""
+        before = None
+        while True:
+            page = self.search(before=before, limit=page_size, **filters)
+            yield from self._records([row["id"] for row in page.rows])
+            if page.cursor is None:
+                return
+            before = page.cursor
+
+    def export(self, out, **filters):
+        """Write every matching record to the text stream out as JSON lines; return how many"""
+        count = 0
+        for record in self.iter_records(**filters):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+        return count
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM firs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Search or export the FIR archive")
+    parser.add_argument("command", choices=("search", "export"))
+    parser.add_argument("target", nargs="?", help="search text, or the export file (.jsonl or .jsonl.gz)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--accused")
+    parser.add_argument("--place")
+    parser.add_argument("--complainant")
+    parser.add_argument("--section")
+    parser.add_argument("--station")
+    parser.add_argument("--text", help="search text (for export)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    archive = FIRArchive(args.db)
+    filters = {"accused": args.accused, "place": args.place, "complainant": args.complainant,
+               "section": args.section, "station": args.station}
+    if args.command == "search":
+        page = archive.search(args.target, limit=args.limit, **filters)
+        for row in page.rows:
+            print(f"{row['id']:>8}  {row['fir_number']:<10} {row['registration_date']:<10}  "
+                  f"{row['accused'][:24]:<24}  {row['place'][:24]:<24}  {', '.join(row['sections'])}")
+        if page.cursor is not None:
+            print(f"... more (next page: before={page.cursor})")
+    else:
+        if not args.target:
+            parser.error("export needs an output file")
+        opener = gzip.open if args.target.endswith(".gz") else open
+        with opener(args.target, "wt", encoding="utf-8") as out:
+            count = archive.export(out, text=args.text, **filters)
+        print(f"Exported {count} FIRs to {args.target}", file=sys.stderr)
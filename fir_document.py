@@ -0,0 +1,461 @@
+"""Typed complaint, FIR and analysis records.
+
+The app's form, batch_fir's rows and the template drafts all build a
+Complaint, and the completions answer in JSON that is parsed once into a
+FIRDocument or CaseAnalysis. Both render to the same (kind, ...) blocks the
+PDF renderer lays out, so the PDF, the UI and the batch export consume the
+parsed result directly instead of re-parsing free text. The registration
+details and the complainant's particulars come from the form, so the model
+only writes the narrative parts of the FIR.
+
+A reply that is not valid JSON is kept as raw text and rendered through
+parse_document, the older free-text parser. While a reply is still being
+streamed, load_partial_json reads the fields written so far.
+"""
+import json
+import re
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+
+UNKNOWN = "Not stated"
+POLICE_STATION = "[Police Station Name]"
+OFFICER = f"Investigating Officer, {POLICE_STATION}"
+ACTION_TAKEN = ("Since the above information discloses the commission of cognizable offences, the case is "
+                "registered under the sections above and taken up for investigation.")
+SIGNATURE = "(Signature/Thumb impression of the complainant)"
+
+# Form fields in display order, with the labels used in prompts and by parse_user_inputs
+COMPLAINT_FIELDS = (
+    ("date_of_incident", "Date of Incident"),
+    ("time_of_incident", "Time of Incident"),
+    ("place_of_occurrence", "Place of Occurrence"),
+    ("nature_of_offense", "Nature of Offense"),
+    ("complainant_name", "Complainant Name"),
+    ("complainant_contact", "Complainant Contact"),
+    ("complainant_address", "Complainant Address"),
+    ("complainant_id", "Complainant ID"),
+    ("accused_name", "Accused Name"),
+    ("accused_address", "Accused Address"),
+    ("accused_description", "Accused Description"),
+)
+# Column names older inputs use for the same fields
+_ALIASES = {"id_proof_details": "complainant_id", "nature_of_the_offense": "nature_of_offense"}
+
+_USER_FIELD = re.compile(r"^\s*([A-Za-z][A-Za-z /]{0,40}):\s*(.*)$")
+_NUMBERED_HEADING = re.compile(r'^\d{1,2}[.)]\s+\S')
+_FIELD = re.compile(r'^([^:]{1,40}):\s*(.*)$')
+_JSON_OBJECT = re.compile(r"\{.*\}", re.S)
+# A "key": "string value" pair, or a "key": ["list", "of strings"], the last one possibly cut off
+_PARTIAL_STRING = r'"(?:[^"\\]|\\.)*(?:"|\\?$)'
+_PARTIAL_FIELD = re.compile(rf'"(\w+)"\s*:\s*({_PARTIAL_STRING}|\[(?:\s*{_PARTIAL_STRING}\s*,?)*)')
+
+
+def parse_user_inputs(user_inputs):
+    """Parse 'Key: value' lines (the app's form, or batch_fir's columns) into a {key: value} dict.
+
+    Keys are lower-cased with spaces as underscores, e.g. 'Complainant Name'
+    becomes 'complainant_name'. Empty values are dropped.
+    """
+    parsed = {}
+    for line in str(user_inputs or "").split("\n"):
+        match = _USER_FIELD.match(line)
+        if match and match.group(2).strip():
+            parsed[match.group(1).strip().lower().replace(" ", "_").replace("/", "_")] = match.group(2).strip()
+    return parsed
+
+
+def _strip_markup(line):
+    return line.strip().strip('*#').strip()
+
+
+def parse_document(text):
+    """Parse free text into a list of (kind, ...) blocks.
+
+    Kinds are ('heading', text), ('field', key, value) and ('paragraph', text);
+    consecutive paragraph lines are merged into one block.
+    """
+    blocks = []
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            blocks.append(('paragraph', '\n'.join(paragraph)))
+            paragraph.clear()
+
+    for raw in str(text).split('\n'):
+        line = _strip_markup(raw)
+        if not line:
+            flush()
+            continue
+
+        match = _FIELD.match(line)
+        letters = re.sub(r'[^A-Za-z]', '', line)
+        if letters and line.rstrip(':').isupper() and len(line) <= 80:
+            flush()
+            blocks.append(('heading', line))
+        elif _NUMBERED_HEADING.match(line) and len(line) <= 80 and (line.endswith(':') or not match):
+            flush()
+            blocks.append(('heading', line.rstrip(':')))
+        elif match and match.group(2) and len(match.group(1).split()) <= 6:
+            # Only short labels count as keys, so prose that happens to contain a colon stays prose
+            flush()
+            blocks.append(('field', match.group(1).strip(), match.group(2).strip()))
+        else:
+            paragraph.append(line)
+    flush()
+    return blocks
+
+
+def blocks_to_text(blocks):
+    """Render blocks back to plain text, e.g. for diffs and text exports"""
+    lines = []
+    for kind, *parts in blocks:
+        if kind == 'heading':
+            lines += ['', parts[0]]
+        elif kind == 'field':
+            lines.append(f"{parts[0]}: {parts[1]}")
+        else:
+            lines.append(parts[0])
+    return '\n'.join(lines).strip() + '\n'
+
+
+def load_json(text):
+    """Return the JSON object in a completion, or None when there is none.
+
+    Tolerates code fences and chatter around the object, which models add
+    when JSON mode is unavailable.
+    """
+    text = str(text or "").strip()
+    for candidate in (text, *_JSON_OBJECT.findall(text)[:1]):
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def _partial_string(token):
+    token = token.rstrip("\\")
+    try:
+        return json.loads(token if len(token) > 1 and token.endswith('"') else token + '"')
+    except ValueError:
+        return ""
+
+
+def load_partial_json(text):
+    """The string and string-list fields of a JSON object still being streamed, the last possibly cut off"""
+    data = {}
+    for key, value in _PARTIAL_FIELD.findall(str(text or "")):
+        if value.startswith("["):
+            data[key] = [_partial_string(item) for item in re.findall(_PARTIAL_STRING, value, re.M)]
+        else:
+            data[key] = _partial_string(value)
+    return data
+
+
+def _text(value):
+    # Models sometimes answer a string field with a list or an object
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "; ".join(filter(None, (_text(item) for item in value)))
+    if isinstance(value, dict):
+        return "; ".join(f"{key}: {_text(item)}" for key, item in value.items() if _text(item))
+    return str(value).strip()
+
+
+def _lines(value):
+    if isinstance(value, list):
+        return [line for line in (_text(item) for item in value) if line]
+    return [line.strip() for line in _text(value).split("\n") if line.strip()]
+
+
+def _or_unknown(value):
+    return value or UNKNOWN
+
+
+@dataclass(slots=True)
+class Complaint:
+    """One complaint as entered on the form (or read from a batch row)"""
+
+    case_description: str
+    date_of_incident: str = ""
+    time_of_incident: str = ""
+    place_of_occurrence: str = ""
+    nature_of_offense: str = ""
+    complainant_name: str = ""
+    complainant_contact: str = ""
+    complainant_address: str = ""
+    complainant_id: str = ""
+    accused_name: str = ""
+    accused_address: str = ""
+    accused_description: str = ""
+    # Any other columns of a batch row, passed to the model as they are
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_mapping(cls, row, case_description=None):
+        """Build a Complaint from a dict such as a CSV row; unknown keys go to extra"""
+        known = {name for name, _ in COMPLAINT_FIELDS}
+        values, extra = {}, {}
+        for key, value in row.items():
+            if value in (None, "") or key in ("id", "case_description"):
+                continue
+            name = _ALIASES.get(key, key)
+            if name in known:
+                values[name] = str(value).strip()
+            else:
+                extra[key] = str(value).strip()
+        if case_description is None:
+            case_description = row.get("case_description", "")
+        return cls(str(case_description or ""), extra=extra, **values)
+
+    @classmethod
+    def from_dict(cls, data):
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    @classmethod
+    def coerce(cls, user_inputs, case_description=""):
+        """Return user_inputs as a Complaint, parsing the older 'Key: value' text when needed"""
+        if isinstance(user_inputs, cls):
+            return user_inputs
+        if isinstance(user_inputs, dict):
+            return cls.from_mapping(user_inputs, case_description)
+        return cls.from_mapping(parse_user_inputs(user_inputs), case_description)
+
+    def details(self):
+        """(label, value) pairs for the fields that were filled in"""
+        pairs = [(label, getattr(self, name)) for name, label in COMPLAINT_FIELDS if getattr(self, name)]
+        pairs += [(key.replace("_", " ").title(), value) for key, value in self.extra.items()]
+        return pairs
+
+    def details_text(self):
+        """The filled-in fields as 'Label: value' lines, for the prompt"""
+        return "\n".join(f"{label}: {value}" for label, value in self.details())
+
+    def accused(self):
+        return "; ".join(value for value in (self.accused_name, self.accused_address, self.accused_description)
+                         if value)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class FIRDocument:
+    """A FIR in the 13 numbered sections of the standard format"""
+
+    fir_number: str
+    registration_date: str
+    police_station: str = POLICE_STATION
+    occurrence_date: str = ""
+    occurrence_time: str = ""
+    occurrence_place: str = ""
+    information_received: str = ""
+    information_type: str = "Written"
+    complainant_name: str = ""
+    complainant_address: str = ""
+    complainant_contact: str = ""
+    complainant_id: str = ""
+    accused: str = ""
+    delay_reason: str = ""
+    stolen_property: str = ""
+    nature_of_offense: str = ""
+    incident_description: str = ""
+    sections_applied: list = field(default_factory=list)
+    action_taken: str = ACTION_TAKEN
+    officer: str = OFFICER
+    # 'llm' or 'local' (the template draft)
+    source: str = "llm"
+    # The model's reply when it could not be parsed; rendered in place of sections 2-13
+    raw: str = ""
+
+    # The keys the model is asked to fill; the occurrence ones only when the form left them empty
+    MODEL_FIELDS = ("occurrence_date", "occurrence_time", "occurrence_place", "accused", "delay_reason",
+                    "stolen_property", "incident_description", "sections_applied", "action_taken")
+
+    @classmethod
+    def from_complaint(cls, complaint, fir_number, registration_date, now=None):
+        """A FIR with every field the form already answers filled in"""
+        now = now or datetime.now()
+        return cls(
+            fir_number=fir_number,
+            registration_date=registration_date,
+            occurrence_date=complaint.date_of_incident,
+            occurrence_time=complaint.time_of_incident,
+            occurrence_place=complaint.place_of_occurrence,
+            information_received=now.strftime("%d-%m-%Y %H:%M"),
+            complainant_name=complaint.complainant_name,
+            complainant_address=complaint.complainant_address,
+            complainant_contact=complaint.complainant_contact,
+            complainant_id=complaint.complainant_id,
+            accused=complaint.accused(),
+            nature_of_offense=complaint.nature_of_offense,
+            incident_description=complaint.case_description.strip(),
+        )
+
+    @classmethod
+    def from_completion(cls, text, complaint, fir_number, registration_date, now=None):
+        """Parse the model's JSON reply over the form's fields; unparsable replies are kept as raw"""
+        document = cls.from_complaint(complaint, fir_number, registration_date, now)
+        data = load_json(text)
+        if data is None:
+            document.raw = str(text or "").strip()
+            return document
+        return document.fill(data)
+
+    def fill(self, data):
+        """Set the fields the model wrote in data, keeping occurrence fields already answered; returns self"""
+        for name in self.MODEL_FIELDS:
+            if name.startswith("occurrence_") and getattr(self, name):
+                continue
+            value = _lines(data.get(name)) if name == "sections_applied" else _text(data.get(name))
+            if value:
+                setattr(self, name, value)
+        return self
+
+    @classmethod
+    def from_dict(cls, data):
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True)
+
+    def blocks(self):
+        """The FIR as (kind, ...) blocks for the PDF and UI renderers"""
+        blocks = [
+            ('heading', '1. FIR Number and Registration Details'),
+            ('field', 'FIR No.', self.fir_number),
+            ('field', 'Registration Date', self.registration_date),
+            ('field', 'Police Station', self.police_station),
+        ]
+        if self.raw:
+            return blocks + parse_document(self.raw)
+        return blocks + [
+            ('heading', '2. Date, Time and Place of Occurrence'),
+            ('field', 'Date of Incident', _or_unknown(self.occurrence_date)),
+            ('field', 'Time of Incident', _or_unknown(self.occurrence_time)),
+            ('field', 'Place of Occurrence', _or_unknown(self.occurrence_place)),
+            ('heading', '3. Information Received At Police Station'),
+            ('field', 'Date and Time', _or_unknown(self.information_received)),
+            ('heading', '4. Type of Information'),
+            ('paragraph', self.information_type),
+            ('heading', '5. Complainant Details'),
+            ('field', 'Name', _or_unknown(self.complainant_name)),
+            ('field', 'Address', _or_unknown(self.complainant_address)),
+            ('field', 'Contact', _or_unknown(self.complainant_contact)),
+            ('field', 'ID Proof', _or_unknown(self.complainant_id)),
+            ('heading', '6. Details of Known/Unknown Accused'),
+            ('paragraph', self.accused or 'Unknown'),
+            ('heading', '7. Reasons for delay in reporting'),
+            ('paragraph', self.delay_reason or 'Not applicable'),
+            ('heading', '8. Particulars of properties stolen'),
+            ('paragraph', self.stolen_property or 'Not applicable'),
+            ('heading', '9. Description of the Incident'),
+            ('field', 'Nature of Offense', _or_unknown(self.nature_of_offense)),
+            ('paragraph', _or_unknown(self.incident_description)),
+            ('heading', '10. Sections of Law Applied'),
+            ('paragraph', '\n'.join(self.sections_applied) or 'To be determined on investigation'),
+            ('heading', '11. Action Taken'),
+            ('paragraph', self.action_taken),
+            ('heading', '12. Signature/Thumb Impression of Complainant'),
+            ('paragraph', SIGNATURE),
+            ('heading', '13. Officer Details'),
+            ('paragraph', self.officer),
+        ]
+
+    def to_text(self):
+        return "FIRST INFORMATION REPORT\n" + blocks_to_text(self.blocks())
+
+
+@dataclass(slots=True)
+class CaseAnalysis:
+    """The applicable sections, legal analysis and investigation recommendations for a complaint"""
+
+    applicable_sections: list = field(default_factory=list)
+    additional_sections: list = field(default_factory=list)
+    analysis: str = ""
+    recommendations: list = field(default_factory=list)
+    # 'llm', 'local' (the section list only) or 'error'
+    source: str = "llm"
+    # The model's reply when it could not be parsed, or the error shown instead of an analysis
+    raw: str = ""
+
+    @classmethod
+    def from_completion(cls, text):
+        data = load_json(text)
+        if data is None:
+            return cls(raw=str(text or "").strip())
+        return cls(
+            applicable_sections=_sections(data.get("applicable_sections")),
+            additional_sections=_sections(data.get("additional_sections")),
+            analysis=_text(data.get("analysis")),
+            recommendations=_lines(data.get("recommendations")),
+        )
+
+    @classmethod
+    def error(cls, message):
+        return cls(raw=message, source="error")
+
+    def fill(self, data):
+        """Set the analysis and recommendations written in data (e.g. from load_partial_json); returns self"""
+        self.analysis = _text(data.get("analysis")) or self.analysis
+        self.recommendations = _lines(data.get("recommendations")) or self.recommendations
+        return self
+
+    @classmethod
+    def from_dict(cls, data):
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True)
+
+    def blocks(self):
+        if self.raw:
+            return parse_document(self.raw)
+        blocks = [('heading', 'APPLICABLE SECTIONS')]
+        blocks += _section_blocks(self.applicable_sections) or [('paragraph', 'None identified.')]
+        if self.additional_sections:
+            blocks.append(('heading', 'ADDITIONAL SECTIONS'))
+            blocks += _section_blocks(self.additional_sections)
+        if self.analysis:
+            blocks.append(('heading', 'CASE ANALYSIS'))
+            blocks += [('paragraph', part.strip()) for part in self.analysis.split('\n\n') if part.strip()]
+        if self.recommendations:
+            blocks.append(('heading', 'INVESTIGATION RECOMMENDATIONS'))
+            blocks.append(('paragraph', '\n'.join(f"- {line}" for line in self.recommendations)))
+        return blocks
+
+    def to_text(self):
+        return blocks_to_text(self.blocks())
+
+
+def _sections(value):
+    # [{"section": ..., "reason": ...}] with plain strings accepted as sections without a reason
+    if not isinstance(value, list):
+        value = _lines(value)
+    entries = []
+    for item in value:
+        if isinstance(item, dict):
+            entry = {"section": _text(item.get("section")), "reason": _text(item.get("reason"))}
+        else:
+            entry = {"section": _text(item), "reason": ""}
+        if entry["section"]:
+            entries.append(entry)
+    return entries
+
+
+def _section_blocks(entries):
+    return [('field', entry['section'], entry['reason']) if entry['reason'] else ('paragraph', entry['section'])
+            for entry in entries]
@@ -0,0 +1,192 @@
+"""Sequential FIR numbers per police station and year.
+
+Every process (Streamlit server, batch_fir.py, job workers) allocates from
+the same SQLite file, FIR_NUMBERS_DB (default fir_numbers.db next to this
+file), so numbers are unique across sessions and processes and restart
+from 1 each year, as a station's FIR register does.
+
+To keep the file's write lock out of the hot path, an allocator reserves a
+block of FIR_NUMBER_BLOCK numbers per station and year in one statement and
+hands them out from memory. close() (run at exit) gives back the numbers it
+did not use: the sequence is rewound if no one reserved after it, and
+otherwise they are kept and reissued (lowest first) by the next reservation.
+A number handed out for a FIR that then failed is given back with
+give_back(): into the allocator's block if it has one, so it is reissued
+next, or else to the file. So no number is ever issued twice or lost: every number below the
+sequence's next has been issued once or is waiting to be reissued.
+
+Blocks have a cost with several processes: numbers are not issued in
+strictly increasing time order, and a number given back below another
+process's block stays a hole in the register until it is reissued. A
+process killed without running close() leaves the rest of its block as a
+gap for good. Set FIR_NUMBER_BLOCK=1 where the register must be strictly
+ordered and gap-free even then; each number is then its own (still atomic)
+write.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from section_index import BASE_DIR
+
+DB_PATH = os.environ.get("FIR_NUMBERS_DB", os.path.join(BASE_DIR, "fir_numbers.db"))
+BLOCK_SIZE = int(os.environ.get("FIR_NUMBER_BLOCK", "16"))
+
+# The station numbering this deployment's FIRs
+DEFAULT_STATION = os.environ.get("FIR_POLICE_STATION", "default")
+
+
+class FIRNumberAllocator:
+    """Hands out FIR numbers for (station, year) from blocks reserved in a shared SQLite file"""
+
+    def __init__(self, path=DB_PATH, block_size=BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError(f"block_size must be at least 1, not {block_size}")
+        self.path = path
+        self.block_size = block_size
+        # (station, year) -> the numbers reserved but not yet handed out, lowest last
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # next is the first number never reserved by anyone
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fir_sequences ("
+            "station TEXT NOT NULL, year INTEGER NOT NULL, next INTEGER NOT NULL, PRIMARY KEY (station, year))"
+        )
+        # Numbers reserved and then given back unused, below their sequence's next
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fir_returned_numbers ("
+            "station TEXT NOT NULL, year INTEGER NOT NULL, number INTEGER NOT NULL, "
+            "PRIMARY KEY (station, year, number))"
+        )
+
+    def allocate(self, station=None, year=None):
+        """Return the next FIR number for the station (default DEFAULT_STATION) and year (default this year)"""
+        key = (station or DEFAULT_STATION, year or datetime.now().year)
+        with self._lock:
+            block = self._blocks.get(key)
+            if not block:
+                block = self._blocks[key] = self._reserve(*key)
+            return block.pop()
+
+    def _reserve(self, station, year):
+        """Take up to block_size numbers: given-back ones first, then a fresh range from the sequence"""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            returned = [number for number, in conn.execute(
+                "DELETE FROM fir_returned_numbers WHERE rowid IN ("
+                "SELECT rowid FROM fir_returned_numbers WHERE station = ? AND year = ? ORDER BY number LIMIT ?"
+                ") RETURNING number",
+                (station, year, self.block_size),
+            )]
+            if returned:
+                numbers = returned
+            else:
+                end, = conn.execute(
+                    "INSERT INTO fir_sequences (station, year, next) VALUES (?, ?, ?) "
+                    "ON CONFLICT (station, year) DO UPDATE SET next = next + excluded.next - 1 RETURNING next",
+                    (station, year, 1 + self.block_size),
+                ).fetchone()
+                numbers = range(end - self.block_size, end)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        # Popped from the end, so the lowest number goes first
+        return sorted(numbers, reverse=True)
+
+    def release(self):
+        """Give back every number reserved by this allocator and not handed out"""
+        with self._lock:
+            blocks, self._blocks = self._blocks, {}
+            for (station, year), numbers in blocks.items():
+                if numbers:
+                    self._give_back(station, year, numbers)
+
+    def give_back(self, number, station=None, year=None):
+        """Give back a number handed out by allocate() but never used, such as one for a FIR that failed"""
+        key = (station or DEFAULT_STATION, year or datetime.now().year)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block:
+                # Reissued next, from memory, like the rest of the block
+                block.append(number)
+                block.sort(reverse=True)
+            else:
+                self._give_back(*key, [number])
+
+    def _give_back(self, station, year, numbers):
+        conn = self._conn
+        numbers = sorted(numbers)
+        # Only the run of consecutive numbers at the top can be rewound; a block of
+        # given-back numbers may have numbers issued by others in between
+        run = len(numbers) - 1
+        while run and numbers[run - 1] == numbers[run] - 1:
+            run -= 1
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rewound = conn.execute(
+                "UPDATE fir_sequences SET next = ? WHERE station = ? AND year = ? AND next = ?",
+                (numbers[run], station, year, numbers[-1] + 1),
+            ).rowcount
+            conn.executemany(
+                "INSERT OR IGNORE INTO fir_returned_numbers (station, year, number) VALUES (?, ?, ?)",
+                [(station, year, number) for number in (numbers[:run] if rewound else numbers)],
+            )
+            self._trim(station, year)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _trim(self, station, year):
+        # Given-back numbers just below next (left by blocks released earlier) rewind it further
+        while True:
+            trimmed = self._conn.execute(
+                "DELETE FROM fir_returned_numbers WHERE station = ? AND year = ? AND number = ("
+                "SELECT next - 1 FROM fir_sequences WHERE station = ? AND year = ?)",
+                (station, year, station, year),
+            ).rowcount
+            if not trimmed:
+                return
+            self._conn.execute("UPDATE fir_sequences SET next = next - 1 WHERE station = ? AND year = ?",
+                               (station, year))
+
+    def returned(self, station=None, year=None):
+        """The numbers given back unused and waiting to be reissued, lowest first"""
+        key = (station or DEFAULT_STATION, year or datetime.now().year)
+        with self._lock:
+            return [number for number, in self._conn.execute(
+                "SELECT number FROM fir_returned_numbers WHERE station = ? AND year = ? ORDER BY number", key
+            )]
+
+    def issued(self, station=None, year=None):
+        """How many numbers the station has used in the year, across every process (reserved blocks included)"""
+        key = (station or DEFAULT_STATION, year or datetime.now().year)
+        with self._lock:
+            row = self._conn.execute("SELECT next FROM fir_sequences WHERE station = ? AND year = ?", key).fetchone()
+            returned, = self._conn.execute(
+                "SELECT COUNT(*) FROM fir_returned_numbers WHERE station = ? AND year = ?", key
+            ).fetchone()
+        return (row[0] - 1 if row else 0) - returned
+
+    def close(self):
+        """Give back the unused numbers and close the file"""
+        self.release()
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show how many FIR numbers each station has used per year")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+    allocator = FIRNumberAllocator(args.db)
+    for station, year in allocator._conn.execute("SELECT station, year FROM fir_sequences ORDER BY year, station"):
+        print(f"{year} {station}: {allocator.issued(station, year)} FIRs")
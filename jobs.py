@@ -0,0 +1,374 @@
+"""Background jobs for FIR generation.
+
+A script run only submits a job and keeps its id; worker threads claim
+queued jobs and run both completions, and the results page polls the job
+until it is done, so a rerun or a browser refresh does not lose the work
+and no Streamlit thread waits on the LLM.
+
+Jobs are kept in memory, or with FIR_JOBS_DB in a SQLite file that
+survives restarts: finished FIRs can be reopened by id, and a job whose
+worker died is claimed again once it has gone STALE_AFTER seconds without
+an update. Any number of processes can share the file; with
+FIR_JOB_WORKERS=0 the app only enqueues, and separate workers run the jobs:
+
+    FIR_JOBS_DB=jobs.db python jobs.py [--workers 32]
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# A running job not updated for this long is assumed lost with its worker and run again
+STALE_AFTER = float(os.environ.get("FIR_JOB_STALE_AFTER", 600))
+
+# Seconds an idle worker sleeps before checking a shared SQLite queue for jobs from other processes
+POLL_INTERVAL = 0.5
+
+# Longest a worker backs off after the store fails (e.g. "database is locked"), doubling from POLL_INTERVAL
+MAX_BACKOFF = 30.0
+
+# Seconds a submit() hint is kept for this process's workers; another process may have run the job
+HINT_TTL = 120.0
+
+
+@dataclass(slots=True)
+class Job:
+    """One FIR generation: its inputs, where it has got to and, once done, its result"""
+
+    id: str
+    request: dict
+    status: str = QUEUED
+    stage: str = "Waiting for a worker"
+    progress: float = 0.0
+    result: dict = None
+    # What the result looks like so far (the FIR as it streams in), until the job is done
+    partial: dict = None
+    error: str = None
+    attempts: int = 0
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class MemoryJobStore:
+    """Jobs of this process only; the oldest finished jobs are dropped past max_jobs"""
+
+    def __init__(self, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            if job.status == QUEUED:
+                self._queue.append(job.id)
+            while len(self._jobs) > self.max_jobs:
+                oldest = next((job_id for job_id, old in self._jobs.items() if old.finished), None)
+                if oldest is None:
+                    break
+                del self._jobs[oldest]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # A copy, so readers never see a half-applied update
+            return None if job is None else Job(**job.to_dict())
+
+    def update(self, job_id, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.updated = time.time()
+
+    def claim(self):
+        """Mark the oldest queued job running and return it, or None"""
+        with self._lock:
+            while self._queue:
+                job = self._jobs.get(self._queue.popleft())
+                if job is not None and job.status == QUEUED:
+                    job.status, job.attempts, job.updated = RUNNING, job.attempts + 1, time.time()
+                    return Job(**job.to_dict())
+            return None
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+
+class SQLiteJobStore:
+    """Jobs in a SQLite file shared by every process that opens it"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable across a crash of the process; only a power cut can lose the last few updates
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, stage TEXT, "
+            "progress REAL NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL, "
+            "created REAL NOT NULL, updated REAL NOT NULL, partial TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "partial" not in columns:
+            # Files created before jobs streamed their partial results
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN partial TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def add(self, job):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request, stage, progress, result, error, attempts, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.status, json.dumps(job.request, ensure_ascii=False), job.stage, job.progress,
+                 _dumps(job.result), job.error, job.attempts, job.created, job.updated),
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, request, status, stage, progress, result, partial, error, attempts, created, updated "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, request, status, stage, progress, result, partial, error, attempts, created, updated = row
+        return Job(job_id, json.loads(request), status, stage, progress, _loads(result), _loads(partial), error,
+                   attempts, created, updated)
+
+    def update(self, job_id, **changes):
+        for name in ("result", "partial"):
+            if name in changes:
+                changes[name] = _dumps(changes[name])
+        changes["updated"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in changes)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*changes.values(), job_id))
+
+    def claim(self):
+        """Mark the oldest queued (or stale running) job running and return it, or None"""
+        now = time.time()
+        with self._lock:
+            # One statement, so two processes can never claim the same job
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND updated < ?) ORDER BY created LIMIT 1"
+                ") RETURNING id",
+                (RUNNING, now, QUEUED, RUNNING, now - STALE_AFTER),
+            ).fetchone()
+        return None if row is None else self.get(row[0])
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def _dumps(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _loads(text):
+    return None if text is None else json.loads(text)
+
+
+class JobQueue:
+    """Runs jobs on a pool of worker threads.
+
+    A worker mostly waits on completions running on the shared event loop,
+    so workers are cheap; the LLM rate limits in llm_policy, not their
+    number, bound the load on the API.
+
+    run(request, hint, report) does the work and returns the result dict;
+    report(stage, progress, partial=None) updates what the results page
+    shows, partial being the result so far (kept until the job is done), and hint
+    is whatever was passed to submit() in this process (such as an analysis
+    completion already in flight), or None when the job is run elsewhere.
+    on_done(job_id, request, result), if given, is called when a job has
+    succeeded (or is recorded), just before it is marked done; e.g. to
+    archive the FIR. on_failed(job_id, request, error), if given, is called
+    when run() raised, after the job is marked failed; e.g. to give back its
+    FIR number.
+    """
+
+    def __init__(self, run, store=None, workers=32, on_done=None, on_failed=None):
+        self.run = run
+        self.store = MemoryJobStore() if store is None else store
+        self.workers = workers
+        self.on_done = on_done
+        self.on_failed = on_failed
+        # job id -> (hint, when it was submitted)
+        self._hints = {}
+        self._hints_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._threads = []
+        # Started straight away, so jobs left queued in a shared store by a restart are picked up
+        self._start_workers()
+
+    @classmethod
+    def from_env(cls, run, on_done=None, on_failed=None):
+        """Build the queue from FIR_JOBS_DB and FIR_JOB_WORKERS"""
+        db_path = os.environ.get("FIR_JOBS_DB")
+        store = SQLiteJobStore(db_path) if db_path else None
+        return cls(run, store, workers=int(os.environ.get("FIR_JOB_WORKERS", 32)), on_done=on_done,
+                   on_failed=on_failed)
+
+    def submit(self, request, hint=None):
+        """Queue a job for request and return its id"""
+        job = Job(uuid.uuid4().hex, request)
+        now = time.time()
+        with self._hints_lock:
+            for job_id in [job_id for job_id, (_, added) in self._hints.items() if now - added > HINT_TTL]:
+                del self._hints[job_id]
+            if hint is not None:
+                self._hints[job.id] = (hint, now)
+        self.store.add(job)
+        metrics.increment("fir_jobs_total", status="submitted")
+        with self._wake:
+            self._wake.notify()
+        return job.id
+
+    def record(self, request, result):
+        """Store a result produced without a worker (such as a template draft) as a finished job"""
+        job = Job(uuid.uuid4().hex, request, status=DONE, stage="Done", progress=1.0, result=result)
+        self._done(job.id, request, result)
+        self.store.add(job)
+        return job.id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _start_workers(self):
+        with self._wake:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"fir-job-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        failures = 0
+        while True:
+            try:
+                job = self.store.claim()
+                failures = 0
+                if job is None:
+                    with self._wake:
+                        self._wake.wait(POLL_INTERVAL)
+                    continue
+                self.execute(job)
+            except Exception:
+                # A worker that dies takes its share of the pool with it, so it backs off and carries on
+                failures += 1
+                logger.exception("FIR job worker error; retrying")
+                time.sleep(min(MAX_BACKOFF, POLL_INTERVAL * 2 ** failures))
+
+    def execute(self, job):
+        """Run one claimed job to completion, recording its result or error"""
+        with self._hints_lock:
+            hint, _ = self._hints.pop(job.id, (None, None))
+
+        def report(stage, progress, partial=None):
+            changes = dict(stage=stage, progress=progress)
+            if partial is not None:
+                changes["partial"] = partial
+            try:
+                self.store.update(job.id, **changes)
+            except Exception:
+                # Progress is only shown while waiting; the job carries on without it
+                logger.warning("Could not update the progress of job %s", job.id, exc_info=True)
+
+        # The job's own spans go into its result, for the developer panel
+        result = error = None
+        stored = True
+        with metrics.trace() as spans:
+            queued_ms = round((time.time() - job.created) * 1000)
+            with metrics.span("fir_job", attempt=job.attempts, queued_ms=queued_ms) as span:
+                try:
+                    report("Starting", 0.0)
+                    result = dict(self.run(job.request, hint, report))
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                span.set(status=FAILED if error else DONE)
+        if not error:
+            try:
+                # Before the job shows as done, so whoever polls it finds the follow-up finished too
+                self._done(job.id, job.request, result)
+                self.store.update(job.id, status=DONE, stage="Done", progress=1.0, result=dict(result, trace=spans),
+                                  partial=None)
+            except Exception as e:
+                # Such as a locked store or a result that cannot be serialised
+                logger.exception("Could not store the result of job %s", job.id)
+                error = f"The result could not be stored: {type(e).__name__}: {e}"
+                stored = False
+        metrics.increment("fir_jobs_total", status=FAILED if error else DONE)
+        if error:
+            try:
+                self.store.update(job.id, status=FAILED, stage="Failed", error=error, partial=None)
+            except Exception:
+                # The job is still marked running, so it is claimed again once stale; its FIR number stays taken
+                logger.exception("Could not mark job %s failed", job.id)
+                return
+            # A result that was produced but not stored may already have been archived by on_done
+            if stored and self.on_failed is not None:
+                try:
+                    self.on_failed(job.id, job.request, error)
+                except Exception:
+                    logger.exception("on_failed failed for job %s", job.id)
+
+    def _done(self, job_id, request, result):
+        if self.on_done is None:
+            return
+        try:
+            self.on_done(job_id, request, result)
+        except Exception:
+            # The FIR itself is done and stored; only the follow-up failed
+            logger.exception("on_done failed for job %s", job_id)
+
+    def counts(self):
+        """Jobs per status"""
+        return self.store.counts()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run FIR generation jobs from a shared FIR_JOBS_DB queue")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("FIR_JOB_WORKERS", 32)) or 32)
+    args = parser.parse_args()
+    if not os.environ.get("FIR_JOBS_DB"):
+        parser.error("set FIR_JOBS_DB to the queue the app submits to")
+    logging.basicConfig(level=logging.INFO)
+
+    import ai_model
+    JobQueue(ai_model.run_fir_job, SQLiteJobStore(os.environ["FIR_JOBS_DB"]), workers=args.workers,
+             on_done=ai_model.archive_fir, on_failed=ai_model.release_job_fir_number)
+    print(f"Running FIR jobs from {os.environ['FIR_JOBS_DB']} with {args.workers} workers", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
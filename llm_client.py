@@ -0,0 +1,349 @@
+"""Rate limiting, retries, circuit breaking and model fallback for chat completions.
+
+ResilientClient and AsyncResilientClient wrap a Groq (or stub) client and
+expose the same ``chat.completions.create`` call. Every call goes through a
+shared LLMPolicy, which:
+
+* takes a token from a per-model token bucket, so bursts are smoothed out
+  before they turn into 429s;
+* retries transient failures (429, timeouts, connection errors, 5xx) with
+  jittered exponential backoff, waiting at least as long as the server's
+  retry-after header; a 429 pauses every caller of that model, not just the
+  one that hit it;
+* opens a per-model circuit breaker after repeated failures, so callers
+  fail fast instead of queueing on a dead upstream;
+* switches to the fallback model while the primary one is rate limited for
+  longer than fallback_after seconds or its breaker is open.
+
+LLMPolicy.from_env reads the settings from FIR_LLM_* environment variables.
+Rate limiting is off unless FIR_LLM_RPM is set, since the quota depends on
+the account tier.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import metrics
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the API while a model's circuit breaker is open"""
+
+    def __init__(self, model, retry_in):
+        super().__init__(f"{model} is unavailable; retrying in {retry_in:.0f}s")
+        self.model = model
+        self.retry_in = retry_in
+
+
+def status_code(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_rate_limited(error):
+    return status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient(error):
+    """Whether retrying the same request could succeed"""
+    if is_rate_limited(error) or isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if type(error).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    code = status_code(error)
+    return code is not None and code >= 500
+
+
+def retry_after(error):
+    """Return the server's retry-after hint in seconds, if it sent one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to capacity"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """Opens when most recent calls failed and lets one trial call through after reset_timeout.
+
+    The breaker trips once the last window calls hold at least
+    failure_threshold failures making up at least failure_ratio of them.
+    Counting a window rather than consecutive failures matters under
+    concurrency: timeouts are reported long after the successes that
+    started alongside them, so they arrive in runs even when most calls work.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, failure_ratio=0.5, window=20):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_ratio = failure_ratio
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        return "open" if now - self._opened_at < self.reset_timeout else "half-open"
+
+    def retry_in(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """Whether a call may go ahead now; in half-open state only one trial call is allowed"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._outcomes.append(False)
+            if self._trial or self._opened_at is None:
+                # Closing after a trial call starts a fresh window
+                if self._trial:
+                    self._outcomes.clear()
+                self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if self._trial or (failures >= self.failure_threshold
+                               and failures >= self.failure_ratio * len(self._outcomes)):
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """End a call that says nothing about the model's health (429, bad request, cancelled).
+
+        A trial call ending this way lets the next caller make the trial
+        instead, so the breaker cannot be left waiting on it forever.
+        """
+        with self._lock:
+            self._trial = False
+
+
+class _ModelState:
+    def __init__(self, policy):
+        self.bucket = TokenBucket(policy.requests_per_minute / 60.0, policy.burst) if policy.requests_per_minute else None
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self.resume_at = 0.0
+
+
+class LLMPolicy:
+    """Retry, rate-limit, circuit-breaker and fallback settings and state shared by all callers"""
+
+    def __init__(self, fallback_model=None, max_retries=3, base_delay=0.5, max_delay=30.0,
+                 requests_per_minute=None, burst=None, failure_threshold=5, reset_timeout=30.0,
+                 fallback_after=5.0, attempt_timeout=None):
+        self.fallback_model = fallback_model
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.fallback_after = fallback_after
+        self.attempt_timeout = attempt_timeout
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build the policy from FIR_LLM_* environment variables"""
+        env = os.environ.get
+        rpm = float(env("FIR_LLM_RPM", "0"))
+        timeout = float(env("FIR_LLM_ATTEMPT_TIMEOUT", "0"))
+        return cls(
+            fallback_model=env("FIR_LLM_FALLBACK_MODEL", "llama3-8b-8192") or None,
+            max_retries=int(env("FIR_LLM_MAX_RETRIES", "3")),
+            requests_per_minute=rpm or None,
+            burst=float(env("FIR_LLM_BURST", "5")),
+            failure_threshold=int(env("FIR_LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(env("FIR_LLM_BREAKER_RESET", "30")),
+            fallback_after=float(env("FIR_LLM_FALLBACK_AFTER", "5")),
+            attempt_timeout=timeout or None,
+        )
+
+    def model_state(self, model):
+        with self._lock:
+            state = self._models.get(model)
+            if state is None:
+                state = self._models[model] = _ModelState(self)
+            return state
+
+    def _pause(self, model):
+        return max(0.0, self.model_state(model).resume_at - time.monotonic())
+
+    def _choose(self, model):
+        """Return (model, seconds to wait) for the next attempt, preferring the requested model"""
+        state = self.model_state(model)
+        saturated = self._pause(model) > self.fallback_after or state.breaker.state == "open"
+        fallback = self.fallback_model
+        if saturated and fallback and fallback != model:
+            if self._pause(fallback) <= self.fallback_after and self.model_state(fallback).breaker.allow():
+                metrics.increment("fir_llm_fallbacks_total", model=model, fallback=fallback)
+                return fallback, self._wait(fallback)
+        if not state.breaker.allow():
+            raise CircuitOpenError(model, state.breaker.retry_in())
+        return model, self._wait(model)
+
+    def _wait(self, model):
+        state = self.model_state(model)
+        queued = state.bucket.reserve() if state.bucket is not None else 0.0
+        return max(queued, self._pause(model))
+
+    def _prepare(self, kwargs):
+        model, wait = self._choose(kwargs["model"])
+        attempt = dict(kwargs, model=model)
+        if self.attempt_timeout:
+            attempt.setdefault("timeout", self.attempt_timeout)
+        return attempt, wait
+
+    def _failed(self, model, error, attempt):
+        """Record a failed attempt and return the delay before the next one, or re-raise"""
+        transient = is_transient(error)
+        state = self.model_state(model)
+        if transient and not is_rate_limited(error):
+            state.breaker.record_failure()
+        else:
+            # A 429 means "slow down", not "broken"; it pauses the model instead of tripping the breaker.
+            # Neither is a bad request a sign the model is down
+            state.breaker.release()
+        if not transient or attempt >= self.max_retries:
+            raise error
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        reason = "timeout" if "timeout" in type(error).__name__.lower() else "error"
+        if is_rate_limited(error):
+            reason = "rate_limited"
+            delay = max(delay, retry_after(error) or 0.0)
+            # Everyone calling this model waits, instead of each caller finding out with its own 429
+            with self._lock:
+                state.resume_at = max(state.resume_at, time.monotonic() + delay)
+            delay = 0.0
+        metrics.increment("fir_llm_retries_total", model=model, reason=reason)
+        return delay
+
+    def _succeeded(self, model):
+        self.model_state(model).breaker.record_success()
+
+    def call(self, create, kwargs):
+        """Call create(**kwargs) under the policy, blocking while waiting"""
+        attempt = 0
+        while True:
+            attempt_kwargs, wait = self._prepare(kwargs)
+            try:
+                if wait:
+                    time.sleep(wait)
+                result = create(**attempt_kwargs)
+            except Exception as e:
+                delay = self._failed(attempt_kwargs["model"], e, attempt)
+                if delay:
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled (asyncio.wait_for, a cancelled prefetch) or interrupted: no outcome to record
+                self.model_state(attempt_kwargs["model"]).breaker.release()
+                raise
+            self._succeeded(attempt_kwargs["model"])
+            return result
+
+    async def call_async(self, create, kwargs):
+        """Await create(**kwargs) under the policy"""
+        attempt = 0
+        while True:
+            attempt_kwargs, wait = self._prepare(kwargs)
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                result = await create(**attempt_kwargs)
+            except Exception as e:
+                delay = self._failed(attempt_kwargs["model"], e, attempt)
+                if delay:
+                    await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled (asyncio.wait_for, a cancelled prefetch) or interrupted: no outcome to record
+                self.model_state(attempt_kwargs["model"]).breaker.release()
+                raise
+            self._succeeded(attempt_kwargs["model"])
+            return result
+
+    def breaker_states(self):
+        """{model: 0 closed, 1 half-open, 2 open} for the metrics gauge"""
+        codes = {"closed": 0, "half-open": 1, "open": 2}
+        with self._lock:
+            models = dict(self._models)
+        return {(("model", model),): codes[state.breaker.state] for model, state in models.items()}
+
+
+class ResilientClient:
+    """A Groq-compatible client whose completions go through an LLMPolicy"""
+
+    def __init__(self, client, policy):
+        self.client = client
+        self.policy = policy
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        return self.policy.call(self.client.chat.completions.create, kwargs)
+
+
+class AsyncResilientClient(ResilientClient):
+    """The async counterpart of ResilientClient"""
+
+    async def create(self, **kwargs):
+        return await self.policy.call_async(self.client.chat.completions.create, kwargs)
+
+
+def http_client(asynchronous=False):
+    """An httpx client with a keep-alive pool sized for concurrent sessions, for Groq(http_client=...)"""
+    import httpx
+    limits = httpx.Limits(max_connections=int(os.environ.get("FIR_LLM_MAX_CONNECTIONS", "32")),
+                          max_keepalive_connections=16, keepalive_expiry=60)
+    timeout = httpx.Timeout(float(os.environ.get("FIR_LLM_TIMEOUT", "60")), connect=10.0)
+    if asynchronous:
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+    return httpx.Client(limits=limits, timeout=timeout)
@@ -0,0 +1,87 @@
+"""Template-driven FIR drafts that need no LLM.
+
+draft_fir fills the same FIRDocument the FIR completion does, from the
+complaint's form fields and the retrieved sections' Offense and Punishment
+columns. It is pure string work, so a draft is ready in well under a
+millisecond and works offline; the app shows it while the LLM version is
+generated, and uses it when the API is unavailable.
+"""
+import re
+from datetime import datetime
+
+from fir_document import UNKNOWN, CaseAnalysis, Complaint, FIRDocument
+from prompt_builder import section_label
+
+# Offenses involving property, for item 8
+_PROPERTY_OFFENSE = re.compile(r"\b(theft|stole|stolen|steal|snatch|robbery|robbed|dacoity|extortion|misappropriat|"
+                               r"breach of trust|cheat|burglar|house-breaking|housebreaking)", re.I)
+_AMOUNT = re.compile(r"(?:rs\.?|inr|₹)\s*[\d,]+(?:\.\d+)?(?:\s*(?:lakh|crore|thousand))?", re.I)
+
+
+class SectionTable:
+    """Offense and Punishment lookups by section key, built once from a SectionIndex or CorpusView"""
+
+    def __init__(self, index):
+        # Kept so callers can tell when the index has since been reloaded
+        self.index = index
+        self.offenses = dict(zip(index.sections, index.offenses))
+        self.punishments = dict(zip(index.sections, index.punishments))
+
+    def summary(self, section):
+        """'Theft (Punishment: 3 Years or Fine or Both)'"""
+        offense = self.offenses.get(section, "").strip()
+        punishment = self.punishments.get(section, "").strip()
+        if punishment:
+            return f"{offense} (Punishment: {punishment})".strip()
+        return offense
+
+    def describe(self, section):
+        """'IPC 379 - Theft (Punishment: 3 Years or Fine or Both)'"""
+        summary = self.summary(section)
+        return f"{section_label(section)} - {summary}" if summary else section_label(section)
+
+
+def _reporting_delay(date_of_incident, now):
+    try:
+        incident = datetime.strptime(date_of_incident, "%Y-%m-%d")
+    except ValueError:
+        return "Not applicable"
+    days = (now.date() - incident.date()).days
+    if days <= 1:
+        return "No delay; reported promptly"
+    return f"Reported {days} days after the incident; reasons to be recorded from the complainant"
+
+
+def _property_particulars(case_description, offenses):
+    if not any(_PROPERTY_OFFENSE.search(text) for text in offenses + [case_description]):
+        return "Not applicable"
+    amounts = _AMOUNT.findall(case_description)
+    if amounts:
+        return "As described by the complainant, including " + ", ".join(dict.fromkeys(amounts))
+    return "As described by the complainant; to be itemised during investigation"
+
+
+def draft_fir(case_description, sections, user_inputs, table, fir_number, registration_date, now=None):
+    """Return a FIRDocument filled from the complaint and section table"""
+    now = now or datetime.now()
+    complaint = Complaint.coerce(user_inputs, case_description)
+    offenses = [table.offenses.get(section, "") for section in sections] + [complaint.nature_of_offense]
+
+    document = FIRDocument.from_complaint(complaint, fir_number, registration_date, now)
+    document.incident_description = str(case_description).strip() or UNKNOWN
+    document.delay_reason = _reporting_delay(complaint.date_of_incident, now)
+    document.stolen_property = _property_particulars(str(case_description), offenses)
+    document.sections_applied = [table.describe(section) for section in sections]
+    document.source = "local"
+    return document
+
+
+def draft_analysis(sections, table):
+    """A section list as a CaseAnalysis, for when no LLM analysis is available"""
+    return CaseAnalysis(
+        applicable_sections=[{"section": section_label(section), "reason": table.summary(section)}
+                             for section in sections],
+        analysis="Drafted without the AI assistant: the sections above were matched to the complaint "
+                 "automatically and should be reviewed by the investigating officer.",
+        source="local",
+    )
@@ -0,0 +1,207 @@
+"""Lightweight timing spans and counters for the FIR pipeline.
+
+Every span is logged as one JSON line on the ``fir.metrics`` logger,
+aggregated into per-stage histograms, and appended to the current request
+trace (if one is active) so the app can show a per-request breakdown.
+Aggregates are available in Prometheus text format via prometheus_text(),
+export() or start_http_server().
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("fir.metrics")
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_current_trace = contextvars.ContextVar("fir_trace", default=None)
+
+
+class Span:
+    """A timed pipeline stage; attributes can be added while it is open"""
+
+    def __init__(self, stage, attributes):
+        self.stage = stage
+        self.attributes = attributes
+        self.started = time.time()
+        self.seconds = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def as_dict(self):
+        return {"stage": self.stage, "ms": round(self.seconds * 1000, 3), **self.attributes}
+
+
+@contextlib.contextmanager
+def span(stage, **attributes):
+    """Time the enclosed block as a pipeline stage"""
+    current = Span(stage, attributes)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        record(current)
+
+
+def record(current):
+    """Aggregate a finished span, log it, and add it to the active trace"""
+    with _lock:
+        counts, total = _histograms.setdefault(current.stage, ([0] * (len(BUCKETS) + 1), [0.0]))
+        for position, bound in enumerate(BUCKETS):
+            if current.seconds <= bound:
+                counts[position] += 1
+                break
+        else:
+            counts[-1] += 1
+        total[0] += current.seconds
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append(current.as_dict())
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": "span", "ts": current.started, **current.as_dict()}, default=str))
+
+
+def increment(name, amount=1, **labels):
+    """Add amount to a labelled counter"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def record_usage(usage, model, call):
+    """Count prompt and completion tokens from a chat completion's usage block"""
+    if usage is None:
+        return {}
+    tokens = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+    for kind, amount in tokens.items():
+        increment("fir_llm_tokens_total", amount, model=model, call=call, kind=kind.split("_")[0])
+    return tokens
+
+
+def register_gauge(name, help_text, read):
+    """Expose read() as a gauge; read returns a number or a {((label, value), ...): number} mapping"""
+    with _lock:
+        _gauges[name] = (help_text, read)
+
+
+@contextlib.contextmanager
+def trace(spans=None):
+    """Collect the spans recorded inside the block (and in tasks started from it) into a list"""
+    spans = [] if spans is None else spans
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_trace.reset(token)
+
+
+async def carry_trace(coro, spans):
+    """Await coro with spans as the active trace, for work handed to another thread's event loop"""
+    token = _current_trace.set(spans)
+    try:
+        return await coro
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in pairs) + "}"
+
+
+def prometheus_text():
+    """Render all metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {stage: (list(counts), total[0]) for stage, (counts, total) in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines = [
+        "# HELP fir_stage_duration_seconds Wall-clock time per pipeline stage.",
+        "# TYPE fir_stage_duration_seconds histogram",
+    ]
+    for stage, (counts, total) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += count
+            lines.append(f'fir_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'fir_stage_duration_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'fir_stage_duration_seconds_count{{stage="{stage}"}} {cumulative}')
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (counter, labels), value in sorted(counters.items()):
+            if counter == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    for name, (help_text, read) in sorted(gauges.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        value = read()
+        if isinstance(value, dict):
+            for labels, item in sorted(value.items()):
+                lines.append(f"{name}{_labels(labels)} {item}")
+        else:
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    """Write the current metrics to path in Prometheus text format (for node_exporter's textfile collector)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serve /metrics on port from a daemon thread; later calls are no-ops"""
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="fir-metrics", daemon=True).start()
+    return _server
@@ -0,0 +1,290 @@
+"""PDF rendering for generated FIRs.
+
+The FIR and analysis arrive as FIRDocument and CaseAnalysis records, which
+render straight to a small document model (headings, key/value fields and
+paragraphs); free text, such as section descriptions, is parsed into the
+same blocks with fir_document.parse_document. Blocks are laid out one by
+one. Each block is line-broken in one pass using a per-font cache of
+word widths, and fonts are only switched when the style actually changes.
+
+Documents whose text fits latin-1 (most FIRs) use the built-in Arial
+font, which needs no font file and renders about ten times faster. Only
+when the text has other characters, such as a Hindi complaint, is a
+Unicode TrueType font (FIR_PDF_FONT, or one of the system fonts listed
+below) embedded so they are kept; without one the text is folded to
+latin-1. PyFPDF 1.7 embeds Devanagari without shaping conjuncts and vowel
+signs; under fpdf2 with uharfbuzz installed, text shaping is turned on.
+"""
+import os
+import re
+import threading
+
+from fpdf import FPDF
+
+import metrics
+from fir_document import parse_document
+
+# FreeSans covers Latin and Devanagari; DejaVu covers Latin and most European scripts
+FONT_CANDIDATES = [
+    ('/usr/share/fonts/truetype/freefont/FreeSans.ttf', '/usr/share/fonts/truetype/freefont/FreeSansBold.ttf'),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+]
+
+BODY_SIZE = 11
+FIELD_SIZE = 11
+HEADING_SIZE = 13
+TITLE_SIZE = 16
+LINE_HEIGHT = 6
+MAX_KEY_WIDTH = 60
+
+# Curly quotes and dashes have no latin-1 code point; map them before folding
+_ASCII_PUNCTUATION = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+    '\u2013': '-', '\u2014': '-', '\u2026': '...', '\u00a0': ' ',
+})
+
+# UTF-8 punctuation read as cp1252 somewhere upstream, as in some fir_sections.csv rows ("â€”" for "—")
+_MOJIBAKE = re.compile('\u00e2\u20ac[\u0080-\u00ff\u0152-\u2122]')
+
+
+def _unmangle(match):
+    try:
+        return match.group().encode('cp1252').decode('utf-8')
+    except UnicodeError:
+        return match.group()
+
+
+def clean_text(value):
+    """value as a str, with mis-decoded UTF-8 punctuation repaired"""
+    value = str(value)
+    return _MOJIBAKE.sub(_unmangle, value) if '\u20ac' in value else value
+
+
+_font_cache_lock = threading.Lock()
+_font_cache_ready = False
+
+
+def _private_dir(path):
+    """Create path (mode 0700) and return it if only this user can write to it, else None"""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.stat(path)
+    except OSError:
+        return None
+    if (hasattr(os, 'getuid') and info.st_uid != os.getuid()) or info.st_mode & 0o022:
+        return None
+    return path
+
+
+def _configure_font_cache():
+    """Point PyFPDF 1.7's TTF metrics cache at a directory private to this user.
+
+    The cache is unpickled on load, so a directory anyone else can write to
+    (such as /tmp) would let them run code in the app. Without a private
+    one the metrics are parsed again for each PDF.
+    """
+    global _font_cache_ready
+    with _font_cache_lock:
+        if _font_cache_ready:
+            return
+        _font_cache_ready = True
+        try:
+            from fpdf import set_global
+        except ImportError:
+            # fpdf2 has no such cache
+            return
+        default = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'fir-assistant',
+                               'fonts')
+        cache_dir = _private_dir(os.environ.get('FIR_PDF_FONT_CACHE') or default)
+        set_global('FPDF_CACHE_MODE', 2 if cache_dir else 1)
+        set_global('FPDF_CACHE_DIR', cache_dir)
+
+
+def _is_latin1(value):
+    try:
+        clean_text(value).translate(_ASCII_PUNCTUATION).encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def find_unicode_font():
+    """Return (regular, bold) TTF paths, or None when only core fonts are available"""
+    regular = os.environ.get('FIR_PDF_FONT')
+    if regular:
+        return regular, os.environ.get('FIR_PDF_FONT_BOLD', regular)
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular):
+            return regular, bold if os.path.exists(bold) else regular
+    return None
+
+
+class _Renderer:
+    """Lays blocks out on an FPDF document, tracking the current font to skip redundant switches"""
+
+    def __init__(self, pdf, family, unicode_text):
+        self.pdf = pdf
+        self.family = family
+        self.unicode_text = unicode_text
+        self._font = None
+        self._widths = {}
+
+    def text(self, value):
+        value = clean_text(value)
+        if self.unicode_text:
+            return value
+        return value.translate(_ASCII_PUNCTUATION).encode('latin-1', 'replace').decode('latin-1')
+
+    def font(self, style, size):
+        if self._font != (style, size):
+            self.pdf.set_font(self.family, style, size)
+            self._font = (style, size)
+            self._width_cache = self._widths.setdefault(self._font, {})
+
+    def width(self, word):
+        """String width in the current font, cached per word since legal text repeats heavily"""
+        width = self._width_cache.get(word)
+        if width is None:
+            width = self._width_cache[word] = self.pdf.get_string_width(word)
+        return width
+
+    def wrap(self, text, width):
+        """Greedy word wrap of text into lines no wider than width"""
+        space = self.width(' ')
+        lines = []
+        for source_line in text.split('\n'):
+            line, line_width = [], 0.0
+            for word in source_line.split():
+                word_width = self.width(word)
+                if line and line_width + space + word_width > width:
+                    lines.append(' '.join(line))
+                    line, line_width = [], 0.0
+                while word_width > width and len(word) > 1:
+                    # Break words longer than a whole line by characters
+                    cut = len(word) - 1
+                    while cut > 1 and self.pdf.get_string_width(word[:cut]) > width:
+                        cut -= 1
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    word_width = self.width(word)
+                line_width += (space if line else 0.0) + word_width
+                line.append(word)
+            lines.append(' '.join(line))
+        return lines
+
+    def lines(self, text):
+        """Write text as wrapped lines starting at the current x, breaking pages as needed"""
+        pdf = self.pdf
+        x = pdf.x
+        for line in self.wrap(text, pdf.w - pdf.r_margin - x):
+            pdf.set_x(x)
+            pdf.cell(0, LINE_HEIGHT, line, 0, 2)
+        pdf.set_x(pdf.l_margin)
+
+    def page(self, title, size=HEADING_SIZE, align='L'):
+        self.pdf.add_page()
+        self.font('B', size)
+        self.pdf.cell(0, 10, title, ln=True, align=align)
+        self.pdf.line(10, 22, 200, 22)
+        self.pdf.ln(5)
+
+    def heading(self, value):
+        self.font('B', HEADING_SIZE)
+        self.pdf.ln(3)
+        self.lines(value)
+        self.pdf.ln(1)
+
+    def field(self, key, value):
+        pdf = self.pdf
+        self.font('B', FIELD_SIZE)
+        label = key + ':'
+        key_width = pdf.get_string_width(label) + 3
+        if key_width > MAX_KEY_WIDTH:
+            # Labels too long for the key column get a line of their own
+            self.lines(label)
+        else:
+            pdf.cell(key_width, LINE_HEIGHT, label, 0, 0)
+        self.font('', FIELD_SIZE)
+        self.lines(value)
+
+    def paragraph(self, value):
+        self.font('', BODY_SIZE)
+        self.lines(value)
+        self.pdf.ln(2)
+
+    def blocks(self, blocks):
+        for kind, *parts in blocks:
+            getattr(self, kind)(*map(self.text, parts))
+
+
+def document_blocks(content):
+    """The blocks of a FIRDocument or CaseAnalysis, or of free text parsed into blocks"""
+    if hasattr(content, 'blocks'):
+        return content.blocks()
+    return parse_document(str(content))
+
+
+def create_pdf(fir_content, sections, analysis, font_paths=None):
+    """Create a PDF document with the FIR, relevant sections and analysis.
+
+    fir_content and analysis are a FIRDocument and CaseAnalysis, or plain text.
+    """
+    with metrics.span("pdf_render", sections=len(sections)) as span:
+        pdf = _layout(fir_content, sections, analysis, font_paths)
+        span.set(pages=pdf.page_no())
+    return pdf
+
+
+def _layout(fir_content, sections, analysis, font_paths):
+    fir_blocks = document_blocks(fir_content)
+    section_blocks = []
+    for section, description in sections.items():
+        section_blocks.append(('heading', f"Section: {section}"))
+        section_blocks += document_blocks(description)
+    analysis_blocks = document_blocks(analysis)
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+
+    if font_paths is None:
+        # The TTF path is only worth its cost for characters the core font cannot show
+        latin1 = all(_is_latin1(part) for blocks in (fir_blocks, section_blocks, analysis_blocks)
+                     for _, *parts in blocks for part in parts)
+        font_paths = None if latin1 else find_unicode_font()
+    if font_paths:
+        _configure_font_cache()
+        pdf.add_font('FIRSans', '', font_paths[0], uni=True)
+        pdf.add_font('FIRSans', 'B', font_paths[1], uni=True)
+        if hasattr(pdf, 'set_text_shaping'):
+            try:
+                pdf.set_text_shaping(True)
+            except Exception:
+                # fpdf2 without uharfbuzz: characters are kept, conjuncts are not shaped
+                pass
+        renderer = _Renderer(pdf, 'FIRSans', unicode_text=True)
+    else:
+        renderer = _Renderer(pdf, 'Arial', unicode_text=False)
+
+    # FIR Content
+    renderer.page("FIRST INFORMATION REPORT (FIR)", size=TITLE_SIZE, align='C')
+    renderer.blocks(fir_blocks)
+
+    # Relevant Sections
+    renderer.page("RELEVANT SECTIONS")
+    renderer.blocks(section_blocks)
+
+    # Case Analysis
+    renderer.page("CASE ANALYSIS")
+    renderer.blocks(analysis_blocks)
+
+    return pdf
+
+
+def pdf_to_bytes(pdf):
+    """Render an FPDF document to bytes in memory"""
+    with metrics.span("pdf_output") as span:
+        output = pdf.output(dest='S')
+        # PyFPDF returns a latin-1 str, fpdf2 a bytearray
+        output = output.encode('latin-1') if isinstance(output, str) else bytes(output)
+        span.set(bytes=len(output))
+    return output
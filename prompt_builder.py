@@ -0,0 +1,188 @@
+"""Token-budgeted prompts for the analysis and FIR completions.
+
+Both prompts start with the same context block (the complaint, then the
+retrieved sections one compact line each) and only diverge after it, so a
+provider-side prompt cache can reuse the prefix across the two calls.
+
+The context is fitted to a token budget: each section description is cut
+down to the sentences that share the most terms with the complaint, and if
+that is still too long, fewer sentences are kept per section, then the
+lowest-ranked sections are cut down to their number and title, and last
+to their number alone. The complaint is never cut, since the FIR is written
+from it: a complaint too long for the budget makes the prompt go over it
+rather than lose facts, and every retrieved section keeps at least its number.
+"""
+import math
+import os
+import re
+
+# Total prompt tokens (system + user message) per completion
+PROMPT_BUDGET = int(os.environ.get("FIR_PROMPT_BUDGET", "1200"))
+
+# Most sentences kept from one section description, and most words from one sentence
+MAX_SENTENCES = 3
+MAX_SENTENCE_WORDS = 60
+
+# Words kept from a section's best sentence when no title is known
+TITLE_WORDS = 12
+
+_NONE_RETRIEVED = "- (none retrieved)"
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_TERM = re.compile(r"\b\w\w+\b")
+_SENTENCE_END = re.compile(r"(?<=[.;!?])\s+(?=[A-Z(])")
+
+# Descriptions in fir_sections.csv give the statute text and then restate it under this heading
+_SIMPLE_WORDS = re.compile(r"^\w+ \w+ in simple words$", re.I | re.M)
+_BOILERPLATE = re.compile(r"^(?:description of \w+ section \w+|explanations?|illustrations?)$", re.I)
+_ACCORDING_TO = re.compile(r"^according to section \w+ of [\w ]+?,\s*", re.I)
+
+_STOP_WORDS = frozenset("""
+a about after all also an and any are as at be been being by can could did do does for from had has have he her
+him his i if in into is it its me my not of on or our she shall so such that the their them then there these
+they this those to under upon was we were which while who whoever whom will with would you your
+""".split())
+
+
+def count_tokens(text):
+    """Estimate the number of model tokens in text.
+
+    Punctuation counts as one token and words as one token per six
+    characters, which tracks BPE tokenizers closely enough on English legal
+    text for budgeting. The API's usage block reports the exact count.
+    """
+    return sum(math.ceil(len(piece) / 6) for piece in _PIECE.findall(text))
+
+
+def _terms(text):
+    return {term for term in _TERM.findall(text.lower()) if term not in _STOP_WORDS}
+
+
+def section_label(section):
+    """Render an index key such as 'IPC_498A' as 'IPC 498A'"""
+    return section.replace('_', ' ')
+
+
+def split_sentences(description):
+    """Split a section description into sentences, dropping the CSV's boilerplate headings.
+
+    When the description has a plain-language restatement only that is used,
+    so the same provision is never sent twice.
+    """
+    description = str(description)
+    simple = _SIMPLE_WORDS.search(description)
+    if simple and description[simple.end():].strip():
+        description = description[simple.end():]
+    sentences = []
+    for line in description.split('\n'):
+        line = line.strip()
+        if not line or _BOILERPLATE.match(line):
+            continue
+        line = _ACCORDING_TO.sub('', line)
+        sentences.extend(sentence for sentence in _SENTENCE_END.split(line) if sentence)
+    return sentences
+
+
+def _shorten(sentence):
+    words = sentence.split()
+    if len(words) <= MAX_SENTENCE_WORDS:
+        return sentence
+    return ' '.join(words[:MAX_SENTENCE_WORDS]) + ' ...'
+
+
+def rank_sentences(description, case_terms):
+    """Return the description's sentences, most relevant to the complaint first.
+
+    Relevance is the number of complaint terms a sentence shares, scaled down
+    for long sentences so a short plain-language summary beats a long clause
+    with the same overlap.
+    """
+    scored = []
+    for position, sentence in enumerate(split_sentences(description)):
+        sentence = _shorten(sentence)
+        overlap = len(_terms(sentence) & case_terms)
+        scored.append((-overlap / math.sqrt(1 + len(sentence.split())), position, sentence))
+    scored.sort()
+    return [(position, sentence) for _, position, sentence in scored]
+
+
+class PromptBuilder:
+    """Builds prompts whose shared context block fits in budget - reserve tokens.
+
+    reserve is what the caller needs for everything outside the context: the
+    system prompt, the longest instructions and any per-call details.
+    title(section), if given, names a section (e.g. its Offense column) for
+    the lines cut down to a number and title.
+    """
+
+    def __init__(self, budget=PROMPT_BUDGET, reserve=0, max_sentences=MAX_SENTENCES, title=None):
+        self.budget = budget
+        self.reserve = reserve
+        self.max_sentences = max_sentences
+        self.title = title
+
+    def _rank(self, case_description, relevant_sections):
+        """[(label, title, ranked sentences)] for the sections, best first"""
+        case_terms = _terms(case_description)
+        ranked = []
+        for section, description in relevant_sections.items():
+            sentences = rank_sentences(description, case_terms)
+            title = self.title(section) if self.title else ''
+            if not title and sentences:
+                words = sentences[0][1].split()
+                title = ' '.join(words[:TITLE_WORDS]) + (' ...' if len(words) > TITLE_WORDS else '')
+            ranked.append((section_label(section), str(title).strip(), sentences))
+        return ranked
+
+    @staticmethod
+    def _render(ranked, per_section, count):
+        """The first count sections with per_section sentences each, the rest by number and title"""
+        lines = []
+        for position, (label, title, sentences) in enumerate(ranked):
+            if position < count and sentences:
+                # Keep the chosen sentences in their original order so they still read naturally
+                text = ' '.join(sentence for _, sentence in sorted(sentences[:per_section]))
+            else:
+                text = title
+            lines.append(f"- {label}: {text}" if text else f"- {label}")
+        return '\n'.join(lines)
+
+    def compact_sections(self, case_description, relevant_sections, budget):
+        """Render the sections as one line each, trimmed until they fit in budget tokens (or only their numbers)"""
+        ranked = self._rank(case_description, relevant_sections)
+        for per_section in range(self.max_sentences, 0, -1):
+            text = self._render(ranked, per_section, len(ranked))
+            if count_tokens(text) <= budget:
+                return text
+        # Sections arrive best first, so the last ones are cut down to their title first
+        for count in range(len(ranked) - 1, -1, -1):
+            text = self._render(ranked, 1, count)
+            if count_tokens(text) <= budget:
+                return text
+        # Then the last ones lose their titles too; no section is dropped, even over budget
+        for count in range(len(ranked) - 1, -1, -1):
+            text = self._render([(label, title if position < count else '', [])
+                                 for position, (label, title, _) in enumerate(ranked)], 1, 0)
+            if count_tokens(text) <= budget:
+                return text
+        return text
+
+    def context(self, case_description, relevant_sections):
+        """The prefix shared by every prompt for one complaint"""
+        # The complaint goes in whole, whatever its length; only the sections are fitted to the budget
+        case_description = str(case_description).strip()
+        budget = self.budget - self.reserve - count_tokens("CASE DESCRIPTION:\n\n\nRELEVANT SECTIONS:\n")
+        sections = _NONE_RETRIEVED
+        if relevant_sections:
+            sections = self.compact_sections(case_description, relevant_sections,
+                                             budget - count_tokens(case_description))
+        return f"CASE DESCRIPTION:\n{case_description}\n\nRELEVANT SECTIONS:\n{sections}"
+
+    def build(self, case_description, relevant_sections, task, details=None):
+        """Shared context, then optional per-call details, then the call's instructions"""
+        parts = [self.context(case_description, relevant_sections)]
+        if details and str(details).strip():
+            lines = (line.strip() for line in str(details).strip().split('\n'))
+            parts.append("USER INPUTS:\n" + '\n'.join(line for line in lines if line))
+        parts.append(task.strip())
+        return '\n\n'.join(parts)
@@ -0,0 +1,299 @@
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+
+class SectionRetriever:
+    """Top-k section retrieval over a SectionIndex using sparse dot products"""
+
+    def __init__(self, index, k=5, threshold=0.1):
+        self.index = index
+        self.k = k
+        self.threshold = threshold
+
+        # Term-major copy of the matrix so a query row multiplies straight into section scores
+        self._matrix_t = index.matrix.T.tocsr()
+
+        # Pre-extracted columns, so building results is plain array indexing
+        self.sections = np.array(index.sections, dtype=object)
+        self.descriptions = np.array(index.descriptions, dtype=object)
+
+    def score(self, descriptions):
+        """Return a (len(descriptions), n_sections) array of cosine similarities"""
+        return self._cosine(self.index.transform(descriptions))
+
+    def _cosine(self, query_matrix):
+        # Index rows and query rows are both L2-normalised, so the dot product is the cosine
+        return (query_matrix @ self._matrix_t).toarray()
+
+    def top_k(self, scores, k=None, threshold=None):
+        """Return (indices, scores) of the best k entries above threshold, best first"""
+        k = self.k if k is None else k
+        threshold = self.threshold if threshold is None else threshold
+        if k < len(scores):
+            candidates = np.argpartition(scores, -k)[-k:]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] > threshold]
+        order = candidates[np.argsort(scores[candidates])[::-1]]
+        return order, scores[order]
+
+    def _to_sections(self, indices):
+        return dict(zip(self.sections[indices], self.descriptions[indices]))
+
+    def score_one(self, description):
+        """Return the scores for one description, as score([description])[0] would.
+
+        Goes through the LiveQuery hooks from empty, which gathers each
+        query term's postings instead of building sparse query matrices.
+        """
+        state = self._new_live_state()
+        for _, terms, apply in self._live_parts():
+            for term, count in terms(description).items():
+                apply(state, term, 0, count)
+        return self._live_scores(state, description)
+
+    def search(self, description, k=None, threshold=None):
+        """Find the sections most relevant to one case description"""
+        indices, _ = self.top_k(self.score_one(description), k, threshold)
+        return self._to_sections(indices)
+
+    def search_batch(self, descriptions, k=None, threshold=None):
+        """Find relevant sections for many case descriptions with one matrix multiply"""
+        if not descriptions:
+            return []
+        scores = self.score(list(descriptions))
+        return [self._to_sections(self.top_k(row, k, threshold)[0]) for row in scores]
+
+    def live_query(self):
+        """A LiveQuery that re-scores a description as it is edited, from the terms that changed"""
+        return LiveQuery(self)
+
+    # LiveQuery hooks: each part is (name, {term: count} of a text, apply(state, term, old count, new count))
+    def _live_parts(self):
+        return [('tfidf', self._token_counts, self._apply_tfidf)]
+
+    def _token_counts(self, text):
+        return Counter(self.index.tokenize(text))
+
+    def _new_live_state(self):
+        return {'tfidf': np.zeros(len(self.sections)), 'tfidf_norm': 0.0}
+
+    def _apply_tfidf(self, state, term, old, new):
+        column = self.index.vocabulary.get(term)
+        if column is None:
+            return
+        weight = float(self.index.idf[column])
+        start, end = self._matrix_t.indptr[column], self._matrix_t.indptr[column + 1]
+        # The unnormalised dot product is linear in the counts; the norm is applied when scoring
+        state['tfidf'][self._matrix_t.indices[start:end]] += (new - old) * weight * self._matrix_t.data[start:end]
+        state['tfidf_norm'] += (new * new - old * old) * weight * weight
+
+    def _live_scores(self, state, text):
+        norm = math.sqrt(max(state['tfidf_norm'], 0.0))
+        return state['tfidf'] / norm if norm > 1e-9 else np.zeros(len(self.sections))
+
+
+# Section numbers such as 379, 498A or 498-A, optionally chained: "323/506", "420 and 406"
+_NUMBERS = r"\d{1,3}(?:-?[a-z])?\b(?:\s*(?:/|,|&|and)\s*\d{1,3}(?:-?[a-z])?\b)*"
+_NUMBER = re.compile(r"\d{1,3}(?:-?[a-z])?", re.I)
+
+
+def _section_key(section):
+    """Split an index key such as 'IPC_498A' into ('IPC', '498A')"""
+    act, _, number = section.rpartition('_')
+    return act.upper(), number.upper()
+
+
+class HybridRetriever(SectionRetriever):
+    """Fuses TF-IDF cosine, BM25 over Offense + Description and exact section-number matches.
+
+    Each component is scaled to [0, 1] before weighting: cosine already is,
+    BM25 saturates as s / (s + bm25_saturation), and an explicitly cited
+    section ("u/s 379", "IPC 420", "sections 323/506") scores 1.
+    """
+
+    def __init__(self, index, k=5, threshold=0.1, tfidf_weight=0.5, bm25_weight=0.5, exact_weight=1.0,
+                 bm25_saturation=8.0):
+        super().__init__(index, k=k, threshold=threshold)
+        self.tfidf_weight = tfidf_weight
+        self.bm25_weight = bm25_weight
+        self.exact_weight = exact_weight
+        self.bm25_saturation = bm25_saturation
+        self._bm25_t = index.bm25.T.tocsr()
+
+        # Exact-match index: (act, number) and bare number -> section rows
+        self._by_key = {}
+        self._by_number = {}
+        for row, section in enumerate(index.sections):
+            act, number = _section_key(section)
+            self._by_key.setdefault((act, number), []).append(row)
+            self._by_number.setdefault(number, []).append(row)
+
+        acts = "|".join(sorted({act for act, _ in self._by_key if act}, key=len, reverse=True)) or "ipc"
+        self._references = [
+            # "IPC 420", "IPC section 498A"
+            (re.compile(rf"\b({acts})[\s_]*(?:sections?|secs?\.?|s\.)?\s*({_NUMBERS})", re.I), 1, 2),
+            # "u/s 379", "sections 323/506 IPC", "section 302 of the IPC"
+            (re.compile(rf"(?:\bu/s\.?|\bunder\s+sections?|\bsections?|\bsecs?\.)\s*({_NUMBERS})"
+                        rf"(?:\s*(?:of\s+(?:the\s+)?)?({acts})\b)?", re.I), 2, 1),
+            # "420 IPC"
+            (re.compile(rf"\b({_NUMBERS})\s*(?:of\s+(?:the\s+)?)?({acts})\b", re.I), 2, 1),
+        ]
+
+    def cited_sections(self, text):
+        """Return the index rows of sections explicitly cited in text"""
+        rows = set()
+        for pattern, act_group, numbers_group in self._references:
+            for match in pattern.finditer(text):
+                act = (match.group(act_group) or '').upper()
+                for number in _NUMBER.findall(match.group(numbers_group)):
+                    number = number.replace('-', '').upper()
+                    rows.update(self._by_key.get((act, number), []) if act else self._by_number.get(number, []))
+        return rows
+
+    def score(self, descriptions):
+        """Return fused (len(descriptions), n_sections) relevance scores"""
+        tokens = [self.index.tokenize(description) for description in descriptions]
+        scores = self.tfidf_weight * self._cosine(self.index.transform(tokens, tokenized=True))
+
+        bm25 = (self.index.bm25_query(tokens, tokenized=True) @ self._bm25_t).toarray()
+        scores += self.bm25_weight * bm25 / (bm25 + self.bm25_saturation)
+
+        for row, description in enumerate(descriptions):
+            cited = self.cited_sections(description)
+            if cited:
+                scores[row, list(cited)] += self.exact_weight
+        return scores
+
+    def _live_parts(self):
+        return super()._live_parts() + [('bm25', self._token_counts, self._apply_bm25)]
+
+    def _new_live_state(self):
+        state = super()._new_live_state()
+        state['bm25'] = np.zeros(len(self.sections))
+        return state
+
+    def _apply_bm25(self, state, term, old, new):
+        column = self.index.bm25_vocabulary.get(term)
+        if column is not None:
+            start, end = self._bm25_t.indptr[column], self._bm25_t.indptr[column + 1]
+            state['bm25'][self._bm25_t.indices[start:end]] += (new - old) * self._bm25_t.data[start:end]
+
+    def _live_scores(self, state, text):
+        scores = self.tfidf_weight * super()._live_scores(state, text)
+        bm25 = np.maximum(state['bm25'], 0.0)
+        scores += self.bm25_weight * bm25 / (bm25 + self.bm25_saturation)
+        self._add_cited(scores, text)
+        return scores
+
+    def _add_cited(self, scores, text):
+        cited = self.cited_sections(text)
+        if cited:
+            scores[list(cited)] += self.exact_weight
+
+
+class EmbeddingRetriever(HybridRetriever):
+    """Ranks sections by embedding similarity, plus the exact section-number matches.
+
+    tfidf_weight and bm25_weight default to 0; raise them to blend the
+    lexical scores back in.
+    """
+
+    def __init__(self, index, embeddings, k=5, threshold=0.3, embedding_weight=1.0, tfidf_weight=0.0,
+                 bm25_weight=0.0, exact_weight=1.0, bm25_saturation=8.0):
+        super().__init__(index, k=k, threshold=threshold, tfidf_weight=tfidf_weight, bm25_weight=bm25_weight,
+                         exact_weight=exact_weight, bm25_saturation=bm25_saturation)
+        self.embeddings = embeddings
+        self.embedding_weight = embedding_weight
+
+    def score(self, descriptions):
+        """Return (len(descriptions), n_sections) embedding similarities, fused with the lexical scores"""
+        scores = self.embedding_weight * self.embeddings.similarity(descriptions)
+        if self.tfidf_weight or self.bm25_weight:
+            scores += super().score(descriptions)
+        else:
+            for row, description in enumerate(descriptions):
+                self._add_cited(scores[row], description)
+        return scores
+
+    def score_one(self, description):
+        # Projecting a whole text at once beats adding up its n-gram projections one by one
+        return self.score([description])[0]
+
+    def _live_parts(self):
+        parts = [('embedding', self.embeddings.embedder.counts, self._apply_embedding)]
+        if self.tfidf_weight or self.bm25_weight:
+            parts += super()._live_parts()
+        return parts
+
+    def _new_live_state(self):
+        state = super()._new_live_state()
+        state['embedding'] = np.zeros(self.embeddings.dimensions)
+        return state
+
+    def _apply_embedding(self, state, bucket, old, new):
+        position = self.embeddings.feature_position(bucket)
+        if position is not None:
+            weight = (math.log1p(new) - math.log1p(old)) * float(self.embeddings.embedder.idf[position])
+            state['embedding'] += weight * self.embeddings.projection[position].astype(np.float64)
+
+    def _live_scores(self, state, text):
+        # Normalising the projected sum gives the same direction as embedding the whole text
+        vector = state['embedding'] / max(np.linalg.norm(state['embedding']), 1e-12)
+        scores = self.embedding_weight * self.embeddings.search(vector[None, :].astype(np.float32))[0]
+        if self.tfidf_weight or self.bm25_weight:
+            scores += super()._live_scores(state, text)
+        else:
+            self._add_cited(scores, text)
+        return scores
+
+
+class LiveQuery:
+    """Section scores for a case description that is being edited.
+
+    Each update diffs the text's term counts against the previous version
+    and applies only the terms that changed to the running score vectors,
+    instead of vectorising the whole description and multiplying it again.
+    """
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self.text = ''
+        # Terms applied by the last update
+        self.changed = 0
+        self._counts = {}
+        self._state = retriever._new_live_state()
+        self._scores = retriever._live_scores(self._state, '')
+        self._sections = {}
+
+    def scores(self, text):
+        """Return the section scores for text, as retriever.score would"""
+        if text == self.text:
+            return self._scores
+        changed = 0
+        for name, terms, apply in self.retriever._live_parts():
+            old, new = self._counts.get(name, {}), terms(text)
+            for term in old.keys() | new.keys():
+                before, after = old.get(term, 0), new.get(term, 0)
+                if before != after:
+                    apply(self._state, term, before, after)
+                    changed += 1
+            self._counts[name] = new
+        if not any(self._counts.values()):
+            # Start from exact zeros again rather than carrying rounding residue
+            self._state = self.retriever._new_live_state()
+        self.text, self.changed = text, changed
+        self._scores = self.retriever._live_scores(self._state, text)
+        self._sections = None
+        return self._scores
+
+    def update(self, text):
+        """Return the relevant sections for text, as retriever.search would"""
+        scores = self.scores(text)
+        if self._sections is None:
+            indices, _ = self.retriever.top_k(scores)
+            self._sections = self.retriever._to_sections(indices)
+        return self._sections
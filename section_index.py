@@ -0,0 +1,302 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import uuid
+
+import numpy as np
+from scipy import sparse
+
+try:
+    import fcntl
+except ImportError:
+    # Without it (Windows) concurrent builds are not serialised; each still swaps in whole
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, 'fir_sections.csv')
+INDEX_DIR = os.environ.get('FIR_INDEX_DIR', os.path.join(BASE_DIR, '.fir_index'))
+
+# Bump when the on-disk layout changes so stale indexes are rebuilt
+INDEX_VERSION = 2
+
+# Same tokenisation as sklearn's TfidfVectorizer defaults
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+TABLE_COLUMNS = ('Section', 'Description', 'Offense', 'Punishment')
+
+# Okapi BM25 parameters for the Offense + Description index
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Each build is written into its own version directory under the index
+# directory; this file names the current one and is replaced in one step
+CURRENT_FILE = 'CURRENT'
+
+
+def csv_checksum(csv_path):
+    """Return the SHA-256 hex digest of the section CSV"""
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def build_lock(directory):
+    """Hold the lock that lets one thread or process at a time build the index in directory"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def new_version(directory):
+    """An empty scratch directory to write a new version of the index in directory into"""
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.mkdtemp(prefix='tmp-', dir=directory)
+
+
+def current_version(directory):
+    """The directory of the index version currently in use under directory, or None if there is none"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding='utf-8') as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(directory, name) if name else None
+
+
+def publish(directory, scratch):
+    """Make scratch (from new_version) the current version; call with build_lock held.
+
+    Readers that picked the version just replaced may still be opening its
+    files, so it is kept until the next publish; older versions, scratch
+    directories left by failed builds and files of the old unversioned
+    layout are removed.
+    """
+    name = f'v-{uuid.uuid4().hex}'
+    os.replace(scratch, os.path.join(directory, name))
+    previous = current_version(directory)
+    pointer = os.path.join(directory, f'{CURRENT_FILE}.tmp')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+    keep = {name, previous and os.path.basename(previous)}
+    for entry in os.listdir(directory):
+        if entry.startswith(('v-', 'tmp-')) and entry not in keep:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    for entry in os.listdir(os.path.join(directory, name)):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, entry))
+    return os.path.join(directory, name)
+
+
+def build_index(csv_path=CSV_PATH, index_dir=INDEX_DIR):
+    """Fit the TF-IDF and BM25 models on the CSV and write the index to index_dir"""
+    with build_lock(index_dir):
+        return _build_index(csv_path, index_dir)
+
+
+def _build_index(csv_path, index_dir):
+    import pandas as pd
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer, TfidfVectorizer
+
+    df = pd.read_csv(csv_path).fillna('')
+    vectorizer = TfidfVectorizer(stop_words='english')
+    matrix = vectorizer.fit_transform(df['Description']).tocsr().astype(np.float32)
+    matrix.sort_indices()
+
+    # BM25 weights over Offense + Description, precomputed per (section, term)
+    counter = CountVectorizer(stop_words='english')
+    counts = counter.fit_transform(df['Offense'] + '\n' + df['Description']).tocsr().astype(np.float32)
+    doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+    doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+    bm25_idf = np.log(1 + (len(df) - doc_freq + 0.5) / (doc_freq + 0.5))
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / doc_lengths.mean())
+    bm25 = counts.copy()
+    row_of_entry = np.repeat(np.arange(len(df)), np.diff(counts.indptr))
+    bm25.data = (bm25_idf[counts.indices] * counts.data * (BM25_K1 + 1)
+                 / (counts.data + length_norm[row_of_entry])).astype(np.float32)
+    bm25.sort_indices()
+
+    # Write into a scratch directory and swap it in, so a reader never sees a half-written index
+    tmp_dir = new_version(index_dir)
+
+    np.save(os.path.join(tmp_dir, 'idf.npy'), vectorizer.idf_.astype(np.float32))
+    np.save(os.path.join(tmp_dir, 'data.npy'), matrix.data)
+    np.save(os.path.join(tmp_dir, 'indices.npy'), matrix.indices.astype(np.int32))
+    np.save(os.path.join(tmp_dir, 'indptr.npy'), matrix.indptr.astype(np.int32))
+    np.save(os.path.join(tmp_dir, 'bm25_data.npy'), bm25.data)
+    np.save(os.path.join(tmp_dir, 'bm25_indices.npy'), bm25.indices.astype(np.int32))
+    np.save(os.path.join(tmp_dir, 'bm25_indptr.npy'), bm25.indptr.astype(np.int32))
+    with open(os.path.join(tmp_dir, 'terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(_terms(vectorizer.vocabulary_), f)
+    with open(os.path.join(tmp_dir, 'bm25_terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(_terms(counter.vocabulary_), f)
+    with open(os.path.join(tmp_dir, 'table.json'), 'w', encoding='utf-8') as f:
+        json.dump({column: df[column].astype(str).tolist() for column in TABLE_COLUMNS}, f)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': INDEX_VERSION,
+            'checksum': csv_checksum(csv_path),
+            'shape': list(matrix.shape),
+            'bm25_shape': list(bm25.shape),
+            'stop_words': sorted(ENGLISH_STOP_WORDS),
+        }, f)
+
+    return publish(index_dir, tmp_dir)
+
+
+def _terms(vocabulary):
+    terms = [None] * len(vocabulary)
+    for term, column in vocabulary.items():
+        terms[column] = term
+    return terms
+
+
+def read_meta(version_dir):
+    """The meta.json of an index version, or None if it is missing or unreadable"""
+    if version_dir is None:
+        return None
+    try:
+        with open(os.path.join(version_dir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def index_is_current(csv_path=CSV_PATH, index_dir=INDEX_DIR):
+    """Check whether the index on disk was built from the current CSV"""
+    meta = read_meta(current_version(index_dir))
+    return (
+        meta is not None
+        and meta.get('version') == INDEX_VERSION
+        and meta.get('checksum') == csv_checksum(csv_path)
+    )
+
+
+class SectionIndex:
+    """Memory-mapped TF-IDF and BM25 indexes with the section table they were built from"""
+
+    def __init__(self, index_dir):
+        # Every file is read from the one version current now, even if a rebuild swaps in another
+        version_dir = current_version(index_dir)
+        meta = read_meta(version_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No section index in {index_dir}")
+        self.index_dir = index_dir
+        index_dir = version_dir
+        self.checksum = meta['checksum']
+        self.stop_words = frozenset(meta['stop_words'])
+
+        with open(os.path.join(index_dir, 'terms.json'), encoding='utf-8') as f:
+            self.terms = json.load(f)
+        self.vocabulary = {term: column for column, term in enumerate(self.terms)}
+        self.idf = np.load(os.path.join(index_dir, 'idf.npy'), mmap_mode='r')
+
+        self.matrix = _load_csr(index_dir, '', meta['shape'])
+
+        with open(os.path.join(index_dir, 'bm25_terms.json'), encoding='utf-8') as f:
+            self.bm25_vocabulary = {term: column for column, term in enumerate(json.load(f))}
+        self.bm25 = _load_csr(index_dir, 'bm25_', meta['bm25_shape'])
+
+        with open(os.path.join(index_dir, 'table.json'), encoding='utf-8') as f:
+            table = json.load(f)
+        self.sections = table['Section']
+        self.descriptions = table['Description']
+        self.offenses = table['Offense']
+        self.punishments = table['Punishment']
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def tokenize(self, text):
+        """Split text into the index's terms, dropping stop words"""
+        return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in self.stop_words]
+
+    def _term_counts(self, tokens, vocabulary):
+        counts = {}
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        return cols, np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+    def transform(self, texts, tokenized=False):
+        """Vectorise texts into L2-normalised TF-IDF rows, like TfidfVectorizer.transform.
+
+        Pass tokenized=True with lists of tokens from tokenize() to skip re-tokenising.
+        """
+        return self._vectorise(texts, tokenized, self.vocabulary,
+                               weight=lambda cols, counts: counts * self.idf[cols], normalise=True)
+
+    def bm25_query(self, texts, tokenized=False):
+        """Vectorise texts into raw term counts over the BM25 vocabulary"""
+        return self._vectorise(texts, tokenized, self.bm25_vocabulary)
+
+    def _vectorise(self, texts, tokenized, vocabulary, weight=None, normalise=False):
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            cols, weights = self._term_counts(text if tokenized else self.tokenize(text), vocabulary)
+            if not len(cols):
+                continue
+            if weight is not None:
+                weights = weight(cols, weights)
+            if normalise:
+                weights /= np.linalg.norm(weights)
+            rows.append(np.full(len(cols), row, dtype=np.int32))
+            columns.append(cols)
+            values.append(weights)
+
+        shape = (len(texts), len(vocabulary))
+        if not rows:
+            return sparse.csr_matrix(shape, dtype=np.float32)
+        return sparse.csr_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+            shape=shape,
+        )
+
+
+def _load_csr(index_dir, prefix, shape):
+    data = np.load(os.path.join(index_dir, f'{prefix}data.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(index_dir, f'{prefix}indices.npy'), mmap_mode='r')
+    indptr = np.load(os.path.join(index_dir, f'{prefix}indptr.npy'), mmap_mode='r')
+    return sparse.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+
+def load_index(csv_path=CSV_PATH, index_dir=INDEX_DIR):
+    """Load the section index, rebuilding it first if the CSV has changed"""
+    return load_current(SectionIndex, index_is_current, _build_index, csv_path, index_dir)
+
+
+def load_current(load, is_current, build, csv_path, directory):
+    """load(directory), after build(csv_path, directory) if is_current(csv_path, directory) says it is stale.
+
+    Another process may be building the same index: the build waits for it
+    and is skipped if it made the index current. A version removed or
+    found incomplete while it loads is loaded once more, rebuilt if needed.
+    """
+    for attempt in range(2):
+        if not is_current(csv_path, directory):
+            with build_lock(directory):
+                if not is_current(csv_path, directory):
+                    build(csv_path, directory)
+        try:
+            return load(directory)
+        except (OSError, ValueError):
+            if attempt:
+                raise
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    index_dir = sys.argv[2] if len(sys.argv) > 2 else INDEX_DIR
+    print(f"Index written to {build_index(csv_path, index_dir)}")
@@ -0,0 +1,296 @@
+"""Section corpora split into index shards, one per act.
+
+Each corpus is a CSV with the fir_sections.csv columns whose Section keys
+carry the act ('BNS_303', 'IT_66C', 'NDPS_20'); fir_sections.csv itself is
+the IPC corpus. Every corpus has its own prebuilt index under
+INDEX_DIR/shards/<name>, so adding or editing one act rebuilds only that
+shard, and queries fan out to every shard and merge the results.
+
+The corpora are fir_sections.csv plus every CSV in FIR_CORPUS_DIR (default
+corpora/ next to this file), or exactly the CSV files and directories
+listed in FIR_CORPORA (separated by os.pathsep).
+
+    python section_shards.py [--embeddings]   # build every stale shard, e.g. before a deploy
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+import metrics
+from section_index import BASE_DIR, CSV_PATH, INDEX_DIR, csv_checksum
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = os.environ.get('FIR_CORPUS_DIR', os.path.join(BASE_DIR, 'corpora'))
+SHARD_DIR = os.path.join(INDEX_DIR, 'shards')
+
+# fir_sections.csv predates the corpus directory; its shard is named after its act
+DEFAULT_SHARD = 'ipc'
+
+# Offense titles scored against their own shard to calibrate it at load time
+BACKGROUND_PROBES = 64
+
+
+def discover_corpora(paths=None):
+    """Return {shard name: csv path} for the configured corpora, sorted by name"""
+    if paths is None:
+        configured = os.environ.get('FIR_CORPORA')
+        paths = configured.split(os.pathsep) if configured else [CSV_PATH, CORPUS_DIR]
+    corpora = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith('.csv')]
+        elif os.path.isfile(path):
+            files = [path]
+        else:
+            continue
+        for csv_path in files:
+            corpora[shard_name(csv_path)] = os.path.abspath(csv_path)
+    return dict(sorted(corpora.items()))
+
+
+def shard_name(csv_path):
+    """'corpora/BNS.csv' -> 'bns'; fir_sections.csv -> 'ipc'"""
+    if os.path.abspath(csv_path) == os.path.abspath(CSV_PATH):
+        return DEFAULT_SHARD
+    return os.path.splitext(os.path.basename(csv_path))[0].lower()
+
+
+def _stamp(csv_path):
+    stat = os.stat(csv_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Shard:
+    """One corpus: its CSV, the retriever loaded from its index, and the CSV's stamp at load time"""
+
+    def __init__(self, name, csv_path, retriever, stamp):
+        self.name = name
+        self.csv_path = csv_path
+        self.retriever = retriever
+        self.stamp = stamp
+        self.mean, self.std = _background(retriever)
+
+    def normalise(self, scores):
+        """Put raw scores from this shard on the scale shared by every shard"""
+        return (scores - self.mean) / self.std
+
+
+def _background(retriever):
+    """Mean and spread of the retriever's scores for queries drawn from its own corpus"""
+    offenses = retriever.index.offenses
+    probes = [offense for offense in offenses[::max(1, len(offenses) // BACKGROUND_PROBES)] if offense.strip()]
+    if not probes:
+        return 0.0, 1.0
+    scores = retriever.score(probes)
+    return float(scores.mean()), max(float(scores.std()), 1e-6)
+
+
+class CorpusView:
+    """The section tables of every shard, concatenated, for lookups by section key"""
+
+    def __init__(self, shards):
+        self.sections, self.descriptions, self.offenses, self.punishments = [], [], [], []
+        for shard in shards.values():
+            index = shard.retriever.index
+            self.sections += index.sections
+            self.descriptions += index.descriptions
+            self.offenses += index.offenses
+            self.punishments += index.punishments
+
+    def __len__(self):
+        return len(self.sections)
+
+
+class ShardedRetriever:
+    """Fans a query out to one retriever per corpus and merges their top sections.
+
+    TF-IDF idf, BM25 lengths and the embedding space are all fitted per
+    corpus, so raw scores from different shards are not on one scale; a
+    small act's embedding space, for one, gives every query higher cosines.
+    When a shard loads, it scores a sample of its own Offense titles, and
+    its candidates (above that shard's own threshold, so an unrelated act
+    contributes nothing) are standardised against the mean and spread of
+    those scores before merging. An explicitly cited section still ranks
+    ahead of every similarity match, whichever shard it is in.
+
+    load(csv_path, index_dir) returns a retriever for one corpus, building
+    its index first if the CSV has changed. refresh() picks up added,
+    edited and removed corpora, reloading only the shards that changed;
+    searches running meanwhile keep using the shards they started with.
+    """
+
+    def __init__(self, load, discover=discover_corpora, shard_dir=SHARD_DIR, k=5):
+        self.load = load
+        self.discover = discover
+        self.shard_dir = shard_dir
+        self.k = k
+        # Replaced as a whole on every change and never mutated, so readers need no lock
+        self._shards = {}
+        self._view = CorpusView({})
+        self._refresh_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.refresh()
+        if not self._shards:
+            raise ValueError(f"No section corpus could be loaded from {list(self.discover().values())}")
+
+    @property
+    def shards(self):
+        return self._shards
+
+    @property
+    def index(self):
+        """Every shard's sections, offenses and punishments, for SectionTable"""
+        return self._view
+
+    def _load_shard(self, name, csv_path):
+        stamp = _stamp(csv_path)
+        with metrics.span('shard_load', shard=name) as span:
+            retriever = self.load(csv_path, os.path.join(self.shard_dir, name))
+            span.set(sections=len(retriever.sections))
+        return Shard(name, csv_path, retriever, stamp)
+
+    def refresh(self, force=()):
+        """Load new corpora, reload edited ones and drop removed ones; return the names that changed.
+
+        Shards named in force are reloaded even if their CSV looks unchanged.
+        A shard that fails to load keeps serving its previous index and is
+        retried on the next refresh.
+        """
+        with self._refresh_lock:
+            current = self._shards
+            shards, changed = {}, []
+            for name, csv_path in self.discover().items():
+                shard = current.get(name)
+                try:
+                    if shard is not None and shard.csv_path == csv_path and name not in force:
+                        stamp = _stamp(csv_path)
+                        if stamp == shard.stamp:
+                            shards[name] = shard
+                            continue
+                        if csv_checksum(csv_path) == shard.retriever.index.checksum:
+                            # Touched but not edited
+                            shard.stamp = stamp
+                            shards[name] = shard
+                            continue
+                    shards[name] = self._load_shard(name, csv_path)
+                    changed.append(name)
+                    metrics.increment('fir_shard_reload_total', shard=name, result='ok')
+                except Exception:
+                    logger.exception("Could not load section corpus %s from %s", name, csv_path)
+                    metrics.increment('fir_shard_reload_total', shard=name, result='error')
+                    if shard is not None:
+                        shards[name] = shard
+            changed += [name for name in current if name not in shards]
+            if changed:
+                self._view = CorpusView(shards)
+                self._shards = shards
+            return changed
+
+    def reload(self, name):
+        """Reload one shard from its CSV, whether or not it looks changed"""
+        return self.refresh(force=(name,))
+
+    def watch(self, interval):
+        """Call refresh() every interval seconds in a daemon thread, so edited corpora go live without a restart"""
+        if self._watcher is not None:
+            return self._watcher
+
+        def poll():
+            while not self._stop_watching.wait(interval):
+                try:
+                    changed = self.refresh()
+                except Exception:
+                    logger.exception("Section corpus refresh failed")
+                    continue
+                if changed:
+                    logger.info("Reloaded section shards: %s", ", ".join(changed))
+
+        self._watcher = threading.Thread(target=poll, name='fir-corpus-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watching(self):
+        self._stop_watching.set()
+
+    def _merge(self, scored, text, k=None, threshold=None):
+        """Merge per-shard score rows [(shard, scores)] for one text into {section: description}"""
+        k = self.k if k is None else k
+        hits = []
+        for shard, scores in scored:
+            retriever = shard.retriever
+            indices, raw = retriever.top_k(scores, k, threshold)
+            if not len(indices):
+                continue
+            # Rounded so float noise between the live and full scores cannot reorder ties across shards
+            normalised = np.round(shard.normalise(raw), 6)
+            cited = retriever.cited_sections(text) if hasattr(retriever, 'cited_sections') else ()
+            hits += [(index in cited, score, retriever, index) for index, score in zip(indices, normalised)]
+        hits.sort(key=lambda hit: hit[:2], reverse=True)
+        return {retriever.sections[index]: retriever.descriptions[index] for _, _, retriever, index in hits[:k]}
+
+    def search(self, description, k=None, threshold=None):
+        """Find the sections most relevant to one case description, across every shard"""
+        scored = [(shard, shard.retriever.score_one(description)) for shard in self._shards.values()]
+        return self._merge(scored, description, k, threshold)
+
+    def search_batch(self, descriptions, k=None, threshold=None):
+        """Find relevant sections for many case descriptions with one matrix multiply per shard"""
+        if not descriptions:
+            return []
+        descriptions = list(descriptions)
+        scored = [(shard, shard.retriever.score(descriptions)) for shard in self._shards.values()]
+        return [self._merge([(shard, scores[row]) for shard, scores in scored], description, k, threshold)
+                for row, description in enumerate(descriptions)]
+
+    def live_query(self):
+        """A ShardedLiveQuery that re-scores a description as it is edited"""
+        return ShardedLiveQuery(self)
+
+
+class ShardedLiveQuery:
+    """A LiveQuery per shard, merged like ShardedRetriever.search.
+
+    A shard reloaded since the last update gets a fresh LiveQuery.
+    """
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self.text = ''
+        self.changed = 0
+        self._queries = {}
+        self._sections = {}
+
+    def update(self, text):
+        """Return the relevant sections for text, as retriever.search would"""
+        shards = self.retriever.shards
+        current = all(name in self._queries and self._queries[name][0] is shard for name, shard in shards.items())
+        if text == self.text and current and len(shards) == len(self._queries):
+            return self._sections
+        queries, scored, changed = {}, [], 0
+        for name, shard in shards.items():
+            entry = self._queries.get(name)
+            if entry is None or entry[0] is not shard:
+                entry = (shard, shard.retriever.live_query())
+            scores = entry[1].scores(text)
+            changed += entry[1].changed
+            queries[name] = entry
+            scored.append((shard, scores))
+        self._queries = queries
+        self.text, self.changed = text, changed
+        self._sections = self.retriever._merge(scored, text)
+        return self._sections
+
+
+if __name__ == '__main__':
+    import sys
+    from section_index import load_index
+    for name, csv_path in discover_corpora().items():
+        index = load_index(csv_path, os.path.join(SHARD_DIR, name))
+        if '--embeddings' in sys.argv[1:]:
+            from embedding_index import load_embeddings
+            load_embeddings(csv_path, os.path.join(SHARD_DIR, name))
+        print(f"{name}: {len(index)} sections from {csv_path}")
@@ -0,0 +1,216 @@
+"""Offline stand-ins for the Groq client.
+
+StubGroq and StubAsyncGroq expose the same ``chat.completions.create`` call
+as the real clients, including ``stream=True``, and answer after an injected
+latency (optionally growing with the prompt size), so the pipeline can be
+exercised and timed without network access or an API key. FaultyGroq and
+AsyncFaultyGroq also inject 429s, server errors, timeouts and slow responses.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from prompt_builder import count_tokens
+
+
+def default_reply(messages):
+    """Echo the start of the user prompt so callers can tell the two completions apart.
+
+    Prompts asking for the FIR or analysis JSON objects get one back, with
+    the echo in its main text field.
+    """
+    prompt = messages[-1]["content"].strip()
+    echo = f"STUB COMPLETION\n{prompt[:200]}"
+    if '"incident_description"' in prompt:
+        return json.dumps({"accused": "Unknown", "incident_description": echo, "sections_applied": ["IPC 379 - Theft"],
+                           "action_taken": "Case registered and taken up for investigation."})
+    if '"applicable_sections"' in prompt:
+        return json.dumps({"applicable_sections": [{"section": "IPC 379", "reason": "Theft of movable property"}],
+                           "analysis": echo, "recommendations": ["Record the complainant's statement"]})
+    return echo
+
+
+def prompt_tokens(messages):
+    return sum(count_tokens(message["content"]) for message in messages)
+
+
+def make_completion(content, model="stub", prompt_tokens=0):
+    """Build a response object shaped like a Groq chat completion"""
+    completion_tokens = len(content.split())
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+def make_chunk(content, model="stub", finish_reason=None):
+    """Build a streamed chunk shaped like a Groq chat completion delta"""
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason=finish_reason, delta=SimpleNamespace(content=content))],
+    )
+
+
+def _split_tokens(content):
+    # Whitespace-attached words stand in for model tokens
+    words = content.split(" ")
+    return [word + " " for word in words[:-1]] + words[-1:]
+
+
+class _StubCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        self._owner.calls.append(kwargs)
+        tokens = prompt_tokens(kwargs["messages"])
+        time.sleep(self._owner.latency + self._owner.prompt_delay * tokens)
+        content = self._owner.reply(kwargs["messages"])
+        if kwargs.get("stream"):
+            return self._stream(content, kwargs.get("model", "stub"))
+        time.sleep(self._owner.token_delay * len(_split_tokens(content)))
+        return make_completion(content, kwargs.get("model", "stub"), tokens)
+
+    def _stream(self, content, model):
+        for token in _split_tokens(content):
+            yield make_chunk(token, model)
+            time.sleep(self._owner.token_delay)
+        yield make_chunk(None, model, finish_reason="stop")
+
+
+class _AsyncStubCompletions(_StubCompletions):
+    async def create(self, **kwargs):
+        self._owner.calls.append(kwargs)
+        tokens = prompt_tokens(kwargs["messages"])
+        await asyncio.sleep(self._owner.latency + self._owner.prompt_delay * tokens)
+        content = self._owner.reply(kwargs["messages"])
+        if kwargs.get("stream"):
+            return self._stream(content, kwargs.get("model", "stub"))
+        await asyncio.sleep(self._owner.token_delay * len(_split_tokens(content)))
+        return make_completion(content, kwargs.get("model", "stub"), tokens)
+
+    async def _stream(self, content, model):
+        for token in _split_tokens(content):
+            yield make_chunk(token, model)
+            await asyncio.sleep(self._owner.token_delay)
+        yield make_chunk(None, model, finish_reason="stop")
+
+
+class StubGroq:
+    """Synchronous fake Groq client.
+
+    latency is the delay before the first token, prompt_delay an extra delay
+    per (estimated) prompt token, and token_delay the delay between output
+    tokens, all in seconds.
+    """
+
+    completions_class = _StubCompletions
+
+    def __init__(self, latency=0.0, reply=default_reply, token_delay=0.0, prompt_delay=0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self.reply = reply
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self.completions_class(self))
+
+
+class StubAsyncGroq(StubGroq):
+    """Async fake Groq client, with the same latency settings as StubGroq"""
+
+    completions_class = _AsyncStubCompletions
+
+
+class StubAPIError(Exception):
+    """An HTTP error shaped like groq.APIStatusError (status_code, response.headers)"""
+
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class StubTimeoutError(TimeoutError):
+    """The request took longer than its timeout"""
+
+
+class _FaultyCompletions(_StubCompletions):
+    def create(self, **kwargs):
+        delay, error = self._owner.fault(kwargs)
+        time.sleep(delay)
+        if error is not None:
+            self._owner.calls.append(kwargs)
+            raise error
+        return super().create(**kwargs)
+
+
+class _AsyncFaultyCompletions(_AsyncStubCompletions):
+    async def create(self, **kwargs):
+        delay, error = self._owner.fault(kwargs)
+        await asyncio.sleep(delay)
+        if error is not None:
+            self._owner.calls.append(kwargs)
+            raise error
+        return await super().create(**kwargs)
+
+
+class FaultyGroq(StubGroq):
+    """A StubGroq that injects failures, for exercising retries, breakers and fallback.
+
+    Each call independently gets a 429 (with a retry-after header), a 500, a
+    timeout or an extra slow_latency delay, with the given probabilities.
+    Faults only hit models in faulty_models (every model when None), so a
+    saturated primary with a healthy fallback can be simulated. A slow
+    response that exceeds the request's ``timeout`` raises a timeout too.
+    """
+
+    completions_class = _FaultyCompletions
+
+    def __init__(self, latency=0.0, reply=default_reply, token_delay=0.0, prompt_delay=0.0, rate_limit=0.0,
+                 server_error=0.0, timeout=0.0, slow=0.0, slow_latency=5.0, retry_after=1.0,
+                 faulty_models=None, seed=None):
+        super().__init__(latency=latency, reply=reply, token_delay=token_delay, prompt_delay=prompt_delay)
+        self.rate_limit = rate_limit
+        self.server_error = server_error
+        self.timeout = timeout
+        self.slow = slow
+        self.slow_latency = slow_latency
+        self.retry_after = retry_after
+        self.faulty_models = faulty_models
+        self.faults = {"rate_limit": 0, "server_error": 0, "timeout": 0, "slow": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fault(self, kwargs):
+        """Return (extra delay, exception or None) for one call"""
+        if self.faulty_models is not None and kwargs.get("model") not in self.faulty_models:
+            return 0.0, None
+        with self._lock:
+            roll = self._random.random()
+        request_timeout = kwargs.get("timeout")
+        for kind, chance in (("rate_limit", self.rate_limit), ("server_error", self.server_error),
+                             ("timeout", self.timeout), ("slow", self.slow)):
+            if roll >= chance:
+                roll -= chance
+                continue
+            with self._lock:
+                self.faults[kind] += 1
+            if kind == "rate_limit":
+                return 0.0, StubAPIError(429, "Rate limit reached", {"retry-after": str(self.retry_after)})
+            if kind == "server_error":
+                return 0.0, StubAPIError(500, "Internal server error")
+            if kind == "timeout" or (request_timeout and self.slow_latency > request_timeout):
+                return request_timeout or self.slow_latency, StubTimeoutError("Request timed out")
+            return self.slow_latency, None
+        return 0.0, None
+
+
+class AsyncFaultyGroq(FaultyGroq):
+    """Async FaultyGroq"""
+
+    completions_class = _AsyncFaultyCompletions
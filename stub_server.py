@@ -0,0 +1,186 @@
+"""A local HTTP stand-in for the Groq chat completions API.
+
+Serves POST /openai/v1/chat/completions like api.groq.com, including
+``stream=True`` (server-sent events), answering with stub_llm.default_reply
+after a configurable delay: latency before the first token, prompt_delay per
+prompt token, then output at tokens_per_second. Unlike the in-process stubs,
+requests go through the real groq SDK, httpx connection pool, JSON encoding
+and sockets, so the full pipeline can be timed and load-tested offline.
+
+    python stub_server.py [--port 8765] [--latency 0.5] [--tokens-per-second 250]
+    GROQ_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stub_llm import _split_tokens, default_reply, prompt_tokens
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the client's connection pool is exercised as it is against the real API
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?")[0] != COMPLETIONS_PATH:
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+        try:
+            request = json.loads(body)
+            messages = request["messages"]
+        except (ValueError, KeyError) as e:
+            return self._send_json(400, {"error": {"message": f"Bad request: {e}", "type": "invalid_request_error"}})
+        server.started()
+        try:
+            model = request.get("model", "stub")
+            tokens = prompt_tokens(messages)
+            time.sleep(server.latency + server.prompt_delay * tokens)
+            content = server.reply(messages)
+            if request.get("stream"):
+                self._stream(content, model)
+            else:
+                time.sleep(len(_split_tokens(content)) * server.token_delay)
+                self._send_json(200, _completion(content, model, tokens))
+        finally:
+            server.finished()
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/stats":
+            return self._send_json(200, self.server.stats())
+        self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, content, model):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # An event stream has no length, so it ends with the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for token in _split_tokens(content):
+            self._event(_chunk(completion_id, model, {"role": "assistant", "content": token}, None))
+            time.sleep(self.server.token_delay)
+        self._event(_chunk(completion_id, model, {}, "stop"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _event(self, payload):
+        self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _completion(content, model, prompt_tokens):
+    completion_tokens = len(_split_tokens(content))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def _chunk(completion_id, model, delta, finish_reason):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+    }
+
+
+class StubGroqServer(ThreadingHTTPServer):
+    """The stub API on host:port (port 0 picks a free one), one thread per connection.
+
+    latency is the delay before the first token and prompt_delay an extra
+    delay per (estimated) prompt token, in seconds; tokens_per_second is the
+    output rate (0 for no delay). requests counts the completions served and
+    peak_concurrency the most served at once (see stats()).
+    """
+
+    daemon_threads = True
+    # The default backlog of 5 drops connections when many clients start at once
+    request_queue_size = 128
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, tokens_per_second=0.0, prompt_delay=0.0,
+                 reply=default_reply):
+        super().__init__((host, port), _StubHandler)
+        self.latency = latency
+        self.prompt_delay = prompt_delay
+        self.token_delay = 1.0 / tokens_per_second if tokens_per_second else 0.0
+        self.reply = reply
+        self.requests = 0
+        self.peak_concurrency = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        """The base URL for Groq(base_url=...) or GROQ_BASE_URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self._active += 1
+            self.peak_concurrency = max(self.peak_concurrency, self._active)
+
+    def finished(self):
+        with self._lock:
+            self._active -= 1
+
+    def stats(self):
+        """Completions served so far and the peak concurrency, also served as GET /stats"""
+        with self._lock:
+            return {"requests": self.requests, "active": self._active, "peak_concurrency": self.peak_concurrency}
+
+    def start(self):
+        """Serve from a daemon thread and return self"""
+        threading.Thread(target=self.serve_forever, name="stub-groq-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a stub Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="output token rate; 0 for no delay")
+    parser.add_argument("--prompt-delay", type=float, default=0.0, help="extra seconds per prompt token")
+    args = parser.parse_args()
+
+    server = StubGroqServer(args.host, args.port, args.latency, args.tokens_per_second, args.prompt_delay)
+    # The first line is read by benchmarks that start the server in a subprocess
+    print(f"Serving a stub Groq API on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
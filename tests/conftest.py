@@ -0,0 +1,36 @@
+"""Shared test setup: the app's modules are imported from the repository root,
+and the FIR number register, archive and caches go to a scratch directory."""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# fir_numbers and fir_archive read their paths on import, so these are set before any test imports them
+STATE_DIR = tempfile.mkdtemp(prefix="fir-tests-")
+os.environ["FIR_NUMBERS_DB"] = os.path.join(STATE_DIR, "fir_numbers.db")
+os.environ["FIR_ARCHIVE_DB"] = os.path.join(STATE_DIR, "fir_archive.db")
+os.environ["FIR_CORPUS_POLL"] = "0"
+for name in ("FIR_JOBS_DB", "FIR_CACHE_DB"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture(scope="session")
+def section_index():
+    """The index of fir_sections.csv, built once into the scratch directory"""
+    from section_index import load_index
+    return load_index(index_dir=os.path.join(STATE_DIR, "index"))
+
+
+@pytest.fixture(scope="session")
+def embeddings(section_index):
+    from embedding_index import load_embeddings
+    return load_embeddings(index_dir=os.path.join(STATE_DIR, "index"))
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
@@ -0,0 +1,38 @@
+"""Rows keep their own ids, and a bad row does not stop the batch"""
+import json
+
+import batch_fir
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows))
+    return str(path)
+
+
+def test_falsy_ids_are_kept(tmp_path):
+    path = write_jsonl(tmp_path / "in.jsonl", [
+        {"id": 0, "case_description": "a"},
+        {"id": 1, "case_description": "b"},
+        {"id": "", "case_description": "c"},
+        {"case_description": "d"},
+    ])
+    assert [row_id for row_id, _ in batch_fir.read_complaints(path)] == ["0", "1", "3", "4"]
+
+
+def test_csv_ids(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("id,case_description\n0,a\n,b\n")
+    assert [row_id for row_id, _ in batch_fir.read_complaints(str(path))] == ["0", "2"]
+
+
+def test_bad_rows_are_counted_as_failed(tmp_path):
+    path = write_jsonl(tmp_path / "in.jsonl", [
+        {"id": 0, "case_description": "Someone stole my bike from the market"},
+        {"id": 1},
+        "not json",
+        {"id": 3, "case_description": "He hit me with a stick"},
+    ])
+    processed, failed, _ = batch_fir.run(path, str(tmp_path / "out"), workers=1, local_only=True, archive=False)
+    assert (processed, failed) == (2, 2)
+    with open(tmp_path / "out" / batch_fir.RESULTS_FILE) as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ["0", "3"]
@@ -0,0 +1,70 @@
+"""Completions are served from the cache on a repeat request, but fallback answers are never cached"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import ai_model
+from completion_cache import CompletionCache, MemoryTier, SQLiteTier, make_key
+from stub_llm import StubAsyncGroq, default_reply, make_completion
+
+CASE = "A man snatched my mobile phone near the bus stand and threatened me with a knife."
+SECTIONS = {"IPC_379": "Whoever intends to take dishonestly any movable property is said to commit theft."}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CompletionCache([MemoryTier()])
+    monkeypatch.setattr(ai_model, "completion_cache", cache)
+    return cache
+
+
+class FallbackCompletions:
+    """Answers every request from the fallback model, as the client does when the primary is down"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return make_completion(default_reply(kwargs["messages"]), model="llama3-8b-8192")
+
+
+def analyse(client):
+    return asyncio.run(ai_model.get_sections_and_analysis_async(CASE, SECTIONS, client=client))
+
+
+def test_key_ignores_whitespace_only_edits():
+    messages = [{"role": "user", "content": "He took my   phone.\n"}]
+    assert make_key("m", 0.2, messages) == make_key("m", 0.2, [{"role": "user", "content": "He took my phone."}])
+    assert make_key("m", 0.2, messages) != make_key("m", 0.3, messages)
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    disk = SQLiteTier(str(tmp_path / "cache.db"))
+    disk.set("key", "value")
+    memory = MemoryTier()
+    cache = CompletionCache([memory, disk])
+    assert cache.get("key") == "value"
+    assert memory.get("key") == "value"
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": {"memory": 0, "sqlite": 1}, "misses": 1, "hit_rate": 0.5}
+
+
+def test_repeat_request_is_a_hit(cache):
+    client = StubAsyncGroq()
+    _, first = analyse(client)
+    _, second = analyse(client)
+    assert len(client.calls) == 1
+    assert second.to_dict() == first.to_dict()
+    assert cache.stats()["hits"]["memory"] == 1
+
+
+def test_fallback_answer_is_not_cached(cache):
+    completions = FallbackCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    _, analysis = analyse(client)
+    assert analysis.source == "llm"
+    assert len(cache.tiers[0]) == 0
+    analyse(client)
+    assert len(completions.calls) == 2
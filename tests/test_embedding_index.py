@@ -0,0 +1,36 @@
+"""The lexicon adds legal terms for whole words and phrases, not for words that merely share a prefix"""
+import pytest
+
+from embedding_index import _expand
+
+
+@pytest.mark.parametrize("text, terms", [
+    ("He fired at me from the roof", "attempt to murder"),
+    ("They opened fire on the crowd", "attempt to murder"),
+    ("Someone stole my bike", "theft"),
+    ("My neighbour threatened to kill me", "criminal intimidation"),
+    ("He was stabbed in the market", "murder dangerous weapon"),
+    ("The clerk was bribed", "gratification public servant"),
+    ("They broke into my house at night", "house-breaking"),
+    ("He slapped me twice", "voluntarily causing hurt"),
+    ("My minor daughter did not come back from school", "minor lawful guardianship"),
+    ("The girl he married is underage", "minor lawful guardianship"),
+])
+def test_matches_words_and_phrases(text, terms):
+    assert terms in _expand(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I was fired from my job last week",
+    "The fire station is near my house",
+    "I forgot my bag on the bus",
+    "He has a stable job",
+    "She is a minority shareholder",
+    "The hitchhiker asked for directions",
+    "He is a skilled establishment manager",
+    "The scheme was announced",
+    "I only had minor injuries",
+    "There was a minor argument over parking",
+])
+def test_no_false_positives(text):
+    assert _expand(text) == ""
@@ -0,0 +1,65 @@
+"""Archive search by text and section, newest first, one keyset page at a time"""
+import pytest
+
+from fir_archive import FIRArchive
+
+CASES = [
+    ("Ramesh Kumar", "Bus stand", "Someone snatched my mobile phone", ["IPC_379"]),
+    ("Suresh", "Main market", "He threatened to kill me", ["IPC_506"]),
+    ("Ramesh Kumar", "Railway station", "He snatched my bag and hit me", ["IPC_379", "IPC_323"]),
+    ("Mahesh", "Bus stand", "My phone was stolen from my pocket", ["IPC_379"]),
+]
+
+
+def fir(number, accused, place, description, sections):
+    request = {"fir_number": f"{number}/2026", "registration_date": "17-10-2026",
+               "complaint": {"case_description": description, "accused_name": accused,
+                             "place_of_occurrence": place, "complainant_name": "Anita"}}
+    result = {"sections": {section: "" for section in sections}, "source": "llm",
+              "fir_structure": {"incident_description": description, "sections_applied": sections},
+              "analysis": {"analysis": ""}}
+    return request, result
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = FIRArchive(str(tmp_path / "archive.db"))
+    for number, case in enumerate(CASES, 1):
+        archive.add(*fir(number, *case), key=f"job-{number}")
+    yield archive
+    archive.close()
+
+
+def numbers(page):
+    return [row["fir_number"] for row in page.rows]
+
+
+def test_text_search_is_newest_first(archive):
+    assert numbers(archive.search("snatched")) == ["3/2026", "1/2026"]
+    # Words match as prefixes, in any column
+    assert numbers(archive.search("rame")) == ["3/2026", "1/2026"]
+    assert numbers(archive.search("phone", place="bus")) == ["4/2026", "1/2026"]
+    assert numbers(archive.search("burglary")) == []
+
+
+def test_section_search(archive):
+    assert numbers(archive.search(section="ipc 379")) == ["4/2026", "3/2026", "1/2026"]
+    assert numbers(archive.search("snatched", section="IPC_323")) == ["3/2026"]
+    assert archive.search(section="IPC_379").rows[1]["sections"] == ["IPC_379", "IPC_323"]
+
+
+def test_keyset_pages_cover_every_match_once(archive):
+    seen, cursor = [], None
+    while True:
+        page = archive.search(section="IPC_379", before=cursor, limit=2)
+        seen += numbers(page)
+        cursor = page.cursor
+        if cursor is None:
+            break
+    assert seen == ["4/2026", "3/2026", "1/2026"]
+    assert archive.search(limit=4).cursor is None
+
+
+def test_same_key_is_archived_once(archive):
+    archive.add(*fir(1, *CASES[0]), key="job-1")
+    assert archive.count() == len(CASES)
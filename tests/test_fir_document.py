@@ -0,0 +1,50 @@
+"""Free-text FIRs parse into heading, field and paragraph blocks, and streamed JSON into its fields so far"""
+from fir_document import CaseAnalysis, blocks_to_text, load_partial_json, parse_document
+
+
+def test_parse_document_blocks():
+    text = """**FIRST INFORMATION REPORT**
+
+1. FIR Number and Registration Details:
+FIR No.: 12/2026
+Police Station: Central
+
+9. Description of the Incident
+The complainant stated that at about 8 pm
+a man snatched her phone, a black Samsung.
+
+Around that time the street lights were off, the accused ran towards the market and nobody could stop him: he was too fast.
+"""
+    assert parse_document(text) == [
+        ('heading', 'FIRST INFORMATION REPORT'),
+        ('heading', '1. FIR Number and Registration Details'),
+        ('field', 'FIR No.', '12/2026'),
+        ('field', 'Police Station', 'Central'),
+        ('heading', '9. Description of the Incident'),
+        ('paragraph', 'The complainant stated that at about 8 pm\na man snatched her phone, a black Samsung.'),
+        ('paragraph', 'Around that time the street lights were off, the accused ran towards the market and '
+                      'nobody could stop him: he was too fast.'),
+    ]
+
+
+def test_blocks_round_trip_through_text():
+    blocks = [('heading', 'ACTION TAKEN'), ('field', 'Officer', 'SI Verma'), ('paragraph', 'Case registered.')]
+    assert parse_document(blocks_to_text(blocks)) == blocks
+
+
+def test_partial_json_keeps_the_field_being_written():
+    text = '{"accused": "Unknown man", "sections_applied": ["IPC 379 - Theft", "IPC 5'
+    assert load_partial_json(text) == {"accused": "Unknown man", "sections_applied": ["IPC 379 - Theft", "IPC 5"]}
+    assert load_partial_json('{"incident_description": "He took my ph') == {"incident_description": "He took my ph"}
+
+
+def test_partial_json_unescapes_and_drops_a_cut_escape():
+    assert load_partial_json('{"analysis": "line\\nnext \\"q\\" and \\') == {"analysis": 'line\nnext "q" and '}
+    assert load_partial_json("") == {}
+    assert load_partial_json('{"analy') == {}
+
+
+def test_partial_analysis_fills_the_record():
+    analysis = CaseAnalysis().fill(load_partial_json('{"analysis": "Theft is made out", "recommendations": ["Seize CCTV'))
+    assert analysis.analysis == "Theft is made out"
+    assert analysis.recommendations == ["Seize CCTV"]
@@ -0,0 +1,83 @@
+"""A FIR that fails gives its number back, so the station's register has no gaps"""
+import time
+
+import pytest
+
+import ai_model
+import batch_fir
+from fir_numbers import FIRNumberAllocator
+from jobs import DONE, FAILED, JobQueue, MemoryJobStore
+
+STATION, YEAR = "test", 2026
+
+
+@pytest.fixture
+def allocator(tmp_path, monkeypatch):
+    allocator = FIRNumberAllocator(str(tmp_path / "fir_numbers.db"), block_size=4)
+    monkeypatch.setattr(ai_model, "fir_numbers", allocator)
+    yield allocator
+    allocator.close()
+
+
+def wait_for(queue, job_id):
+    deadline = time.monotonic() + 5
+    while not queue.get(job_id).finished:
+        assert time.monotonic() < deadline, "the job did not finish"
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_given_back_number_is_reissued_next(allocator):
+    assert [allocator.allocate(STATION, YEAR) for _ in range(3)] == [1, 2, 3]
+    allocator.give_back(2, STATION, YEAR)
+    assert allocator.allocate(STATION, YEAR) == 2
+    assert allocator.allocate(STATION, YEAR) == 4
+
+
+def test_given_back_number_is_reissued_by_another_process(allocator, tmp_path):
+    numbers = [allocator.allocate(STATION, YEAR) for _ in range(4)]
+    allocator.give_back(numbers[1], STATION, YEAR)
+    assert allocator.returned(STATION, YEAR) == [2]
+    other = FIRNumberAllocator(allocator.path, block_size=4)
+    assert other.allocate(STATION, YEAR) == 2
+    other.close()
+
+
+def test_last_number_given_back_rewinds_the_sequence(allocator):
+    allocator.close()
+    allocator = FIRNumberAllocator(allocator.path, block_size=1)
+    number = allocator.allocate(STATION, YEAR)
+    allocator.give_back(number, STATION, YEAR)
+    assert allocator.issued(STATION, YEAR) == 0
+    assert allocator.allocate(STATION, YEAR) == number
+    allocator.close()
+
+
+def test_failed_job_gives_back_its_number(allocator):
+    def fails(request, hint, report):
+        raise RuntimeError("the model is down")
+
+    queue = JobQueue(fails, MemoryJobStore(), workers=1, on_failed=ai_model.release_job_fir_number)
+    fir_number, _ = ai_model.new_fir_number()
+    assert wait_for(queue, queue.submit({"fir_number": fir_number})).status == FAILED
+    assert ai_model.new_fir_number()[0] == fir_number
+
+
+def test_finished_job_keeps_its_number(allocator):
+    queue = JobQueue(lambda request, hint, report: {}, MemoryJobStore(), workers=1,
+                     on_failed=ai_model.release_job_fir_number)
+    fir_number, _ = ai_model.new_fir_number()
+    assert wait_for(queue, queue.submit({"fir_number": fir_number})).status == DONE
+    assert ai_model.new_fir_number()[0] != fir_number
+
+
+def test_failed_batch_complaint_gives_back_its_number(allocator, monkeypatch):
+    def down(*args, **kwargs):
+        raise RuntimeError("retries exhausted")
+
+    monkeypatch.setattr(ai_model, "complete_analysis", down)
+    fir_number, _ = ai_model.new_fir_number()
+    ai_model.release_fir_number(fir_number)
+    with pytest.raises(RuntimeError):
+        batch_fir.process_complaint("1", {"case_description": "Someone stole my bike"}, {})
+    assert ai_model.new_fir_number()[0] == fir_number
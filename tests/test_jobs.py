@@ -0,0 +1,100 @@
+"""Job workers keep going through store errors, and submit() hints do not pile up"""
+import time
+
+import pytest
+
+import jobs
+from jobs import DONE, FAILED, JobQueue, MemoryJobStore, SQLiteJobStore
+
+
+class FlakyStore(MemoryJobStore):
+    """A MemoryJobStore whose claim() fails the first claim_errors times and whose progress updates always fail"""
+
+    def __init__(self, claim_errors=0, progress_errors=False, failed_errors=False):
+        super().__init__()
+        self.claim_errors = claim_errors
+        self.progress_errors = progress_errors
+        self.failed_errors = failed_errors
+
+    def claim(self):
+        if self.claim_errors:
+            self.claim_errors -= 1
+            raise RuntimeError("database is locked")
+        return super().claim()
+
+    def update(self, job_id, **changes):
+        if self.progress_errors and "status" not in changes:
+            raise RuntimeError("database is locked")
+        if self.failed_errors and changes.get("status") == FAILED:
+            raise RuntimeError("database is locked")
+        super().update(job_id, **changes)
+
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+def run(request, hint, report):
+    report("Working", 0.5)
+    return {"echo": request["n"]}
+
+
+@pytest.fixture(autouse=True)
+def quick_backoff(monkeypatch):
+    monkeypatch.setattr(jobs, "POLL_INTERVAL", 0.01)
+
+
+def test_workers_survive_claim_errors():
+    queue = JobQueue(run, FlakyStore(claim_errors=3), workers=1)
+    job = wait_for(queue, queue.submit({"n": 1}))
+    assert job.status == DONE
+    assert job.result["echo"] == 1
+    assert all(thread.is_alive() for thread in queue._threads)
+
+
+def test_progress_errors_do_not_fail_the_job():
+    queue = JobQueue(run, FlakyStore(progress_errors=True), workers=1)
+    assert wait_for(queue, queue.submit({"n": 2})).status == DONE
+
+
+def test_unstorable_result_fails_the_job(tmp_path):
+    queue = JobQueue(lambda request, hint, report: {"value": object()}, SQLiteJobStore(str(tmp_path / "jobs.db")),
+                     workers=1)
+    job = wait_for(queue, queue.submit({"n": 3}))
+    assert job.status == FAILED
+    assert job.error.startswith("The result could not be stored")
+    # The worker carries on with the next job
+    queue.run = run
+    assert wait_for(queue, queue.submit({"n": 4})).status == DONE
+
+
+def test_unmarkable_failure_keeps_the_worker_and_the_fir_number():
+    def fail(request, hint, report):
+        if request["n"] == 7:
+            raise ValueError("bad request")
+        return run(request, hint, report)
+
+    released = []
+    queue = JobQueue(fail, FlakyStore(failed_errors=True), workers=1,
+                     on_failed=lambda job_id, request, error: released.append(job_id))
+    failed = queue.submit({"n": 7})
+    assert wait_for(queue, queue.submit({"n": 8})).status == DONE
+    # Still running as far as the store knows, so it will be retried and must keep its number
+    assert not queue.get(failed).finished
+    assert released == []
+
+
+def test_hints_expire(monkeypatch):
+    queue = JobQueue(run, MemoryJobStore(), workers=0)
+    queue.submit({"n": 5}, hint="prefetched")
+    assert len(queue._hints) == 1
+    monkeypatch.setattr(jobs, "HINT_TTL", 0.0)
+    time.sleep(0.01)
+    queue.submit({"n": 6})
+    assert not queue._hints
@@ -0,0 +1,42 @@
+"""A LiveQuery edited keystroke by keystroke gives the same sections as a fresh search"""
+import pytest
+
+from retrieval import EmbeddingRetriever, HybridRetriever, SectionRetriever
+
+EDITS = [
+    "Someone stole",
+    "Someone stole my mobile phone",
+    "Someone stole my mobile phone from my bag at the bus stand",
+    "Someone snatched my mobile phone from my bag at the bus stand and threatened to kill me",
+    "He threatened to kill me u/s 506",
+    "",
+    "My husband beats me and demands dowry",
+]
+
+
+@pytest.fixture(params=["tfidf", "hybrid", "embedding"])
+def retriever(request, section_index):
+    if request.param == "tfidf":
+        return SectionRetriever(section_index)
+    if request.param == "hybrid":
+        return HybridRetriever(section_index)
+    return EmbeddingRetriever(section_index, request.getfixturevalue("embeddings"), threshold=0.3)
+
+
+def test_update_matches_search(retriever):
+    query = retriever.live_query()
+    for text in EDITS:
+        assert list(query.update(text)) == list(retriever.search(text)), text
+
+
+def test_unchanged_text_is_not_rescored(retriever):
+    query = retriever.live_query()
+    first = query.update(EDITS[2])
+    assert query.changed > 0
+    assert query.update(EDITS[2]) is first
+
+
+def test_cleared_text_finds_nothing(retriever):
+    query = retriever.live_query()
+    query.update(EDITS[3])
+    assert query.update("") == {}
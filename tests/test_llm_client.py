@@ -0,0 +1,87 @@
+"""A half-open circuit breaker must not be left waiting on a trial call that recorded no outcome"""
+import asyncio
+import time
+
+import pytest
+
+from llm_client import CircuitBreaker, CircuitOpenError, LLMPolicy
+from stub_llm import StubAPIError, make_completion
+
+MODEL = "test-model"
+
+
+def tripped_policy():
+    """A policy whose breaker has tripped and is ready for a trial call"""
+    policy = LLMPolicy(max_retries=1, base_delay=0.0, failure_threshold=1, reset_timeout=0.05)
+
+    def down(**kwargs):
+        raise StubAPIError(500, "Internal server error")
+
+    with pytest.raises((StubAPIError, CircuitOpenError)):
+        policy.call(down, {"model": MODEL})
+    time.sleep(0.06)
+    assert policy.model_state(MODEL).breaker.state == "half-open"
+    return policy
+
+
+def assert_recovers(policy):
+    assert policy.call(lambda **kwargs: make_completion("ok"), {"model": MODEL})
+    assert policy.model_state(MODEL).breaker.state == "closed"
+
+
+def test_release_frees_the_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_rate_limited_trial_is_retried():
+    policy = tripped_policy()
+    replies = [StubAPIError(429, "Rate limit reached", {"retry-after": "0"})]
+
+    def rate_limited_once(**kwargs):
+        if replies:
+            raise replies.pop()
+        return make_completion("ok")
+
+    policy.call(rate_limited_once, {"model": MODEL})
+    assert policy.model_state(MODEL).breaker.state == "closed"
+
+
+def test_bad_request_trial_is_released():
+    policy = tripped_policy()
+
+    def bad_request(**kwargs):
+        raise StubAPIError(400, "Bad request")
+
+    with pytest.raises(StubAPIError):
+        policy.call(bad_request, {"model": MODEL})
+    assert_recovers(policy)
+
+
+def test_cancelled_trial_is_released():
+    policy = tripped_policy()
+
+    async def hangs(**kwargs):
+        await asyncio.sleep(10)
+
+    async def cancelled():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.call_async(hangs, {"model": MODEL}), 0.01)
+
+    asyncio.run(cancelled())
+    assert_recovers(policy)
+
+
+def test_failed_trial_reopens():
+    policy = tripped_policy()
+
+    def down(**kwargs):
+        raise StubAPIError(500, "Internal server error")
+
+    with pytest.raises((StubAPIError, CircuitOpenError)):
+        policy.call(down, {"model": MODEL})
+    assert policy.model_state(MODEL).breaker.state == "open"
@@ -0,0 +1,46 @@
+"""The template draft fills the FIR from the form and the section table alone"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from fir_document import Complaint
+from local_fir import SectionTable, draft_analysis, draft_fir
+
+TABLE = SectionTable(SimpleNamespace(
+    sections=["IPC_379", "IPC_506"],
+    offenses=["Theft", "Criminal intimidation"],
+    punishments=["3 Years or Fine or Both", ""],
+))
+NOW = datetime(2026, 10, 17, 10, 30)
+
+
+def test_draft_fills_every_section_from_the_complaint():
+    complaint = Complaint("A man snatched my phone worth Rs. 15,000 and threatened me.",
+                          date_of_incident="2026-10-12", place_of_occurrence="Bus stand",
+                          complainant_name="Anita", accused_description="Tall, red jacket")
+    fir = draft_fir(complaint.case_description, ["IPC_379", "IPC_506"], complaint, TABLE, "9/2026", "17-10-2026",
+                    now=NOW)
+    assert fir.source == "local"
+    assert (fir.fir_number, fir.registration_date) == ("9/2026", "17-10-2026")
+    assert fir.information_received == "17-10-2026 10:30"
+    assert fir.occurrence_place == "Bus stand"
+    assert fir.complainant_name == "Anita"
+    assert fir.accused == "Tall, red jacket"
+    assert fir.incident_description == complaint.case_description
+    assert fir.delay_reason.startswith("Reported 5 days after")
+    assert fir.stolen_property == "As described by the complainant, including Rs. 15,000"
+    assert fir.sections_applied == ["IPC 379 - Theft (Punishment: 3 Years or Fine or Both)",
+                                    "IPC 506 - Criminal intimidation"]
+
+
+def test_draft_without_property_or_date():
+    fir = draft_fir("He threatened to kill me.", ["IPC_506"], "Place of Occurrence: Main market", TABLE,
+                    "10/2026", "17-10-2026", now=NOW)
+    assert fir.occurrence_place == "Main market"
+    assert fir.delay_reason == "Not applicable"
+    assert fir.stolen_property == "Not applicable"
+
+
+def test_draft_analysis_lists_the_sections():
+    analysis = draft_analysis(["IPC_379"], TABLE)
+    assert analysis.source == "local"
+    assert analysis.applicable_sections == [{"section": "IPC 379", "reason": "Theft (Punishment: 3 Years or Fine or Both)"}]
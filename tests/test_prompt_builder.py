@@ -0,0 +1,57 @@
+"""The sections are fitted to the prompt budget; the complaint is never cut"""
+from prompt_builder import PromptBuilder, count_tokens
+
+SECTIONS = {
+    "IPC_379": "Whoever intends to take dishonestly any movable property out of the possession of any person "
+               "without that person's consent, moves that property in order to such taking, is said to commit "
+               "theft. The theft of a mobile phone is punished under this section.",
+    "IPC_356": "Whoever assaults or uses criminal force to any person, in attempting to commit theft on any "
+               "property which that person is then wearing or carrying, shall be punished.",
+    "IPC_392": "Whoever commits robbery shall be punished with rigorous imprisonment for a term which may "
+               "extend to ten years. Robbery is theft or extortion with hurt or fear of instant hurt.",
+    "IPC_506": "Whoever commits the offence of criminal intimidation shall be punished with imprisonment.",
+    "IPC_323": "Whoever voluntarily causes hurt shall be punished with imprisonment or fine or both.",
+}
+TITLES = {"IPC_379": "Theft", "IPC_356": "Assault in attempt to commit theft", "IPC_392": "Robbery",
+          "IPC_506": "Criminal intimidation", "IPC_323": "Voluntarily causing hurt"}
+
+LONG_COMPLAINT = " ".join(
+    f"On day {day} the accused followed me from the bus stand to the market and snatched my phone." for day in range(400)
+)
+
+
+def builder(budget=600):
+    return PromptBuilder(budget=budget, title=TITLES.get)
+
+
+def test_long_complaint_is_kept_whole():
+    context = builder().context(LONG_COMPLAINT, SECTIONS)
+    assert f"CASE DESCRIPTION:\n{LONG_COMPLAINT}\n" in context
+    assert "[...]" not in context
+
+
+def test_long_complaint_keeps_every_section():
+    sections = builder().context(LONG_COMPLAINT, SECTIONS).split("RELEVANT SECTIONS:\n", 1)[1]
+    assert "(none retrieved)" not in sections
+    assert sections.splitlines() == ["- IPC 379", "- IPC 356", "- IPC 392", "- IPC 506", "- IPC 323"]
+
+
+def test_sections_shrink_to_fit():
+    complaint = "A man snatched my mobile phone near the bus stand and threatened to hurt me."
+    full = builder(budget=2000).context(complaint, SECTIONS)
+    assert count_tokens(full) <= 2000
+    assert "dishonestly" in full
+    # Fewer sentences first, then titles for the lowest-ranked sections, then numbers alone
+    for budget in (220, 110, 60):
+        context = builder(budget).context(complaint, SECTIONS)
+        assert count_tokens(context) <= budget
+        assert context.startswith(f"CASE DESCRIPTION:\n{complaint}\n")
+        assert all(label in context for label in ("IPC 379", "IPC 356", "IPC 392", "IPC 506", "IPC 323"))
+    assert "dishonestly" not in builder(220).context(complaint, SECTIONS)
+    assert builder(110).context(complaint, SECTIONS).endswith("- IPC 323: Voluntarily causing hurt")
+    assert builder(60).context(complaint, SECTIONS).endswith("- IPC 506\n- IPC 323")
+
+
+def test_none_retrieved_only_without_sections():
+    assert "(none retrieved)" in builder().context(LONG_COMPLAINT, {})
+    assert "(none retrieved)" not in builder().context("My phone was stolen.", SECTIONS)
@@ -0,0 +1,50 @@
+"""top_k ranks and filters scores, and search matches search_batch for every backend"""
+import numpy as np
+import pytest
+
+from retrieval import EmbeddingRetriever, HybridRetriever, SectionRetriever
+
+CASES = [
+    "Someone stole my mobile phone from my bag at the bus stand",
+    "He threatened to kill me and hit me with a stick",
+    "My husband beats me and demands dowry u/s 498A",
+]
+
+
+@pytest.fixture(params=["tfidf", "hybrid", "embedding"])
+def retriever(request, section_index):
+    if request.param == "tfidf":
+        return SectionRetriever(section_index)
+    if request.param == "hybrid":
+        return HybridRetriever(section_index)
+    return EmbeddingRetriever(section_index, request.getfixturevalue("embeddings"), threshold=0.3)
+
+
+def test_top_k_is_best_first_and_above_threshold(section_index):
+    retriever = SectionRetriever(section_index, k=3, threshold=0.1)
+    scores = np.array([0.05, 0.9, 0.3, 0.1, 0.7, 0.2])
+    indices, best = retriever.top_k(scores)
+    assert list(indices) == [1, 4, 2]
+    assert list(best) == [0.9, 0.7, 0.3]
+    # Fewer scores than k, and nothing strictly above the threshold is dropped
+    indices, _ = retriever.top_k(scores, k=10, threshold=0.1)
+    assert list(indices) == [1, 4, 2, 5]
+
+
+def test_top_k_can_return_nothing(section_index):
+    indices, best = SectionRetriever(section_index).top_k(np.zeros(4))
+    assert len(indices) == 0 and len(best) == 0
+
+
+def test_search_matches_search_batch(retriever):
+    results = [retriever.search(case) for case in CASES]
+    batch = retriever.search_batch(CASES)
+    assert results == batch
+    # Same ranking, not just the same sections
+    assert [list(result) for result in results] == [list(result) for result in batch]
+    assert any(results)
+    assert "IPC_498A" in results[2]
+
+
+def test_search_batch_of_nothing(retriever):
+    assert retriever.search_batch([]) == []
@@ -0,0 +1,54 @@
+"""ShardedRetriever merges per-act results on one scale, with explicitly cited sections first"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from retrieval import HybridRetriever
+from section_index import CSV_PATH, load_index
+from section_shards import ShardedRetriever
+
+# A second, smaller act built from a few IPC rows under new section numbers
+BNS_SECTIONS = {"IPC_379": "BNS_303", "IPC_323": "BNS_115", "IPC_506": "BNS_351", "IPC_420": "BNS_318",
+                "IPC_302": "BNS_101", "IPC_354": "BNS_74"}
+
+
+@pytest.fixture(scope="module")
+def sharded(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("shards")
+    rows = pd.read_csv(CSV_PATH)
+    rows = rows[rows.Section.isin(list(BNS_SECTIONS))].copy()
+    rows["Section"] = rows.Section.map(BNS_SECTIONS)
+    rows["Description"] = rows.Description.str.replace("IPC", "BNS")
+    bns = directory / "bns.csv"
+    rows.to_csv(bns, index=False)
+    return ShardedRetriever(lambda csv_path, index_dir: HybridRetriever(load_index(csv_path, index_dir)),
+                            discover=lambda: {"bns": str(bns), "ipc": CSV_PATH},
+                            shard_dir=str(directory / "index"), k=5)
+
+
+def test_merge_ranks_by_normalised_score(sharded):
+    ipc, bns = sharded.shards["ipc"], sharded.shards["bns"]
+    ipc_scores, bns_scores = np.zeros(len(ipc.retriever.sections)), np.zeros(len(bns.retriever.sections))
+    ipc_scores[:3] = [0.9, 0.6, 0.3]
+    bns_scores[:2] = [0.8, 0.4]
+    merged = sharded._merge([(ipc, ipc_scores), (bns, bns_scores)], "", k=4)
+
+    candidates = [(float(ipc.normalise(score)), ipc.retriever.sections[row]) for row, score in enumerate(ipc_scores[:3])]
+    candidates += [(float(bns.normalise(score)), bns.retriever.sections[row]) for row, score in enumerate(bns_scores[:2])]
+    assert list(merged) == [section for _, section in sorted(candidates, reverse=True)[:4]]
+
+
+def test_cited_sections_rank_first(sharded):
+    text = "He threatened to kill me with a knife and took my wallet, u/s 379 IPC and BNS 115"
+    merged = sharded.search(text)
+    assert set(list(merged)[:2]) == {"IPC_379", "BNS_115"}
+    assert len(merged) == 5
+
+
+def test_search_matches_search_batch_and_live_query(sharded):
+    cases = ["Someone stole my mobile phone from my bag at the bus stand",
+             "My neighbour threatened to kill me u/s 506"]
+    results = [sharded.search(case) for case in cases]
+    assert [list(result) for result in results] == [list(result) for result in sharded.search_batch(cases)]
+    query = sharded.live_query()
+    assert [list(query.update(case)) for case in cases] == [list(result) for result in results]
@@ -0,0 +1,69 @@
+"""The FIR and analysis stream as they are generated, and are parsed once the stream ends"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import ai_model
+from fir_document import Complaint
+from stub_llm import StubAPIError, StubAsyncGroq
+
+CASE = "A man snatched my mobile phone near the bus stand and threatened me with a knife."
+SECTIONS = {"IPC_379": "Whoever intends to take dishonestly any movable property is said to commit theft."}
+
+
+@pytest.fixture(autouse=True)
+def stub_client(monkeypatch):
+    client = StubAsyncGroq(token_delay=0.001)
+    monkeypatch.setattr(ai_model, "async_client", client)
+    monkeypatch.setattr(ai_model, "completion_cache", None)
+    return client
+
+
+class BrokenCompletions:
+    async def create(self, **kwargs):
+        raise StubAPIError(400, "Bad request")
+
+
+def test_fir_streams_then_parses(stub_client):
+    stream = ai_model.stream_fir_structure(CASE, SECTIONS, Complaint(CASE), fir_number="7/2026",
+                                           registration_date="17-10-2026")
+    pieces = list(stream)
+    assert len(pieces) > 1
+    assert json.loads("".join(pieces))["incident_description"].startswith("STUB COMPLETION")
+    assert stub_client.calls[-1]["stream"] is True
+    fir = stream.result
+    assert fir.source == "llm"
+    assert fir.fir_number == "7/2026"
+    assert fir.incident_description.startswith("STUB COMPLETION")
+
+
+def test_analysis_streams_then_parses():
+    stream = ai_model.stream_sections_and_analysis(CASE, SECTIONS)
+    assert len(list(stream)) > 1
+    assert stream.result.source == "llm"
+    assert stream.result.applicable_sections[0]["section"] == "IPC 379"
+
+
+def test_api_error_gives_the_fallback(monkeypatch):
+    monkeypatch.setattr(ai_model, "async_client", SimpleNamespace(chat=SimpleNamespace(completions=BrokenCompletions())))
+    fir_stream = ai_model.stream_fir_structure(CASE, SECTIONS, Complaint(CASE), fir_number="8/2026",
+                                               registration_date="17-10-2026")
+    assert list(fir_stream) == []
+    assert fir_stream.result.source == "local"
+    analysis_stream = ai_model.stream_sections_and_analysis(CASE, SECTIONS)
+    assert list(analysis_stream) == []
+    assert analysis_stream.result.source == "error"
+
+
+def test_job_reports_both_completions_as_they_stream(monkeypatch):
+    monkeypatch.setattr(ai_model, "async_client", StubAsyncGroq(token_delay=0.02))
+    reports = []
+    request = ai_model.fir_job_request(Complaint(CASE), SECTIONS, "9/2026", "17-10-2026")
+    result = ai_model.run_fir_job(request, report=lambda stage, progress, partial=None: reports.append(partial))
+    partials = [partial for partial in reports if partial]
+    # The fields grow as the text arrives, before the finished records replace them
+    assert len({partial["fir_structure"]["incident_description"] for partial in partials
+                if "fir_structure" in partial}) > 2
+    assert len({partial["analysis"]["analysis"] for partial in partials if "analysis" in partial}) > 2
+    assert result["source"] == "llm"